@@ -11,7 +11,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app.core.database import Base
 from app.models import (
     user, progress, lesson, community, assessment, ai_tutor, billing, course,
-    subject, curriculum, curriculum_mapping
+    subject, curriculum, curriculum_mapping, llm_usage, auth_token, webhook_event
     )
 
 # this is the Alembic Config object, which provides
@@ -33,12 +33,21 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Database-only objects that aren't mapped on the models (see app/core/search.py)
+UNMAPPED_OBJECTS = {"search_vector", "ix_posts_search_vector", "ix_comments_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and name in UNMAPPED_OBJECTS)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -57,7 +66,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
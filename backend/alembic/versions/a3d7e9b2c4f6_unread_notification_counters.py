@@ -0,0 +1,39 @@
+"""unread notification counters and partial index on unread notifications
+
+Revision ID: a3d7e9b2c4f6
+Revises: f9c3e7a1d5b2
+Create Date: 2026-10-19 23:18:40.512307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7e9b2c4f6'
+down_revision = 'f9c3e7a1d5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'user_community_counters',
+        sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False)
+    )
+    op.create_index(
+        'ix_notifications_user_id_unread', 'notifications', ['user_id', 'created_at'], unique=False,
+        postgresql_where=sa.text('is_read = false')
+    )
+    op.execute(
+        """
+        INSERT INTO user_community_counters (user_id, unread_notifications)
+        SELECT user_id, count(*) FROM notifications WHERE is_read = false GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET unread_notifications = EXCLUDED.unread_notifications
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_user_id_unread', table_name='notifications')
+    op.drop_column('user_community_counters', 'unread_notifications')
@@ -0,0 +1,47 @@
+"""add llm_call_logs
+
+Revision ID: a3f1c9d2e7b4
+Revises: 1c8e743c1d2c
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d2e7b4'
+down_revision = '1c8e743c1d2c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_call_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('method', sa.String(length=50), nullable=False),
+        sa.Column('latency_ms', sa.Float(), nullable=False),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.Column('cached_tokens', sa.Integer(), nullable=True),
+        sa.Column('cache_hit', sa.Boolean(), nullable=True),
+        sa.Column('retry_count', sa.Integer(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('estimated_cost_usd', sa.Numeric(precision=12, scale=6), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_call_logs_id'), 'llm_call_logs', ['id'], unique=False)
+    op.create_index(op.f('ix_llm_call_logs_method'), 'llm_call_logs', ['method'], unique=False)
+    op.create_index(op.f('ix_llm_call_logs_created_at'), 'llm_call_logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_llm_call_logs_created_at'), table_name='llm_call_logs')
+    op.drop_index(op.f('ix_llm_call_logs_method'), table_name='llm_call_logs')
+    op.drop_index(op.f('ix_llm_call_logs_id'), table_name='llm_call_logs')
+    op.drop_table('llm_call_logs')
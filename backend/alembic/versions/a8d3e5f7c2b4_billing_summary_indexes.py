@@ -0,0 +1,31 @@
+"""billing summary covering indexes
+
+Revision ID: a8d3e5f7c2b4
+Revises: f2a6c8d1e9b3
+Create Date: 2026-10-19 18:02:37.915402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3e5f7c2b4'
+down_revision = 'f2a6c8d1e9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_subscriptions_parent_id_status', 'subscriptions', ['parent_id', 'status'], unique=False,
+        postgresql_include=['price', 'trial_end_date', 'end_date', 'student_id'],
+    )
+    op.create_index(
+        'ix_payments_subscription_id_status', 'payments', ['subscription_id', 'status', 'payment_date'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_subscription_id_status', table_name='payments')
+    op.drop_index('ix_subscriptions_parent_id_status', table_name='subscriptions')
@@ -0,0 +1,28 @@
+"""keyset pagination indexes for billing histories
+
+Revision ID: b5e9f1c3d7a2
+Revises: a8d3e5f7c2b4
+Create Date: 2026-10-19 18:41:06.330518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e9f1c3d7a2'
+down_revision = 'a8d3e5f7c2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_subscriptions_created_at_id', 'subscriptions', ['created_at', 'id'], unique=False)
+    op.create_index('ix_payments_subscription_id_created_at_id', 'payments', ['subscription_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_invoices_user_id_created_at_id', 'invoices', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoices_user_id_created_at_id', table_name='invoices')
+    op.drop_index('ix_payments_subscription_id_created_at_id', table_name='payments')
+    op.drop_index('ix_subscriptions_created_at_id', table_name='subscriptions')
@@ -0,0 +1,55 @@
+"""add student_entitlements
+
+Revision ID: c4a8e1f3b2d6
+Revises: b7e2d4f1c8a9
+Create Date: 2026-10-19 15:27:02.913847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e1f3b2d6'
+down_revision = 'b7e2d4f1c8a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_entitlements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=True),
+        sa.Column('all_subjects', sa.Boolean(), nullable=False),
+        sa.Column('valid_until', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_student_entitlements_student_valid_until', 'student_entitlements', ['student_id', 'valid_until'], unique=False)
+    op.create_index(op.f('ix_student_entitlements_subscription_id'), 'student_entitlements', ['subscription_id'], unique=False)
+
+    # Backfill from current subscriptions (same rules as grants_from_subscriptions)
+    op.execute("""
+        INSERT INTO student_entitlements (student_id, subscription_id, kind, subject_id, all_subjects, valid_until)
+        SELECT s.student_id, s.id, 'trial', NULL, true, s.trial_end_date
+        FROM subscriptions s
+        WHERE s.status = 'TRIAL' AND s.trial_end_date > now()
+    """)
+    op.execute("""
+        INSERT INTO student_entitlements (student_id, subscription_id, kind, subject_id, all_subjects, valid_until)
+        SELECT s.student_id, s.id, 'subscription', NULL, COALESCE(p.plan_type = 'premium', false), s.end_date
+        FROM subscriptions s
+        LEFT JOIN subscription_plans p ON p.id = s.plan_id
+        WHERE s.status = 'ACTIVE' AND (s.end_date IS NULL OR s.end_date > now())
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_student_entitlements_subscription_id'), table_name='student_entitlements')
+    op.drop_index('ix_student_entitlements_student_valid_until', table_name='student_entitlements')
+    op.drop_table('student_entitlements')
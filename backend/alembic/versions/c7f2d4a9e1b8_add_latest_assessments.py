@@ -0,0 +1,51 @@
+"""latest assessment per student and subject
+
+Revision ID: c7f2d4a9e1b8
+Revises: b5e9f1c3d7a2
+Create Date: 2026-10-19 20:12:44.815302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2d4a9e1b8'
+down_revision = 'b5e9f1c3d7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_assessments_student_id_subject_created_at', 'assessments',
+        ['student_id', 'subject', sa.text('created_at DESC')], unique=False
+    )
+    op.create_table(
+        'latest_assessments',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('assessment_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('overall_score', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['assessment_id'], ['assessments.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['student_profiles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'subject')
+    )
+    op.execute(
+        """
+        INSERT INTO latest_assessments
+            (student_id, subject, assessment_id, status, overall_score, created_at, completed_at)
+        SELECT DISTINCT ON (student_id, subject)
+            student_id, subject, id, status, overall_score, created_at, completed_at
+        FROM assessments
+        ORDER BY student_id, subject, created_at DESC, id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('latest_assessments')
+    op.drop_index('ix_assessments_student_id_subject_created_at', table_name='assessments')
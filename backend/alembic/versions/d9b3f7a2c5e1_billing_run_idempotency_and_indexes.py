@@ -0,0 +1,30 @@
+"""billing run idempotency keys and indexes
+
+Revision ID: d9b3f7a2c5e1
+Revises: c4a8e1f3b2d6
+Create Date: 2026-10-19 16:40:55.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3f7a2c5e1'
+down_revision = 'c4a8e1f3b2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('payments', sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_payments_idempotency_key', 'payments', ['idempotency_key'])
+    op.create_index('ix_subscriptions_status_parent_id', 'subscriptions', ['status', 'parent_id'], unique=False)
+    op.create_index('ix_billing_info_user_id_is_default', 'billing_info', ['user_id', 'is_default'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_billing_info_user_id_is_default', table_name='billing_info')
+    op.drop_index('ix_subscriptions_status_parent_id', table_name='subscriptions')
+    op.drop_constraint('uq_payments_idempotency_key', 'payments', type_='unique')
+    op.drop_column('payments', 'idempotency_key')
@@ -0,0 +1,44 @@
+"""add webhook_events inbox
+
+Revision ID: f2a6c8d1e9b3
+Revises: d9b3f7a2c5e1
+Create Date: 2026-10-19 17:25:12.481903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c8d1e9b3'
+down_revision = 'd9b3f7a2c5e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.String(length=255), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('type', sa.String(length=100), nullable=False),
+        sa.Column('ordering_key', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('stripe_created', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_events_status_next_attempt_at', 'webhook_events', ['status', 'next_attempt_at'], unique=False)
+    op.create_index('ix_webhook_events_ordering_key_created', 'webhook_events', ['ordering_key', 'stripe_created'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_events_ordering_key_created', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_status_next_attempt_at', table_name='webhook_events')
+    op.drop_table('webhook_events')
@@ -0,0 +1,55 @@
+"""denormalized post comment counts and per-user community counters
+
+Revision ID: f4b8d2e6a1c9
+Revises: e8a1c5f3b9d4
+Create Date: 2026-10-19 21:47:12.093815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2e6a1c9'
+down_revision = 'e8a1c5f3b9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_table(
+        'user_community_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        """
+        UPDATE posts SET comment_count = counts.total
+        FROM (
+            SELECT post_id, count(*) AS total FROM comments WHERE is_active GROUP BY post_id
+        ) AS counts
+        WHERE posts.id = counts.post_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO user_community_counters (user_id, post_count, comment_count)
+        SELECT user_id, sum(posts), sum(comments)
+        FROM (
+            SELECT user_id, count(*) AS posts, 0 AS comments FROM posts WHERE is_active GROUP BY user_id
+            UNION ALL
+            SELECT user_id, 0, count(*) FROM comments WHERE is_active GROUP BY user_id
+        ) AS counts
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_community_counters')
+    op.drop_column('posts', 'comment_count')
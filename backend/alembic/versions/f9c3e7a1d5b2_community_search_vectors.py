@@ -0,0 +1,45 @@
+"""full-text search vectors for community posts and comments
+
+Revision ID: f9c3e7a1d5b2
+Revises: f4b8d2e6a1c9
+Create Date: 2026-10-19 22:31:50.274618
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9c3e7a1d5b2'
+down_revision = 'f4b8d2e6a1c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Generated columns (PostgreSQL 12+) are kept current by the database on every write.
+    # The text configuration must match settings.COMMUNITY_SEARCH_TEXT_CONFIG.
+    op.execute(
+        """
+        ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE comments ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            to_tsvector('english', coalesce(content, ''))
+        ) STORED
+        """
+    )
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_comments_search_vector', 'comments', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_search_vector', table_name='comments')
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('comments', 'search_vector')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from app.core.deps import get_current_admin_user
+from app.core.security import password_hash_pool
+from app.models.user import User as UserModel
+from app.services.llm_metrics import llm_metrics
+
+router = APIRouter()
+
+
+@router.get("/llm-metrics")
+def get_llm_metrics(
+    recent: int = Query(20, ge=0, le=500),
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Latency percentiles, token usage and cost per LLM method, plus the most recent calls"""
+    summary = llm_metrics.summary()
+    summary["recent"] = llm_metrics.recent(recent) if recent else []
+    return summary
+
+
+@router.get("/password-hash-pool")
+def get_password_hash_pool_stats(current_user: UserModel = Depends(get_current_admin_user)):
+    """Queue depth and timings of the bcrypt worker pool"""
+    return password_hash_pool.stats()
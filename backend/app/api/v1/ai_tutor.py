@@ -2,7 +2,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import get_current_active_user
+from app.core.deps import get_current_active_user, require_course_access
 from app.services.ai_tutor import ai_tutor_service
 from app.crud.ai_tutor import (
     create_tutor_session, get_active_session_by_student, create_tutor_interaction,
@@ -22,7 +22,7 @@ router = APIRouter()
 def get_personalized_recommendations(
     request: RecommendationRequest,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(require_course_access)
 ):
     """Get personalized learning recommendations for a student"""
 
@@ -71,7 +71,7 @@ def get_personalized_recommendations(
 def submit_answer_for_evaluation(
     submission: AnswerSubmission,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(require_course_access)
 ):
     """Submit a student answer for AI evaluation"""
 
@@ -113,7 +113,7 @@ def chat_with_tutor(
     message: ChatMessage,
     student_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(require_course_access)
 ):
     """Chat with the AI tutor"""
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, users, students, progress, assessments, lessons, study_plans, ai_tutor, community, notifications, billing
+from app.api.v1 import auth, users, students, progress, assessments, lessons, study_plans, ai_tutor, community, notifications, billing, admin
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
@@ -13,3 +13,4 @@ api_router.include_router(community.router, prefix="/community", tags=["communit
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 api_router.include_router(assessments.router, prefix="/assessments", tags=["Assessments"])  # new
 api_router.include_router(billing.router, prefix="/billing", tags=["billing"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
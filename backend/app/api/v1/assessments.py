@@ -3,10 +3,13 @@ from app.models.assessment import Assessment, AssessmentReport, AssessmentQuesti
 from app.models.user import User, StudentProfile
 from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.core.database import get_async_db, get_db
 from app.schemas import assessment as schemas
-from app.core.deps import get_current_user
+from app.core.deps import get_current_user, check_course_access, require_course_access
+from app.crud.student import record_latest_assessment
 
 from app.services.assessment_service import (
     create_question,
@@ -25,34 +28,45 @@ from app.constants import (
 
 router = APIRouter()
 
+async def _load_assessment(db: AsyncSession, assessment_id: int, with_questions: bool = False):
+    """Load an assessment, optionally with questions + question_bank eagerly loaded for AssessmentOut."""
+    stmt = select(Assessment).where(Assessment.id == assessment_id)
+    if with_questions:
+        stmt = stmt.options(selectinload(Assessment.questions).selectinload(AssessmentQuestion.question_bank))
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
 @router.post("/", response_model=schemas.AssessmentOut)
-def create_assessment(payload: schemas.AssessmentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_assessment(payload: schemas.AssessmentCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """
     Create a new assessment record. This endpoint **only creates the assessment**
     (no question generation). Use POST /{id}/questions to create questions.
     """
-    print(f"Creating assessment for student_id={payload.student_id}, subject={payload.subject }")
-
-    student = db.query(StudentProfile).filter(StudentProfile.id == payload.student_id).first()
+    student = await db.get(StudentProfile, payload.student_id)
 
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
+    # New assessments need an active trial or subscription (subscriptions key on the student's user id)
+    await db.run_sync(check_course_access, student.user_id)
+
     # check if there is already an in-progress assessment for this student
     existing = (
-        db.query(Assessment)
-        .filter(
-            Assessment.student_id == payload.student_id,
-            Assessment.status == ASSESSMENT_STATUS_PROGRESS,
-            Assessment.subject == payload.subject,
-            Assessment.grade_level == student.grade_level
+        await db.execute(
+            select(Assessment.id)
+            .where(
+                Assessment.student_id == payload.student_id,
+                Assessment.status == ASSESSMENT_STATUS_PROGRESS,
+                Assessment.subject == payload.subject,
+                Assessment.grade_level == student.grade_level
+            )
+            .order_by(Assessment.created_at.desc())
+            .limit(1)
         )
-        .order_by(Assessment.created_at.desc())
-        .first()
-    )
+    ).scalar()
     if existing:
         # If an in-progress assessment exists, return it (useful for idempotency)
-        return existing
+        return await _load_assessment(db, existing, with_questions=True)
 
     grade_level = student.grade_level
     assessment = Assessment(
@@ -67,13 +81,14 @@ def create_assessment(payload: schemas.AssessmentCreate, db: Session = Depends(g
         created_at=datetime.now(timezone.utc)
     )
     db.add(assessment)
-    db.commit()
-    db.refresh(assessment)
-    return assessment
+    await db.flush()
+    await db.run_sync(record_latest_assessment, assessment)
+    await db.commit()
+    return await _load_assessment(db, assessment.id, with_questions=True)
 
 
 @router.post("/{assessment_id}/questions", response_model=schemas.QuestionOut)
-async def create_assessment_question(assessment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_assessment_question(assessment_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(require_course_access)):
     """
     Create a new question for an existing assessment.
 
@@ -83,14 +98,14 @@ async def create_assessment_question(assessment_id: int, db: Session = Depends(g
     - Uses student_profile checkpoint fields as preference hints (if present).
     - Returns the created question or raises error if limits reached or assessment closed.
     """
-    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+    assessment = await db.get(Assessment, assessment_id)
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
 
     if assessment.status != ASSESSMENT_STATUS_PROGRESS:
         raise HTTPException(status_code=400, detail="Assessment is not in progress")
 
-    if not assessment.subject in ASSESSMENT_SUBJECTS:
+    if assessment.subject not in {s.value for s in ASSESSMENT_SUBJECTS}:
         raise HTTPException(status_code=400, detail="Invalid subject for assessment")
 
     # Finally create the question using existing create_question service
@@ -100,7 +115,7 @@ async def create_assessment_question(assessment_id: int, db: Session = Depends(g
 
 
 @router.post("/{assessment_id}/questions/{question_id}/answer", response_model=schemas.AnswerOut)
-async def check_answer_and_next(assessment_id: int, question_id: int, payload: schemas.AnswerSubmit, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def check_answer_and_next(assessment_id: int, question_id: int, payload: schemas.AnswerSubmit, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """
     Submit an answer for a question:
     - Update the question record (is_correct/score/answered_at/time_taken).
@@ -110,9 +125,13 @@ async def check_answer_and_next(assessment_id: int, question_id: int, payload: s
     - Return next question (if any) or None.
     """
     # Load question
-    question = db.query(AssessmentQuestion).filter(
-        AssessmentQuestion.id == question_id
-    ).first()
+    question = (
+        await db.execute(
+            select(AssessmentQuestion)
+            .where(AssessmentQuestion.id == question_id)
+            .options(selectinload(AssessmentQuestion.assessment), selectinload(AssessmentQuestion.question_bank))
+        )
+    ).scalar_one_or_none()
 
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
@@ -133,8 +152,7 @@ async def check_answer_and_next(assessment_id: int, question_id: int, payload: s
     question.answered_at = datetime.now(timezone.utc)
     question.time_taken = payload.time_taken
     db.add(question)
-    db.commit()
-    db.refresh(question)
+    await db.commit()
 
 
     # Update assessment counters
@@ -162,10 +180,14 @@ async def check_answer_and_next(assessment_id: int, question_id: int, payload: s
         assessment.status = ASSESSMENT_STATUS_COMPLETED
         assessment.completed_at = datetime.now(timezone.utc)
         # compute overall score
-        answers_scores = [q.score or 0.0 for q in assessment.questions]
+        answers_scores = [
+            score or 0.0
+            for score in (await db.scalars(select(AssessmentQuestion.score).where(AssessmentQuestion.assessment_id == assessment.id)))
+        ]
         assessment.overall_score = (sum(answers_scores) / len(answers_scores)) * 100 if answers_scores else None
         db.add(assessment)
-        db.commit()
+        await db.run_sync(record_latest_assessment, assessment)
+        await db.commit()
         # return final result with no next question
         return {
             "question_id": question.id,
@@ -181,9 +203,7 @@ async def check_answer_and_next(assessment_id: int, question_id: int, payload: s
     assessment.total_questions = (assessment.total_questions or 0) + 1
 
     db.add(assessment)
-    db.commit()
-    db.refresh(next_q)
-    db.refresh(assessment)
+    await db.commit()
 
     return {
         "question_id": question.id,
@@ -196,8 +216,8 @@ async def check_answer_and_next(assessment_id: int, question_id: int, payload: s
 
 
 @router.get("/{assessment_id}", response_model=schemas.AssessmentOut)
-def get_assessment(assessment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+async def get_assessment(assessment_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    assessment = await _load_assessment(db, assessment_id, with_questions=True)
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
     return assessment
@@ -205,14 +225,17 @@ def get_assessment(assessment_id: int, db: Session = Depends(get_db), current_us
 
 @router.post("/{assessment_id}/completed", response_model=schemas.AssessmentReport)
 def complete_assessment(assessment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+    # Sync on purpose: the report build (pandas) is CPU-bound and must run in the threadpool, not on the event loop
+    assessment = db.get(Assessment, assessment_id)
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
 
     if assessment.status != ASSESSMENT_STATUS_COMPLETED:
         raise HTTPException(status_code=400, detail="Assessment is not marked as completed yet")
 
-    student_name = assessment.student.user.full_name
+    student_name = db.scalar(
+        select(User.full_name).join(StudentProfile, StudentProfile.user_id == User.id).where(StudentProfile.id == assessment.student_id)
+    )
     grade_level = assessment.grade_level
 
     return get_or_create_assessment_report(db, assessment_id, student_name, grade_level)
@@ -220,6 +243,7 @@ def complete_assessment(assessment_id: int, db: Session = Depends(get_db), curre
 @router.get("/{assessment_id}/report", response_model=schemas.AssessmentReportResponse)
 def get_assessment_report(
     assessment_id: int,
+    # Primary, not a replica: clients fetch the report right after /completed writes it
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -1,19 +1,32 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import create_access_token
+from app.core.database import get_db, get_async_db
+from app.core.security import create_access_token, decode_token, get_password_hash_async, PasswordHashPoolBusy
 from app.core.config import settings
-from app.crud.user import authenticate_user, create_user, get_user_by_email, get_user_by_username
-from app.schemas.auth import Token, UserCreate, UserResponse, UserLogin
+from app.core.principal_cache import principal_cache
+from app.core.token_revocation import revocation_list
+from app.crud.auth_token import create_refresh_token, get_refresh_token, revoke_refresh_token_family, rotate_refresh_token
+from app.crud.user import authenticate_user_async, create_user, get_user, get_user_by_email, get_user_by_username
+from app.schemas.auth import Token, TokenRefresh, LogoutRequest, UserCreate, UserResponse, UserLogin
 from app.models.user import UserRole
 from app.services.billing_service import billing_service
 
 router = APIRouter()
+optional_bearer = HTTPBearer(auto_error=False)
+
+hash_pool_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many sign-ins right now, please retry shortly",
+    headers={"Retry-After": "1"},
+)
 
 
 @router.post("/signup", response_model=UserResponse)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate role
     if user.role not in [role.value for role in UserRole]:
         raise HTTPException(status_code=400, detail="Invalid role")
@@ -22,29 +35,36 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         # Email is required for parent/admin
         if not user.email:
             raise HTTPException(status_code=400, detail="Email is required for parents and admins")
-        if get_user_by_email(db, email=user.email):
+        if await db.run_sync(get_user_by_email, user.email):
             raise HTTPException(status_code=400, detail="Email already registered")
 
         # Username is optional → only check if provided
-        if user.username and get_user_by_username(db, username=user.username):
+        if user.username and await db.run_sync(get_user_by_username, user.username):
             raise HTTPException(status_code=400, detail="Username already taken")
 
     elif user.role == UserRole.STUDENT.value:
         raise HTTPException(status_code=400, detail="Wrong endpoint for student signup")
 
-    # Create the user
-    db_user = create_user(db=db, user=user)
+    # Create the user (bcrypt runs on the password hash pool, not the event loop)
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except PasswordHashPoolBusy:
+        raise hash_pool_busy_exception
+    db_user = await db.run_sync(create_user, user, hashed_password)
 
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(request: UserLogin, db: Session = Depends(get_db)):
+async def login(request: UserLogin, db: AsyncSession = Depends(get_async_db)):
     if request.role not in [role.value for role in UserRole]:
         raise HTTPException(status_code=400, detail="Invalid role")
 
     # Unified authentication → identifier can be username or email
-    user = authenticate_user(db, request.identifier, request.password)
+    try:
+        user = await authenticate_user_async(db, request.identifier, request.password)
+    except PasswordHashPoolBusy:
+        raise hash_pool_busy_exception
 
     # Role must match
     if not user or user.role.value != request.role:
@@ -60,11 +80,55 @@ def login(request: UserLogin, db: Session = Depends(get_db)):
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(subject=user.id, expires_delta=access_token_expires)
+    _, refresh_token = await db.run_sync(create_refresh_token, user.id)
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
-    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/refresh", response_model=Token)
+def refresh(request: TokenRefresh, db: Session = Depends(get_db)):
+    """Rotate a refresh token and issue a new access token (no password check)."""
+    rotated = rotate_refresh_token(db, request.refresh_token)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db_token, refresh_token = rotated
+
+    user = get_user(db, user_id=db_token.user_id)
+    if not user or not user.is_active:
+        revoke_refresh_token_family(db, db_token.family_id)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(subject=user.id, expires_delta=access_token_expires)
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
 @router.post("/logout")
-def logout():
-    # In a stateless JWT system, logout is client-side
+def logout(
+    request: Optional[LogoutRequest] = Body(None),
+    db: Session = Depends(get_db),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)
+):
+    """Revoke the presented access token and, if given, the refresh token's session."""
+    if credentials:
+        payload = decode_token(credentials.credentials)
+        if payload and payload.get("jti"):
+            revocation_list.revoke(
+                db,
+                payload["jti"],
+                datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+                user_id=int(payload["sub"]),
+            )
+        principal_cache.invalidate_token(credentials.credentials)
+
+    if request and request.refresh_token:
+        db_token = get_refresh_token(db, request.refresh_token)
+        if db_token:
+            revoke_refresh_token_family(db, db_token.family_id)
+
     return {"message": "Successfully logged out"}
@@ -1,28 +1,37 @@
-from decimal import Decimal
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db, get_async_db
+from app.core.pagination import (
+    MAX_PAGE_SIZE, csv_stream, json_array_stream, set_next_cursor, stream_rows
+)
+from app.core.pricing_catalog import pricing_catalog
 from app.core.deps import get_current_active_user, get_current_admin_user
 from app.crud.billing import (
     create_subscription, get_subscription, get_subscriptions_by_parent,
-    update_subscription, cancel_subscription, get_all_subscriptions,
+    update_subscription, cancel_subscription,
     get_active_subscriptions, get_trial_subscriptions, is_in_free_trial,
-    start_free_trial, create_payment, get_payment, get_payments_by_subscription,
-    get_payments_by_user, update_payment, mark_payment_as_paid, mark_payment_as_failed,
+    start_free_trial, create_payment, get_payment,
+    update_payment, mark_payment_as_paid, mark_payment_as_failed,
     create_billing_info, get_billing_info, get_billing_info_by_user,
     get_default_billing_info, update_billing_info, delete_billing_info,
-    create_invoice, get_invoice, get_invoices_by_user,
+    create_invoice, get_invoice,
     mark_invoice_as_paid, get_billing_summary,
     create_subscription_plan, get_subscription_plan, get_subscriptions_by_student,
-    get_all_subscription_plans, get_active_subscription_plans, update_subscription_plan,
+    get_active_subscription_plans, update_subscription_plan,
     delete_subscription_plan, create_plan_feature, get_plan_feature, get_plan_features_by_plan,
     update_plan_feature, delete_plan_feature, create_plan_subject, get_plan_subject,
     get_plan_subjects_by_plan, get_plan_subjects_by_subject, delete_plan_subject,
     calculate_subscription_price, get_total_subjects_count, create_trial_extension,
-    get_trial_extensions_by_subscription
+    get_trial_extensions_by_subscription, get_subscriptions_page, get_payments_page_by_user,
+    get_invoices_page_by_user
 )
 from app.schemas.billing import (
     SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse,
@@ -35,9 +44,12 @@ from app.schemas.billing import (
     PlanSubjectCreate, PlanSubjectResponse, PricingCalculationResponse,
     TrialExtensionCreate, TrialExtensionResponse
 )
+from app.models.billing import Invoice, Payment, Subscription
 from app.models.user import User as UserModel
 from app.schemas.user import User
+from app.models.webhook_event import WebhookEvent
 from app.services.access_control_service import access_control_service
+from app.services.webhook_service import WebhookSignatureError, new_webhook_event, verify_stripe_signature, webhook_processor
 
 
 router = APIRouter(tags=["billing"])
@@ -61,16 +73,22 @@ def create_new_subscription(
 
 @router.get("/subscriptions", response_model=List[SubscriptionResponse])
 def get_my_subscriptions(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),  # omitted with no cursor: every row
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get current user's subscriptions (for parents)"""
+    """Get current user's subscriptions (for parents); admins get all subscriptions, paged when limit/cursor is given"""
     if current_user.role == "parent":
         return get_subscriptions_by_parent(db, current_user.id)
     elif current_user.role == "student":
         return get_subscriptions_by_student(db, current_user.id)
     elif current_user.role == "admin":
-        return get_all_subscriptions(db)
+        subscriptions, next_cursor = get_subscriptions_page(db, cursor, limit)
+        set_next_cursor(request, response, next_cursor)
+        return subscriptions
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -331,11 +349,17 @@ def create_new_payment(
 
 @router.get("/payments", response_model=List[PaymentResponse])
 def get_my_payments(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),  # omitted with no cursor: every row
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get current user's payments"""
-    return get_payments_by_user(db, current_user.id)
+    """Get current user's payments, newest first; paged when limit/cursor is given (next cursor in X-Next-Cursor)"""
+    payments, next_cursor = get_payments_page_by_user(db, current_user.id, cursor, limit)
+    set_next_cursor(request, response, next_cursor)
+    return payments
 
 @router.get("/payments/{payment_id}", response_model=PaymentResponse)
 def get_payment_details(
@@ -595,11 +619,17 @@ def create_new_invoice(
 
 @router.get("/invoices", response_model=List[InvoiceResponse])
 def get_my_invoices(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),  # omitted with no cursor: every row
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get current user's invoices"""
-    return get_invoices_by_user(db, current_user.id)
+    """Get current user's invoices, newest first; paged when limit/cursor is given (next cursor in X-Next-Cursor)"""
+    invoices, next_cursor = get_invoices_page_by_user(db, current_user.id, cursor, limit)
+    set_next_cursor(request, response, next_cursor)
+    return invoices
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
 def get_invoice_details(
@@ -796,150 +826,104 @@ def check_student_access(
 @router.post("/stripe-webhook")
 async def stripe_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Handle Stripe webhook events"""
-    import stripe
-    from app.core.config import settings
-
+    """
+    Verify and enqueue a Stripe webhook event, then ack. Events are applied by
+    the background webhook processor (see app/services/webhook_service.py);
+    redeliveries of an already-queued event id are acknowledged as duplicates.
+    """
     payload = await request.body()
     sig_header = request.headers.get("Stripe-Signature")
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except stripe.error.SignatureVerificationError as e:
+        event = verify_stripe_signature(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+    except WebhookSignatureError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # Handle the event
-    if event.type == "payment_intent.succeeded":
-        payment_intent = event.data.object
-        await handle_payment_success(db, payment_intent)
-    elif event.type == "payment_intent.payment_failed":
-        payment_intent = event.data.object
-        await handle_payment_failed(db, payment_intent)
-    elif event.type == "customer.subscription.updated":
-        subscription = event.data.object
-        await handle_subscription_update(db, subscription)
-    elif event.type == "customer.subscription.deleted":
-        subscription = event.data.object
-        await handle_subscription_cancellation(db, subscription)
-
-    return {"status": "success"}
+    if await db.get(WebhookEvent, event["id"]) is not None:
+        return {"status": "duplicate"}
 
-async def handle_payment_success(db: Session, payment_intent):
-    """Handle successful payment"""
-    # Get metadata from payment intent
-    metadata = payment_intent.metadata or {}
-
-    # Create payment record
-    payment_data = PaymentCreate(
-        subscription_id=int(metadata.get('subscription_id', 0)),
-        amount=float(payment_intent.amount / 100),  # Convert from cents
-        currency=payment_intent.currency,
-        payment_method=payment_intent.payment_method or 'credit_card',
-        transaction_id=payment_intent.id,
-        description=f"Payment for subscription {metadata.get('subscription_id', '')}"
-    )
+    db.add(new_webhook_event(event))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Concurrent redelivery of the same event won the insert
+        await db.rollback()
+        return {"status": "duplicate"}
 
-    create_payment(db, payment_data)
-
-    # Update subscription status if this is a new subscription
-    if metadata.get('subscription_id'):
-        subscription = get_subscription(db, int(metadata['subscription_id']))
-        if subscription:
-            subscription.status = "active"
-            subscription.payment_status = "paid"
-            db.commit()
-
-async def handle_payment_failed(db: Session, payment_intent):
-    """Handle failed payment"""
-    # Get metadata from payment intent
-    metadata = payment_intent.metadata or {}
-
-    # Find and update payment record if it exists
-    payments = get_payments_by_subscription(db, int(metadata.get('subscription_id', 0)))
-    for payment in payments:
-        if payment.transaction_id == payment_intent.id:
-            payment.status = "failed"
-            payment.description = f"Payment failed: {payment_intent.last_payment_error.message if payment_intent.last_payment_error else 'Unknown error'}"
-            db.commit()
-            break
-
-    # Update subscription status
-    if metadata.get('subscription_id'):
-        subscription = get_subscription(db, int(metadata['subscription_id']))
-        if subscription:
-            subscription.status = "past_due"
-            subscription.payment_status = "failed"
-            db.commit()
-
-async def handle_subscription_update(db: Session, stripe_subscription):
-    """Handle subscription updates from Stripe"""
-    # Get metadata from subscription
-    metadata = stripe_subscription.metadata or {}
-
-    # Update subscription status in database
-    if metadata.get('subscription_id'):
-        subscription = get_subscription(db, int(metadata['subscription_id']))
-        if subscription:
-            # Map Stripe status to our status
-            status_mapping = {
-                'active': 'active',
-                'canceled': 'canceled',
-                'past_due': 'past_due',
-                'unpaid': 'past_due',
-                'incomplete': 'incomplete',
-                'incomplete_expired': 'expired'
-            }
+    webhook_processor.wake()
+    return {"status": "success"}
 
-            stripe_status = stripe_subscription.status
-            db_status = status_mapping.get(stripe_status, 'active')
+# Admin Exports
 
-            subscription.status = db_status
-            subscription.payment_status = 'paid' if stripe_status == 'active' else 'pending'
-            db.commit()
+EXPORT_MODELS = {"subscriptions": Subscription, "payments": Payment, "invoices": Invoice}
 
-async def handle_subscription_cancellation(db: Session, stripe_subscription):
-    """Handle subscription cancellations from Stripe"""
-    # Get metadata from subscription
-    metadata = stripe_subscription.metadata or {}
+@router.get("/exports/{table}")
+def export_billing_table(
+    table: str,
+    format: str = Query("json", pattern="^(json|csv)$"),
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Stream a billing table as a JSON array or CSV (admin only)"""
+    model = EXPORT_MODELS.get(table)
+    if model is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown export")
 
-    # Update subscription status in database
-    if metadata.get('subscription_id'):
-        subscription = get_subscription(db, int(metadata['subscription_id']))
-        if subscription:
-            subscription.status = "canceled"
-            subscription.end_date = datetime.now()
-            subscription.payment_status = "canceled"
-            db.commit()
+    columns = [column.name for column in model.__table__.columns]
+    rows = stream_rows(SessionLocal, select(model.__table__).order_by(model.__table__.c.id))
+    if format == "csv":
+        return StreamingResponse(
+            csv_stream(rows, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{table}.csv"'}
+        )
+    return StreamingResponse(json_array_stream(rows), media_type="application/json")
 
 # Subscription Plan Endpoints
 
+def _etag_matches(request: Request, response: Response, etag: str) -> bool:
+    """Set the ETag and report whether the client's If-None-Match already has it."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def _not_modified(response: Response) -> Response:
+    """304 with only the validator headers (no Content-Length: caches would store a 0-byte body)."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={name: response.headers[name] for name in ("ETag", "Cache-Control")},
+    )
+
 @router.get("/subscription-plans", response_model=List[SubscriptionPlanResponse])
 def get_subscription_plans(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """Get all active subscription plans"""
-    from app.constants import BASIC_PLAN_PRICE_PER_SUBJECT, PREMIUM_PLAN_PRICE, DEFAULT_YEARLY_DISCOUNT_PERCENTAGE
-
-    plans = get_all_subscription_plans(db)
-    for plan in plans:
-        if plan.plan_type == 'basic':
-            plan.base_price = BASIC_PLAN_PRICE_PER_SUBJECT
-            # For yearly pricing, apply discount to annual amount
-            yearly_discount = Decimal(DEFAULT_YEARLY_DISCOUNT_PERCENTAGE / 100)
-            plan.yearly_price = Decimal(plan.base_price) * Decimal(12) * (Decimal(1.0) - yearly_discount)
-        elif plan.plan_type == 'premium':
-            plan.base_price = PREMIUM_PLAN_PRICE
-            # For yearly pricing, apply discount to annual amount
-            yearly_discount = Decimal(DEFAULT_YEARLY_DISCOUNT_PERCENTAGE / 100)
-            plan.yearly_price = Decimal(plan.base_price) * Decimal(12) * (Decimal(1.0) - yearly_discount)
-    return plans
+    catalog = pricing_catalog.get(db)
+    if _etag_matches(request, response, catalog.etag):
+        return _not_modified(response)
+    return catalog.subscription_plans()
+
+@router.get("/pricing-options", response_model=dict)
+def get_pricing_options(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Get plans with monthly/yearly prices, features and subjects"""
+    catalog = pricing_catalog.get(db)
+    if _etag_matches(request, response, catalog.etag):
+        return _not_modified(response)
+    return catalog.pricing_options()
 
 @router.get("/payment-methods", response_model=List[PaymentMethodResponse])
 def get_payment_methods(
@@ -1,14 +1,18 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
 from app.core.deps import get_current_active_user
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
+from app.core.search import SCOPES, SCOPE_POSTS
 from app.crud.community import (
-    get_post, get_posts, get_posts_by_user, create_post, update_post, delete_post,
-    get_comments_by_post, create_comment, update_comment, delete_comment,
-    create_system_notification
+    get_post, create_post, update_post, delete_post, deactivate_post,
+    create_comment, update_comment, delete_comment, deactivate_comment,
+    create_system_notification, get_user_counters
 )
-from app.schemas.community import Post, PostCreate, PostUpdate, Comment, CommentCreate, CommentUpdate
+from app.services.community_feed import community_feed
+from app.schemas.community import Post, PostCreate, PostUpdate, Comment, CommentCreate, CommentUpdate, SearchResult, UserCommunityStats
 from app.models.user import User as UserModel
 
 router = APIRouter()
@@ -16,34 +20,34 @@ router = APIRouter()
 # Post endpoints
 @router.get("/posts", response_model=List[Post])
 def read_posts(
-    skip: int = 0,
-    limit: int = 20,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.COMMUNITY_FEED_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get all community posts"""
-    posts = get_posts(db, skip=skip, limit=limit)
-    
-    # Add author information to each post
-    for post in posts:
-        post.author = {
-            "id": post.author.id,
-            "username": post.author.username,
-            "full_name": post.author.full_name,
-            "role": post.author.role
-        }
-        
-        # Add author info to comments
-        for comment in post.comments:
-            comment.author = {
-                "id": comment.author.id,
-                "username": comment.author.username,
-                "full_name": comment.author.full_name,
-                "role": comment.author.role
-            }
-    
+    """Get community posts, newest first, with their latest comments (next page cursor in X-Next-Cursor)"""
+    posts, next_cursor = community_feed.page(db, cursor, limit)
+    set_next_cursor(request, response, next_cursor)
     return posts
 
+@router.get("/search", response_model=List[SearchResult])
+def search_community(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    scope: str = Query(SCOPE_POSTS, pattern="^(" + "|".join(SCOPES) + ")$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.COMMUNITY_FEED_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Full-text search over posts or comments, best match first (next page cursor in X-Next-Cursor)"""
+    results, next_cursor = community_feed.search(db, q, scope, cursor, limit)
+    set_next_cursor(request, response, next_cursor)
+    return results
+
 @router.get("/posts/{post_id}", response_model=Post)
 def read_post(
     post_id: int,
@@ -51,29 +55,9 @@ def read_post(
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """Get a specific post with comments"""
-    post = get_post(db, post_id)
+    post = community_feed.post(db, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    
-    # Add author information
-    post.author = {
-        "id": post.author.id,
-        "username": post.author.username,
-        "full_name": post.author.full_name,
-        "role": post.author.role
-    }
-    
-    # Get comments for the post
-    comments = get_comments_by_post(db, post_id)
-    for comment in comments:
-        comment.author = {
-            "id": comment.author.id,
-            "username": comment.author.username,
-            "full_name": comment.author.full_name,
-            "role": comment.author.role
-        }
-    
-    post.comments = comments
     return post
 
 @router.post("/posts", response_model=Post)
@@ -132,8 +116,7 @@ def delete_post_endpoint(
         post = get_post(db, post_id)
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
-        post.is_active = False
-        db.commit()
+        deactivate_post(db, post)
         success = True
     else:
         success = delete_post(db, post_id, current_user.id)
@@ -149,25 +132,27 @@ def delete_post_endpoint(
 @router.get("/users/{user_id}/posts", response_model=List[Post])
 def read_user_posts(
     user_id: int,
-    skip: int = 0,
-    limit: int = 20,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.COMMUNITY_FEED_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get posts by a specific user"""
-    posts = get_posts_by_user(db, user_id, skip=skip, limit=limit)
-    
-    # Add author information to each post
-    for post in posts:
-        post.author = {
-            "id": post.author.id,
-            "username": post.author.username,
-            "full_name": post.author.full_name,
-            "role": post.author.role
-        }
-    
+    """Get posts by a specific user, newest first (next page cursor in X-Next-Cursor)"""
+    posts, next_cursor = community_feed.page(db, cursor, limit, user_id=user_id)
+    set_next_cursor(request, response, next_cursor)
     return posts
 
+@router.get("/users/{user_id}/stats", response_model=UserCommunityStats)
+def read_user_stats(
+    user_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Get a user's post and comment counts"""
+    return get_user_counters(db, user_id)
+
 # Comment endpoints
 @router.post("/comments", response_model=Comment)
 def create_new_comment(
@@ -240,8 +225,7 @@ def delete_comment_endpoint(
         comment = get_comment(db, comment_id)
         if not comment:
             raise HTTPException(status_code=404, detail="Comment not found")
-        comment.is_active = False
-        db.commit()
+        deactivate_comment(db, comment)
         success = True
     else:
         success = delete_comment(db, comment_id, current_user.id)
@@ -2,7 +2,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_current_admin_user
+from app.core.deps import get_current_admin_user, require_course_access
 from app.crud.lesson import (
     get_lesson, get_lessons, create_lesson, update_lesson, delete_lesson
 )
@@ -18,7 +18,7 @@ def read_lessons(
     subject: Optional[str] = Query(None),
     difficulty: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(require_course_access)
 ):
     """Get all lessons with optional filtering"""
     return get_lessons(db, skip=skip, limit=limit, subject=subject, difficulty=difficulty)
@@ -27,7 +27,7 @@ def read_lessons(
 def read_lesson(
     lesson_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(require_course_access)
 ):
     """Get a specific lesson by ID"""
     lesson = get_lesson(db, lesson_id)
@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.deps import get_current_active_user
+from app.core.database import SessionLocal, get_db
+from app.core.deps import get_current_active_user, get_stream_user
+from app.core.notification_hub import EVENT_COUNT, SubscriptionStreamingResponse, notification_hub
 from app.crud.community import (
     get_user_notifications, get_unread_notifications, mark_notification_read,
-    mark_notifications_read, mark_all_notifications_read, get_notification_count
+    mark_notifications_read, mark_all_notifications_read, get_notification_count,
+    get_unread_notification_count
 )
 from app.schemas.community import Notification, MarkNotificationsRead
 from app.models.user import User as UserModel
@@ -36,6 +39,38 @@ def get_notification_count_endpoint(
     count = get_notification_count(db, current_user.id, unread_only=unread_only)
     return {"count": count}
 
+def _unread_count(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return get_unread_notification_count(db, user_id)
+    finally:
+        db.close()
+
+@router.get("/stream")
+async def notification_stream(
+    request: Request,
+    current_user: UserModel = Depends(get_stream_user)
+):
+    """
+    Server-Sent Events stream of the current user's new notifications and
+    unread count ("notification", "count" and "resync" events), replacing
+    polling of / and /count.
+    """
+    subscription = notification_hub.subscribe(current_user.id)
+    if subscription is None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open notification streams")
+    try:
+        unread = await run_in_threadpool(_unread_count, current_user.id)
+    except Exception:
+        notification_hub.unsubscribe(subscription)
+        raise
+    return SubscriptionStreamingResponse(
+        notification_hub, subscription,
+        notification_hub.stream(subscription, [(EVENT_COUNT, {"unread": unread})], request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/mark-read/{notification_id}")
 def mark_notification_read_endpoint(
     notification_id: int,
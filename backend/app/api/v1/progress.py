@@ -1,7 +1,7 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.deps import get_current_active_user, get_current_admin_user
 from app.crud.progress import (
     get_progress_by_student_and_week, create_progress, update_progress,
@@ -112,7 +112,7 @@ def update_student_progress(
 def get_student_progress_history_endpoint(
     student_id: int,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """Get student's progress history"""
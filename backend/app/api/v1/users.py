@@ -1,17 +1,21 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_current_admin_user
+from app.core.database import get_db, get_async_db
+from app.core.security import get_password_hash_async, PasswordHashPoolBusy
+from app.api.v1.auth import hash_pool_busy_exception
+from app.core.deps import get_current_active_user, get_current_admin_user, get_current_user_model
 from app.crud.user import get_user, update_user, get_students_by_parent, create_student, update_student
-from app.schemas.user import User, UserUpdate, StudentProfileCreate, StudentProfileResponse, StudentProfileUpdate
+from app.schemas.user import User, UserUpdate, StudentProfileCreate, StudentProfileResponse, StudentProfileUpdate, ParentDashboardResponse
+from app.services.dashboard_service import dashboard_service
 from app.models.user import User as UserModel
 from app.crud.user import get_user as get_user_crud
 
 router = APIRouter()
 
 @router.get("/me", response_model=User)
-def read_user_me(current_user: UserModel = Depends(get_current_active_user)):
+def read_user_me(current_user: UserModel = Depends(get_current_user_model)):
     """Get current user's profile"""
     return current_user
 
@@ -41,10 +45,23 @@ def read_my_students(
     students = get_students_by_parent(db, current_user.id)
     return students
 
+@router.get("/me/dashboard", response_model=ParentDashboardResponse)
+def read_my_dashboard(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Children, latest assessment per subject, access status and progress in one call (for parents)"""
+    if current_user.role != "parent":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only parents can access the dashboard"
+        )
+    return dashboard_service.get_parent_dashboard(db, current_user.id)
+
 @router.post("/me/students", response_model=StudentProfileResponse)
-def create_student_for_me(
+async def create_student_for_me(
     student: StudentProfileCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """Create a new student profile (for parents)"""
@@ -53,7 +70,13 @@ def create_student_for_me(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only parents can create student profiles"
         )
-    return create_student(db, student, current_user.id)
+    try:
+        hashed_password = await get_password_hash_async(student.password)
+    except PasswordHashPoolBusy:
+        raise hash_pool_busy_exception
+    profile = await db.run_sync(create_student, student, current_user.id, hashed_password)
+    await db.refresh(profile, attribute_names=["user"])
+    return profile
 
 @router.put("/me/students/{student_id}", response_model=StudentProfileResponse)
 def update_student_for_me(
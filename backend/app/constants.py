@@ -72,4 +72,10 @@ BILLING_CYCLE_ANNUAL = "annual"
 
 # Subscription Plan Constants
 BASIC_PLAN_PRICE_PER_SUBJECT = 25.00  # $25 per subject per month
-PREMIUM_PLAN_PRICE = 85.00  # $85 per month for all subjects
\ No newline at end of file
+PREMIUM_PLAN_PRICE = 85.00  # $85 per month for all subjects
+# LLM pricing (USD per 1M tokens): input, cached input, output
+LLM_MODEL_PRICING_PER_MILLION = {
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+    "gemini-1.5-flash": {"input": 0.075, "cached_input": 0.01875, "output": 0.30},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+}
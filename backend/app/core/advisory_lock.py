@@ -0,0 +1,83 @@
+# app/core/advisory_lock.py
+"""
+Leader election with a PostgreSQL session-level advisory lock.
+
+Every worker process runs the same background jobs; the one holding the lock
+is the leader and does the work, the others keep trying. The lock lives on a
+dedicated connection, so it's released as soon as the leader's process or
+connection dies and another worker takes over on its next attempt. On other
+databases (SQLite in development and tests) there's only one process, so
+leadership is always granted.
+"""
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+class AdvisoryLockLeader:
+    def __init__(self, engine: Engine, lock_id: int, name: str = "leader"):
+        self.engine = engine
+        self.lock_id = lock_id
+        self.name = name
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._connection is not None or self.engine.dialect.name != "postgresql"
+
+    def acquire(self) -> bool:
+        """Take (or confirm) leadership; False while another process holds the lock."""
+        if self.engine.dialect.name != "postgresql":
+            return True
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.execute(text("SELECT 1"))
+                    return True
+                except Exception:
+                    logger.warning("Lost the %s advisory lock connection", self.name)
+                    self._discard()
+
+            # Autocommit: the liveness probe above would otherwise leave the session idle in a
+            # transaction, which idle_in_transaction_session_timeout kills (and leadership with it)
+            connection = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            try:
+                acquired = connection.execute(
+                    text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}
+                ).scalar()
+            except Exception:
+                connection.close()
+                raise
+            if not acquired:
+                connection.close()
+                return False
+            logger.info("Acquired the %s advisory lock", self.name)
+            self._connection = connection
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+            except Exception:
+                logger.warning("Failed to release the %s advisory lock", self.name, exc_info=True)
+                self._discard()
+                return
+            self._connection.close()
+            self._connection = None
+
+    def _discard(self) -> None:
+        # Invalidate rather than return to the pool: the lock dies with the DBAPI connection
+        try:
+            self._connection.invalidate()
+        except Exception:
+            pass
+        self._connection = None
@@ -1,9 +1,32 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings from Settings; SQLite (tests, local scripts) keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -14,3 +37,121 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------------------
+# Read replicas
+# ---------------------
+# Seconds since the last replayed transaction, or 0 when the replica has replayed
+# everything it received (an idle primary would otherwise look "behind").
+_PG_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """
+    Picks an engine for read-only work: round-robin over replicas whose
+    measured lag is within DB_REPLICA_MAX_LAG_SECONDS, falling back to the
+    primary when none qualify (or none are configured). Lag is measured at
+    most every DB_REPLICA_LAG_CHECK_SECONDS per replica.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine],
+                 max_lag_seconds: float = settings.DB_REPLICA_MAX_LAG_SECONDS,
+                 check_interval: float = settings.DB_REPLICA_LAG_CHECK_SECONDS):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._lag: Dict[int, Optional[float]] = {}
+        self._checked_at: Dict[int, float] = {}
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._lock = threading.Lock()
+
+    def measure_lag(self, replica: Engine) -> Optional[float]:
+        """Replication lag in seconds, or None when the replica can't be reached."""
+        if replica.dialect.name != "postgresql":
+            return 0.0
+        try:
+            with replica.connect() as conn:
+                return float(conn.execute(_PG_REPLICA_LAG_SQL).scalar() or 0)
+        except Exception:
+            logger.warning("Read replica %s unavailable", replica.url.render_as_string(hide_password=True), exc_info=True)
+            return None
+
+    def _lag_for(self, index: int) -> Optional[float]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at.get(index, float("-inf")) < self.check_interval:
+                return self._lag.get(index)
+            # Claim the check; concurrent callers keep using the last value meanwhile
+            self._checked_at[index] = now
+        # Connecting can block (up to the replica connect timeout), so it runs outside the lock
+        lag = self.measure_lag(self.replicas[index])
+        with self._lock:
+            self._lag[index] = lag
+        return lag
+
+    def read_engine(self) -> Engine:
+        if not self.replicas:
+            return self.primary
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                index = next(self._cycle)
+            lag = self._lag_for(index)
+            if lag is not None and lag <= self.max_lag_seconds:
+                return self.replicas[index]
+        return self.primary
+
+
+def replica_engine_options(url: str) -> dict:
+    """Like engine_options, plus a connect timeout so an unreachable replica fails fast."""
+    options = engine_options(url)
+    if make_url(url).get_backend_name() == "postgresql":
+        options["connect_args"] = {"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS}
+    return options
+
+
+replica_engines = [create_engine(url, **replica_engine_options(url)) for url in settings.DATABASE_REPLICA_URLS]
+replica_router = ReplicaRouter(engine, replica_engines)
+
+
+def get_read_db():
+    """Session for read-only endpoints; served by a replica when one is healthy and caught up."""
+    db = SessionLocal(bind=replica_router.read_engine())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ---------------------
+# Async engine (asyncpg) for handlers that also await I/O such as LLM calls
+# ---------------------
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its async counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS and parsed.drivername != _ASYNC_DRIVERS[backend]:
+        parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+
+_async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(_async_url, **engine_options(_async_url))
+# expire_on_commit=False: attributes stay loaded after commit, so no implicit
+# (and, under asyncio, illegal) lazy refresh when building responses
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -2,17 +2,26 @@ from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import verify_token
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.principal_cache import Principal, principal_cache
+from app.core.security import decode_token
 from app.crud.user import get_user
 from app.models.user import User
+from app.services.access_control_service import access_control_service, RESTRICTION_NOTIFICATION
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def get_current_user(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+) -> Principal:
+    """
+    Resolve the bearer token to a Principal snapshot (id, role, is_active,
+    username, full_name, email, student_profile id). Served from the principal
+    cache when possible; use get_current_user_model when the ORM User is needed.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -20,7 +29,12 @@ def get_current_user(
     )
 
     token = credentials.credentials
-    user_id = verify_token(token)
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_token(token)
+    user_id = payload.get("sub") if payload else None
     if user_id is None:
         raise credentials_exception
 
@@ -28,22 +42,77 @@ def get_current_user(
     if user is None:
         raise credentials_exception
 
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, token_exp=payload.get("exp"), jti=payload.get("jti"))
+    return principal
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
     return current_user
 
+def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = None,
+) -> Principal:
+    """
+    Authentication for long-lived streams. Browsers' EventSource can't send
+    headers, so the token may also come as ?access_token=. Uses its own short
+    session rather than get_db, which would hold a connection for as long as
+    the stream stays open.
+    """
+    if credentials is None and access_token:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db = SessionLocal()
+    try:
+        return get_current_active_user(get_current_user(db, credentials))
+    finally:
+        db.close()
+
 def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+    current_user: Principal = Depends(get_current_active_user),
+) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
     return current_user
+
+def get_current_user_model(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+) -> User:
+    """The authenticated user as an ORM object, for handlers that serialize or modify it."""
+    user = get_user(db, user_id=current_user.id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    return user
+
+def check_course_access(db: Session, student_user_id: int) -> None:
+    """Raise 402 unless the student (users.id) has an active trial or subscription."""
+    if settings.SUBSCRIPTION_GATING_ENABLED and not access_control_service.can_access_courses(db, student_user_id):
+        raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=RESTRICTION_NOTIFICATION)
+
+def require_course_access(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+) -> Principal:
+    """
+    Gate for subscription-only routes. Students are checked against their own
+    entitlement (cache hit, or one indexed student_entitlements lookup);
+    parents and admins pass, and handlers acting on a child's behalf call
+    check_course_access for that child.
+    """
+    if current_user.role == "student" and settings.SUBSCRIPTION_GATING_ENABLED:
+        check_course_access(db, current_user.id)
+    return current_user
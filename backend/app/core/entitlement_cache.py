@@ -0,0 +1,192 @@
+# app/core/entitlement_cache.py
+"""
+Per-student entitlement cache for access control.
+
+A StudentEntitlement is built from the student's rows in the materialized
+student_entitlements table (one indexed query, see crud/billing.py
+refresh_student_entitlements) and answers every access check (courses,
+subjects, status) by lookup. It's cached until the nearest trial or
+subscription expiry, so an entitlement never outlives the subscription that
+granted it, capped at ENTITLEMENT_CACHE_TTL_SECONDS.
+
+The cache is per process: subscription writes (crud/billing.py) and the
+Stripe webhook handlers rebuild the table rows and call invalidate(); the
+TTL cap bounds staleness across workers. Entitlements without access are
+kept for only ENTITLEMENT_CACHE_NEGATIVE_TTL_SECONDS, so a payment applied
+on one worker lifts the paywall on the others within seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+GRANT_TRIAL = "trial"
+GRANT_SUBSCRIPTION = "subscription"
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    # Naive datetimes are local time, matching the datetime.now() comparisons elsewhere
+    return value.timestamp() if value is not None else None
+
+
+@dataclass(frozen=True)
+class StudentEntitlement:
+    student_id: int
+    has_active_trial: bool = False
+    has_active_subscription: bool = False
+    trial_end_date: Optional[datetime] = None
+    subscription_end_date: Optional[datetime] = None
+    all_subjects: bool = False
+    subject_ids: FrozenSet[int] = frozenset()
+    valid_until: Optional[float] = None  # nearest future expiry (unix time); None = no expiry
+
+    @property
+    def can_access_courses(self) -> bool:
+        return self.has_active_trial or self.has_active_subscription
+
+    def can_access_subject(self, subject_id: int) -> bool:
+        # During trial, and on premium plans, all subjects are accessible
+        return self.has_active_trial or self.all_subjects or subject_id in self.subject_ids
+
+    @property
+    def accessible_subjects(self) -> List[Union[int, str]]:
+        return ["all"] if self.all_subjects else sorted(self.subject_ids)
+
+    @classmethod
+    def from_grants(cls, student_id: int, grants: Iterable[Dict[str, Any]],
+                    now: Optional[float] = None) -> "StudentEntitlement":
+        """Build from student_entitlements rows (kind, subject_id, all_subjects, valid_until)."""
+        now = time.time() if now is None else now
+        has_active_trial = has_active_subscription = all_subjects = False
+        trial_end_date = subscription_end_date = None
+        subject_ids = set()
+        expiries = []
+
+        for grant in grants:
+            valid_until = _timestamp(grant["valid_until"])
+            if valid_until is not None:
+                if valid_until <= now:
+                    continue
+                expiries.append(valid_until)
+            if grant["kind"] == GRANT_TRIAL:
+                has_active_trial = True
+                trial_end_date = grant["valid_until"]
+            else:
+                has_active_subscription = True
+                if grant["valid_until"] is not None:
+                    subscription_end_date = grant["valid_until"]
+            if grant["all_subjects"]:
+                all_subjects = True
+            elif grant["subject_id"]:
+                subject_ids.add(grant["subject_id"])
+
+        return cls(
+            student_id=student_id,
+            has_active_trial=has_active_trial,
+            has_active_subscription=has_active_subscription,
+            trial_end_date=trial_end_date,
+            subscription_end_date=subscription_end_date,
+            all_subjects=all_subjects,
+            subject_ids=frozenset(subject_ids),
+            valid_until=min(expiries) if expiries else None,
+        )
+
+    @classmethod
+    def from_subscriptions(cls, student_id: int, subscriptions: Iterable,
+                           now: Optional[float] = None) -> "StudentEntitlement":
+        return cls.from_grants(student_id, grants_from_subscriptions(subscriptions, now), now)
+
+
+def grants_from_subscriptions(subscriptions: Iterable, now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    The access rules: an unexpired trial grants every subject; an unexpired
+    active subscription grants every subject on a premium plan, otherwise its
+    subject (if any).
+    """
+    now = time.time() if now is None else now
+    grants = []
+    for sub in subscriptions:
+        trial_end = _timestamp(sub.trial_end_date)
+        if sub.status == "trial" and trial_end is not None and trial_end > now:
+            grants.append({
+                "subscription_id": sub.id, "kind": GRANT_TRIAL, "subject_id": None,
+                "all_subjects": True, "valid_until": sub.trial_end_date,
+            })
+
+        end = _timestamp(sub.end_date)
+        if sub.status == "active" and (end is None or end > now):
+            premium = bool(sub.plan and sub.plan.plan_type == "premium")
+            grants.append({
+                "subscription_id": sub.id, "kind": GRANT_SUBSCRIPTION,
+                "subject_id": None if premium else getattr(sub, "subject_id", None),
+                "all_subjects": premium, "valid_until": sub.end_date,
+            })
+    return grants
+
+
+class EntitlementCache:
+    def __init__(self, ttl_seconds: float = settings.ENTITLEMENT_CACHE_TTL_SECONDS,
+                 max_entries: int = settings.ENTITLEMENT_CACHE_MAX_ENTRIES,
+                 negative_ttl_seconds: float = settings.ENTITLEMENT_CACHE_NEGATIVE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, StudentEntitlement]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, student_id: int) -> Optional[StudentEntitlement]:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if entry is None:
+                return None
+            expires_at, entitlement = entry
+            if expires_at <= time.time():
+                del self._entries[student_id]
+                return None
+            self._entries.move_to_end(student_id)
+            return entitlement
+
+    def put(self, entitlement: StudentEntitlement) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        ttl = self.ttl_seconds
+        if not entitlement.can_access_courses:
+            # A payment applied on another worker only invalidates that worker's cache;
+            # keep "no access" short so the student isn't refused for the full TTL
+            ttl = min(ttl, self.negative_ttl_seconds)
+        expires_at = time.time() + ttl
+        if entitlement.valid_until is not None:
+            expires_at = min(expires_at, entitlement.valid_until)
+        with self._lock:
+            self._entries.pop(entitlement.student_id, None)
+            self._entries[entitlement.student_id] = (expires_at, entitlement)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: Optional[int]) -> None:
+        """Drop cached entitlements (pass both student and parent id of a changed subscription)."""
+        with self._lock:
+            for user_id in user_ids:
+                if user_id is not None:
+                    self._entries.pop(user_id, None)
+
+    def invalidate_subscription(self, subscription) -> None:
+        if subscription is not None:
+            self.invalidate(subscription.student_id, subscription.parent_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton
+entitlement_cache = EntitlementCache()
@@ -0,0 +1,69 @@
+# app/core/notification_counts.py
+"""
+Short-lived cache of unread-notification counts.
+
+Clients poll GET /notifications/count, which used to run a COUNT(*) over the
+user's notifications every time. The count is now maintained in
+user_community_counters.unread_notifications (crud.community updates it in
+the same transaction as the notification write), and this cache keeps the
+value for NOTIFICATION_COUNT_CACHE_TTL_SECONDS so most polls skip the
+database entirely.
+
+The cache is per process: notification writes call invalidate() after they
+commit, and the short TTL bounds staleness across workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+
+class NotificationCountCache:
+    def __init__(self, ttl_seconds: float = settings.NOTIFICATION_COUNT_CACHE_TTL_SECONDS,
+                 max_entries: int = settings.NOTIFICATION_COUNT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[int]:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, count = entry
+            if expires_at <= time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return count
+
+    def put(self, user_id: int, count: int) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = (time.time() + self.ttl_seconds, count)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: Optional[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                if user_id is not None:
+                    self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton
+notification_count_cache = NotificationCountCache()
@@ -0,0 +1,236 @@
+# app/core/notification_hub.py
+"""
+Push channel for notifications (GET /notifications/stream, Server-Sent Events).
+
+Open streams subscribe to an in-process hub keyed by user id. After a
+notification write commits, crud.community publishes two kinds of events for
+each affected user:
+
+    notification   the new notification (id, title, message, created_at, ...)
+    count          the user's unread count, e.g. {"unread": 3}
+
+On PostgreSQL, events go through NOTIFY on NOTIFICATION_STREAM_CHANNEL, and
+every worker LISTENs (listen_forever, started from app startup) and delivers
+them to its own streams, so a write on any worker or in the scheduler reaches
+every open tab. Elsewhere (SQLite, a single process) they're delivered
+directly.
+
+Memory is bounded per connection: each stream has a queue of at most
+NOTIFICATION_STREAM_QUEUE_SIZE events, and a user can hold at most
+NOTIFICATION_STREAM_MAX_CONNECTIONS_PER_USER streams. A client that doesn't
+keep up doesn't block publishers: when its queue is full the backlog is
+dropped and replaced by one "resync" event, telling it to refetch the list
+and count. Streams also get "resync" after the LISTEN connection was lost,
+since NOTIFY doesn't replay what was missed.
+
+A stream's slot is released by SubscriptionStreamingResponse when the
+response ends, however it ends: if the client disconnects while the headers
+are being sent, the body generator never starts and its own cleanup never
+runs.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_NOTIFICATION = "notification"
+EVENT_COUNT = "count"
+EVENT_RESYNC = "resync"
+
+MAX_NOTIFY_PAYLOAD = 7900  # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+
+Event = Tuple[str, Dict[str, Any]]  # (event type, data)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class StreamSubscription:
+    def __init__(self, user_id: int, max_events: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max_events)
+        self.dropped = 0
+
+    def offer(self, event: Event) -> None:
+        """Queue an event (event loop thread only); on overflow swap the backlog for a resync"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait((EVENT_RESYNC, {}))  # covers this event too
+            return
+        self.queue.put_nowait(event)
+
+
+class SubscriptionStreamingResponse(StreamingResponse):
+    """StreamingResponse that unsubscribes when it finishes, even if the body was never iterated"""
+
+    def __init__(self, hub: "NotificationHub", subscription: StreamSubscription, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hub = hub
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.hub.unsubscribe(self.subscription)
+
+
+class NotificationHub:
+    def __init__(self, queue_size: int = settings.NOTIFICATION_STREAM_QUEUE_SIZE,
+                 max_connections_per_user: int = settings.NOTIFICATION_STREAM_MAX_CONNECTIONS_PER_USER,
+                 channel: str = settings.NOTIFICATION_STREAM_CHANNEL,
+                 fanout: Optional[bool] = None):
+        if fanout is None:
+            fanout = (settings.NOTIFICATION_STREAM_PG_FANOUT
+                      and make_url(settings.DATABASE_URL).get_backend_name() == "postgresql")
+        self.queue_size = queue_size
+        self.max_connections_per_user = max_connections_per_user
+        self.channel = channel
+        self.fanout = fanout
+        self._subscribers: Dict[int, Set[StreamSubscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    # Streams (event loop)
+    def subscribe(self, user_id: int) -> Optional[StreamSubscription]:
+        """A new stream for the user, or None when they already hold the maximum"""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            streams = self._subscribers.setdefault(user_id, set())
+            if len(streams) >= self.max_connections_per_user:
+                return None
+            subscription = StreamSubscription(user_id, self.queue_size)
+            streams.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: StreamSubscription) -> None:
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(streams) for streams in self._subscribers.values())
+
+    async def stream(self, subscription: StreamSubscription, initial: Iterable[Event],
+                     is_disconnected: Callable[[], Awaitable[bool]],
+                     heartbeat_seconds: float = settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """SSE body: the initial events, then published ones, with comment heartbeats while idle"""
+        try:
+            yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            for event, data in initial:
+                yield format_sse(event, data)
+            while not await is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            self.unsubscribe(subscription)
+
+    # Publishing (any thread, after the write has committed)
+    def wants(self, user_id: int) -> bool:
+        """Whether events for this user can reach a stream (so callers can skip building them)"""
+        return self.fanout or user_id in self._subscribers
+
+    def publish(self, events: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+        """Publish (user id, event type, data) triples"""
+        if not events:
+            return
+        if self.fanout:
+            self._notify(events)
+        else:
+            self.dispatch(events)
+
+    def dispatch(self, events: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+        """Deliver to this process's streams"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        events = [event for event in events if event[0] in self._subscribers]
+        if events:
+            loop.call_soon_threadsafe(self._deliver, events)
+
+    def _deliver(self, events: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            targets = [(set(self._subscribers.get(user_id, ())), (event, data)) for user_id, event, data in events]
+        for streams, event in targets:
+            for subscription in streams:
+                subscription.offer(event)
+
+    def _resync_all(self) -> None:
+        with self._lock:
+            user_ids = list(self._subscribers)
+        self.dispatch([(user_id, EVENT_RESYNC, {}) for user_id in user_ids])
+
+    # PostgreSQL fan-out
+    def _notify(self, events: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+        from app.core.database import engine
+
+        payloads = []
+        for user_id, event, data in events:
+            payload = json.dumps({"u": user_id, "e": event, "d": data}, separators=(",", ":"))
+            if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+                payload = json.dumps({"u": user_id, "e": EVENT_RESYNC, "d": {}})
+            payloads.append({"channel": self.channel, "payload": payload})
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), payloads)
+        except Exception:
+            # Streams are best effort; the notification itself is already committed
+            logger.exception("Failed to publish %d notification events", len(payloads))
+
+    def _on_pg_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+            self.dispatch([(int(message["u"]), message["e"], message["d"])])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed notification event: %r", payload[:200])
+
+    async def listen_forever(self) -> None:
+        """Background task: LISTEN on the channel and feed this process's streams"""
+        import asyncpg
+
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._loop = asyncio.get_running_loop()
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(self.channel, self._on_pg_notify)
+                while not connection.is_closed():
+                    await asyncio.sleep(settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification LISTEN connection failed")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            # Events published while disconnected are gone; have clients refetch
+            self._resync_all()
+            await asyncio.sleep(settings.NOTIFICATION_STREAM_RETRY_MS / 1000)
+
+
+# Singleton
+notification_hub = NotificationHub()
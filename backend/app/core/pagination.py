@@ -0,0 +1,106 @@
+# app/core/pagination.py
+"""
+Keyset (cursor) pagination and streaming exports.
+
+Lists are ordered newest first on (created_at, id) and a page is fetched
+with "WHERE (created_at, id) < (cursor)" instead of OFFSET, so every page
+costs the same no matter how deep the client goes and rows inserted while
+paging don't shift it. The cursor is opaque to clients (base64 of the last
+row's created_at and id). List endpoints keep returning a plain JSON array;
+the next cursor travels in the X-Next-Cursor and Link headers. Paging is
+opt-in: a request without limit or cursor still gets every row, as before
+pagination existed.
+
+Exports stream rows from a server-side cursor (yield_per) straight into a
+JSON array or CSV body, so memory stays flat regardless of table size.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_page(query, model, cursor: Optional[str] = None,
+                limit: Optional[int] = DEFAULT_PAGE_SIZE) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of `query` (newest first on model.created_at, model.id) and the cursor of the next page.
+    limit=None without a cursor returns every row (unpaged requests); with a cursor it means DEFAULT_PAGE_SIZE.
+    """
+    if cursor:
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if limit is None:
+        if not cursor:
+            return query.all(), None
+        limit = DEFAULT_PAGE_SIZE
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def set_next_cursor(request: Request, response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+
+def stream_rows(session_factory, statement, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Rows of `statement` as dicts, fetched batch by batch from a server-side cursor."""
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        db.close()
+
+
+def json_array_stream(rows: Iterable[dict]) -> Iterator[str]:
+    yield "["
+    for n, row in enumerate(rows):
+        yield ("," if n else "") + json.dumps(jsonable_encoder(row))
+    yield "]"
+
+
+def csv_stream(rows: Iterable[dict], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(columns)
+    yield flush()
+    for row in rows:
+        row = jsonable_encoder(row)
+        writer.writerow([row.get(column) for column in columns])
+        yield flush()
@@ -0,0 +1,247 @@
+# app/core/pricing_catalog.py
+"""
+Versioned pricing catalog.
+
+Plans, their features and subjects, the subject count and the pricing
+constants are loaded once (four queries) into an immutable PricingCatalog
+that answers pricing pages and price calculations without touching the
+database. The catalog's version is a hash of its content, so every worker
+serving the same plans hands out the same ETag.
+
+The catalog is cached per process: the plan, feature and plan-subject crud
+writes call invalidate(); PRICING_CATALOG_TTL_SECONDS bounds staleness
+across workers.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.constants import (
+    BASIC_PLAN_PRICE_PER_SUBJECT, BILLING_CYCLE_ANNUAL, BILLING_CYCLE_MONTHLY,
+    DEFAULT_YEARLY_DISCOUNT_PERCENTAGE, PAYMENT_PLAN_BASIC, PAYMENT_PLAN_PREMIUM, PREMIUM_PLAN_PRICE,
+)
+from app.core.config import settings
+
+FREE_TRIAL_DAYS = 15
+
+PLAN_TYPES = (
+    {
+        "type": PAYMENT_PLAN_BASIC,
+        "description": "Covers exactly one subject",
+        "price_description": "$25 USD per month per student per subject"
+    },
+    {
+        "type": PAYMENT_PLAN_PREMIUM,
+        "description": "Covers all subjects (Math, Science, English, Humanities)",
+        "price_description": "$80 USD per month per student"
+    },
+)
+
+
+def yearly_price(monthly_price) -> Decimal:
+    """Twelve months less the yearly discount."""
+    yearly_discount = Decimal(DEFAULT_YEARLY_DISCOUNT_PERCENTAGE / 100)
+    return Decimal(monthly_price) * Decimal(12) * (Decimal(1.0) - yearly_discount)
+
+
+@dataclass(frozen=True)
+class PlanPricing:
+    id: int
+    name: str
+    description: Optional[str]
+    plan_type: str
+    base_price: Optional[Decimal]  # as stored on the plan
+    discount_percentage: Optional[Decimal]
+    currency: str
+    trial_days: int
+    yearly_discount: Optional[Decimal]
+    is_active: bool
+    sort_order: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    features: Tuple[Tuple[str, Optional[str]], ...] = ()  # (name, description)
+    subjects: Tuple[Tuple[int, str], ...] = ()  # (subject_id, name), Basic plans only
+
+    @classmethod
+    def from_plan(cls, plan, features=(), subjects=()) -> "PlanPricing":
+        return cls(
+            id=plan.id,
+            name=plan.name,
+            description=plan.description,
+            plan_type=plan.plan_type,
+            base_price=plan.base_price,
+            discount_percentage=plan.discount_percentage,
+            currency=plan.currency,
+            trial_days=plan.trial_days,
+            yearly_discount=plan.yearly_discount,
+            is_active=plan.is_active,
+            sort_order=plan.sort_order,
+            created_at=plan.created_at,
+            updated_at=plan.updated_at,
+            features=tuple(features),
+            subjects=tuple(subjects),
+        )
+
+    @property
+    def list_price(self) -> float:
+        """Monthly price from the pricing constants (per subject for Basic)."""
+        return BASIC_PLAN_PRICE_PER_SUBJECT if self.plan_type == PAYMENT_PLAN_BASIC else PREMIUM_PLAN_PRICE
+
+    def price(self, num_subjects: int = 1, billing_cycle: str = BILLING_CYCLE_ANNUAL):
+        """Same rules as crud.billing.calculate_subscription_price."""
+        if billing_cycle == BILLING_CYCLE_ANNUAL:
+            return round(yearly_price(self.base_price), 2)
+        if self.plan_type == PAYMENT_PLAN_BASIC:
+            return round(BASIC_PLAN_PRICE_PER_SUBJECT * num_subjects, 2)
+        return round(PREMIUM_PLAN_PRICE, 2)
+
+
+@dataclass(frozen=True)
+class PricingCatalog:
+    plans: Tuple[PlanPricing, ...]
+    total_subjects: int
+    version: str
+    built_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def plan(self, plan_id: int) -> Optional[PlanPricing]:
+        for plan in self.plans:
+            if plan.id == plan_id:
+                return plan
+        return None
+
+    def subscription_plans(self) -> List[Dict[str, Any]]:
+        """The /billing/subscription-plans payload: list prices with the yearly price."""
+        return [
+            {
+                "id": plan.id,
+                "name": plan.name,
+                "description": plan.description,
+                "base_price": plan.list_price,
+                "discount_percentage": plan.discount_percentage,
+                "currency": plan.currency,
+                "trial_days": plan.trial_days,
+                "yearly_discount": plan.yearly_discount,
+                "is_active": plan.is_active,
+                "sort_order": plan.sort_order,
+                "plan_type": plan.plan_type,
+                "yearly_price": yearly_price(plan.list_price),
+                "created_at": plan.created_at,
+                "updated_at": plan.updated_at,
+            }
+            for plan in self.plans
+        ]
+
+    def pricing_options(self) -> Dict[str, Any]:
+        pricing_options = []
+        for plan in self.plans:
+            pricing_options.append({
+                "plan_id": plan.id,
+                "name": plan.name,
+                "description": plan.description,
+                "plan_type": plan.plan_type,
+                "trial_days": plan.trial_days,
+                "monthly_price": plan.price(1, BILLING_CYCLE_MONTHLY),
+                "yearly_price": plan.price(1, BILLING_CYCLE_ANNUAL) if plan.base_price is not None else None,
+                "currency": plan.currency,
+                "features": [{"name": name, "description": description} for name, description in plan.features],
+                "subjects": [
+                    {"subject_id": subject_id, "name": name, "description": None}
+                    for subject_id, name in plan.subjects
+                ] if plan.plan_type == PAYMENT_PLAN_BASIC else ["all"]
+            })
+
+        return {
+            "pricing_options": pricing_options,
+            "free_trial_days": FREE_TRIAL_DAYS,
+            "available_billing_cycles": [BILLING_CYCLE_MONTHLY, BILLING_CYCLE_ANNUAL],
+            "total_subjects_available": self.total_subjects,
+            "plan_types": [dict(plan_type) for plan_type in PLAN_TYPES],
+            "version": self.version,
+        }
+
+    @classmethod
+    def build(cls, plans: List[PlanPricing], total_subjects: int) -> "PricingCatalog":
+        content = json.dumps(
+            {
+                "plans": [plan.__dict__ for plan in plans],
+                "total_subjects": total_subjects,
+                "constants": [BASIC_PLAN_PRICE_PER_SUBJECT, PREMIUM_PLAN_PRICE, DEFAULT_YEARLY_DISCOUNT_PERCENTAGE,
+                              FREE_TRIAL_DAYS, PLAN_TYPES],
+            },
+            sort_keys=True, default=str,
+        )
+        version = hashlib.sha256(content.encode()).hexdigest()[:16]
+        return cls(plans=tuple(plans), total_subjects=total_subjects, version=version, built_at=time.time())
+
+    @classmethod
+    def load(cls, db) -> "PricingCatalog":
+        from app.models.billing import PlanFeature, PlanSubject, SubscriptionPlan
+        from app.models.subject import Subject
+
+        rows = db.query(SubscriptionPlan).filter(
+            SubscriptionPlan.is_active == True
+        ).order_by(SubscriptionPlan.sort_order, SubscriptionPlan.id).all()
+        plan_ids = [row.id for row in rows]
+
+        features: Dict[int, List[Tuple[str, Optional[str]]]] = {plan_id: [] for plan_id in plan_ids}
+        plan_subject_ids: Dict[int, List[int]] = {plan_id: [] for plan_id in plan_ids}
+        if plan_ids:
+            for feature in db.query(PlanFeature).filter(PlanFeature.plan_id.in_(plan_ids)).order_by(PlanFeature.id):
+                features[feature.plan_id].append((feature.feature_name, feature.feature_description))
+            for plan_subject in db.query(PlanSubject).filter(PlanSubject.plan_id.in_(plan_ids)).order_by(PlanSubject.id):
+                subject_id = getattr(plan_subject, "subject_id", None)
+                if subject_id is not None:
+                    plan_subject_ids[plan_subject.plan_id].append(subject_id)
+
+        subject_names = dict(db.query(Subject.id, Subject.name).all())
+
+        plans = [
+            PlanPricing.from_plan(
+                row,
+                features=features[row.id],
+                subjects=[
+                    (subject_id, subject_names[subject_id])
+                    for subject_id in plan_subject_ids[row.id] if subject_id in subject_names
+                ],
+            )
+            for row in rows
+        ]
+        return cls.build(plans, len(subject_names))
+
+
+class PricingCatalogCache:
+    def __init__(self, ttl_seconds: float = settings.PRICING_CATALOG_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._catalog: Optional[PricingCatalog] = None
+        self._generation = 0  # bumped by invalidate() so a load racing a plan write isn't cached
+        self._lock = threading.Lock()
+
+    def get(self, db) -> PricingCatalog:
+        catalog = self._catalog
+        if catalog is not None and time.time() - catalog.built_at < self.ttl_seconds:
+            return catalog
+
+        generation = self._generation
+        catalog = PricingCatalog.load(db)
+        with self._lock:
+            if generation == self._generation and self.ttl_seconds > 0:
+                self._catalog = catalog
+        return catalog
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._catalog = None
+
+
+# Singleton
+pricing_catalog = PricingCatalogCache()
@@ -0,0 +1,128 @@
+# app/core/principal_cache.py
+"""
+Short-lived cache of authenticated principals.
+
+get_current_user used to decode the JWT and load the user (joined with the
+student profile) on every request. The cache maps a bearer token to an
+immutable Principal snapshot for PRINCIPAL_CACHE_TTL_SECONDS (never past the
+token's own expiry), so repeat requests skip both the decode and the query.
+Hits still consult the token revocation list, so logout takes effect at once.
+
+The cache is per process: writes that change a snapshot field call
+invalidate_user() (see crud/user.py and crud/student.py), and the short TTL
+bounds staleness across workers.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.token_revocation import revocation_list
+from app.models.user import User, UserRole
+
+
+@dataclass(frozen=True)
+class StudentProfileRef:
+    id: int
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only view of the authenticated user; exposes what handlers read from current_user."""
+    id: int
+    role: UserRole
+    is_active: bool
+    username: Optional[str]
+    full_name: Optional[str]
+    email: Optional[str]
+    student_profile_id: Optional[int]
+
+    @property
+    def student_profile(self) -> Optional[StudentProfileRef]:
+        return StudentProfileRef(self.student_profile_id) if self.student_profile_id is not None else None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=user.is_active,
+            username=user.username,
+            full_name=user.full_name,
+            email=user.email,
+            student_profile_id=user.student_profile.id if user.student_profile else None,
+        )
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float = settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = settings.PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Principal, Optional[str]]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        if self.ttl_seconds <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal, jti = entry
+            if expires_at <= time.time() or revocation_list.is_revoked(jti):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float] = None,
+            jti: Optional[str] = None) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = self._key(token)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (expires_at, principal, jti)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._drop(self._key(token))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in self._by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_user.get(entry[1].id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry[1].id]
+
+
+# Singleton
+principal_cache = PrincipalCache()
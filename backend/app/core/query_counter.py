@@ -0,0 +1,157 @@
+# app/core/query_counter.py
+"""
+Per-request SQL query accounting.
+
+Engine-level event listeners count every statement (and its duration) into
+the QueryStats active for the current context. QueryCounterMiddleware opens a
+QueryStats per HTTP request, reports it via Server-Timing / X-DB-Query-Count
+headers and logs likely N+1 patterns (the same statement shape executed many
+times in one request). assert_max_queries() gives tests a query budget.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+))*\s*\)")
+_NUMBER_LITERAL = re.compile(r"\b\d+\b")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a statement so executions differing only in parameters compare equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+        self.statements: List[str] = []
+
+    def add(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.shapes[statement_shape(statement)] += 1
+        if len(self.statements) < 200:
+            self.statements.append(statement)
+
+    def repeated_shapes(self, threshold: int = settings.DB_N_PLUS_ONE_THRESHOLD):
+        """Statement shapes executed at least `threshold` times (likely N+1)."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_start_time")
+    if not started:
+        return
+    duration_ms = (time.perf_counter() - started.pop()) * 1000
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(statement, duration_ms)
+
+
+def install_query_listeners() -> None:
+    """Attach the counting listeners to every Engine (idempotent)."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_installed = True
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Count queries executed inside the block."""
+    install_query_listeners()
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Fail (AssertionError) when the block executes more than `max_queries` statements."""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {n}x {shape}" for shape, n in stats.shapes.most_common(10))
+        raise AssertionError(f"Expected at most {max_queries} queries, got {stats.count}:\n{listing}")
+
+
+class QueryCounterMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead) that counts the
+    queries of each HTTP request and adds Server-Timing / X-DB-Query-Count.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = settings.DB_N_PLUS_ONE_THRESHOLD,
+                 emit_headers: bool = settings.DB_QUERY_HEADERS):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.emit_headers = emit_headers
+        install_query_listeners()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.emit_headers:
+                app_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", app;dur={app_ms:.1f}'.encode(),
+                ))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+            if repeated:
+                shape, n = repeated[0]
+                logger.warning(
+                    "Possible N+1 on %s %s: %d queries, statement repeated %dx: %s",
+                    scope.get("method"), scope.get("path"), stats.count, n, shape[:300],
+                )
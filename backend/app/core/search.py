@@ -0,0 +1,207 @@
+# app/core/search.py
+"""
+Full-text search over community posts and comments.
+
+Two interchangeable backends answer the same question: "ids and scores of
+the active posts (or comments) matching this query, best first, after this
+cursor".
+
+PostgresFullTextSearch uses the generated, GIN-indexed search_vector columns
+(posts: title weighted above content; comments: content). PostgreSQL keeps
+them current on every insert/update, so nothing is maintained in Python. The
+columns aren't mapped on the models so the tables stay creatable on SQLite;
+see the f9c3e7a1d5b2 migration.
+
+LocalInvertedIndex is an in-process inverted index for SQLite runs (tests,
+local development). It's built from the table on first use and then kept
+current by crud.community calling post_changed / comment_changed after each
+write. Scores are tf-idf; like plainto_tsquery, every term must match.
+
+Results are ranked by (score, id) descending and paginated with a keyset
+cursor on that pair, so deep pages cost the same as the first one.
+"""
+import base64
+import json
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import REAL, cast, func, literal_column, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.community import Comment, Post
+
+SCOPE_POSTS = "posts"
+SCOPE_COMMENTS = "comments"
+SCOPES = (SCOPE_POSTS, SCOPE_COMMENTS)
+
+Cursor = Tuple[float, int]
+Hit = Tuple[int, float]  # (row id, score)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its of on or that the this to was were will with".split()
+)
+
+
+def encode_search_cursor(score: float, row_id: int) -> str:
+    raw = json.dumps([score, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, row_id = json.loads(raw)
+        return float(score), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def search(self, db: Session, scope: str, query: str, after: Optional[Cursor], limit: int) -> List[Hit]:
+        """Up to limit (row id, score) hits after the cursor, best first"""
+
+    def index(self, scope: str, row_id: int, title: str, content: str) -> None:
+        """Called after a row is written; backends whose index lives in the database ignore it"""
+
+    def remove(self, scope: str, row_id: int) -> None:
+        """Called after a row is soft-deleted"""
+
+
+class PostgresFullTextSearch(SearchBackend):
+    def __init__(self, text_config: str = settings.COMMUNITY_SEARCH_TEXT_CONFIG):
+        # Must match the configuration the generated columns were built with
+        self.text_config = text_config
+
+    def search(self, db: Session, scope: str, query: str, after: Optional[Cursor], limit: int) -> List[Hit]:
+        model = Post if scope == SCOPE_POSTS else Comment
+        vector = literal_column(f"{model.__tablename__}.search_vector")
+        ts_query = func.websearch_to_tsquery(self.text_config, query)
+        score = func.ts_rank_cd(vector, ts_query)
+        stmt = select(model.id, score.label("score")).where(vector.op("@@")(ts_query), model.is_active.is_(True))
+        if after is not None:
+            stmt = stmt.where(tuple_(score, model.id) < tuple_(cast(after[0], REAL), after[1]))
+        rows = db.execute(stmt.order_by(score.desc(), model.id.desc()).limit(limit)).all()
+        return [(row.id, row.score) for row in rows]
+
+
+class LocalInvertedIndex(SearchBackend):
+    TITLE_WEIGHT = 2.0  # like setweight(..., 'A') on the title in PostgreSQL
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, Dict[int, float]]] = {}  # scope -> token -> {row id: weight}
+        self._documents: Dict[str, Dict[int, Dict[str, float]]] = {}  # scope -> row id -> {token: weight}
+        self._lock = threading.Lock()
+
+    def _weights(self, title: str, content: str) -> Dict[str, float]:
+        weights: Dict[str, float] = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += self.TITLE_WEIGHT
+        for token in tokenize(content):
+            weights[token] += 1.0
+        return dict(weights)
+
+    def _add(self, scope: str, row_id: int, weights: Dict[str, float]) -> None:
+        self._remove(scope, row_id)
+        self._documents[scope][row_id] = weights
+        for token, weight in weights.items():
+            self._postings[scope].setdefault(token, {})[row_id] = weight
+
+    def _remove(self, scope: str, row_id: int) -> None:
+        for token in self._documents[scope].pop(row_id, {}):
+            postings = self._postings[scope][token]
+            postings.pop(row_id, None)
+            if not postings:
+                del self._postings[scope][token]
+
+    def _ensure_built(self, db: Session, scope: str) -> None:
+        if scope in self._documents:
+            return
+        if scope == SCOPE_POSTS:
+            rows = db.execute(select(Post.id, Post.title, Post.content).where(Post.is_active.is_(True)))
+        else:
+            rows = db.execute(select(Comment.id, literal_column("''"), Comment.content).where(Comment.is_active.is_(True)))
+        self._documents[scope], self._postings[scope] = {}, {}
+        for row_id, title, content in rows:
+            self._add(scope, row_id, self._weights(title, content))
+
+    def index(self, scope: str, row_id: int, title: str, content: str) -> None:
+        with self._lock:
+            if scope in self._documents:  # not built yet: the build will read the row
+                self._add(scope, row_id, self._weights(title, content))
+
+    def remove(self, scope: str, row_id: int) -> None:
+        with self._lock:
+            if scope in self._documents:
+                self._remove(scope, row_id)
+
+    def search(self, db: Session, scope: str, query: str, after: Optional[Cursor], limit: int) -> List[Hit]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built(db, scope)
+            postings = [self._postings[scope].get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            total = len(self._documents[scope])
+            matches = set.intersection(*(set(p) for p in postings))
+            hits = []
+            for row_id in matches:
+                score = sum(p[row_id] * math.log(1 + total / len(p)) for p in postings)
+                hits.append((row_id, round(score, 6)))
+        if after is not None:
+            hits = [(row_id, score) for row_id, score in hits if (score, row_id) < after]
+        hits.sort(key=lambda hit: (hit[1], hit[0]), reverse=True)
+        return hits[:limit]
+
+
+class CommunitySearch:
+    def __init__(self, backend: str = settings.COMMUNITY_SEARCH_BACKEND):
+        self.backend = backend
+        self.postgres = PostgresFullTextSearch()
+        self.local = LocalInvertedIndex()
+
+    def backend_for(self, db: Session) -> SearchBackend:
+        backend = self.backend
+        if backend == "auto":
+            backend = "postgres" if db.get_bind().dialect.name == "postgresql" else "local"
+        return self.postgres if backend == "postgres" else self.local
+
+    def search(self, db: Session, scope: str, query: str, cursor: Optional[str] = None,
+               limit: int = settings.COMMUNITY_FEED_PAGE_SIZE) -> Tuple[List[Hit], Optional[str]]:
+        """One page of (id, score) hits, best first, and the next page's cursor"""
+        after = decode_search_cursor(cursor) if cursor else None
+        hits = self.backend_for(db).search(db, scope, query, after, limit + 1)
+        if len(hits) <= limit:
+            return hits, None
+        hits = hits[:limit]
+        return hits, encode_search_cursor(hits[-1][1], hits[-1][0])
+
+    # Write hooks (crud.community), only the local index needs them
+    def post_changed(self, post: Post) -> None:
+        if post.is_active:
+            self.local.index(SCOPE_POSTS, post.id, post.title, post.content)
+        else:
+            self.local.remove(SCOPE_POSTS, post.id)
+
+    def comment_changed(self, comment: Comment) -> None:
+        if comment.is_active:
+            self.local.index(SCOPE_COMMENTS, comment.id, "", comment.content)
+        else:
+            self.local.remove(SCOPE_COMMENTS, comment.id)
+
+
+# Singleton
+community_search = CommunitySearch()
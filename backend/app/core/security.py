@@ -1,8 +1,14 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Dict, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.token_revocation import revocation_list
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -15,7 +21,7 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": str(uuid.uuid4())}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -25,11 +31,98 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_token(token: str) -> Union[str, None]:
+def decode_token(token: str) -> Union[dict, None]:
+    """Return the verified JWT claims, or None if the token is invalid, expired or revoked."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        return payload.get("sub")
     except jwt.JWTError:
         return None
+    if revocation_list.is_revoked(payload.get("jti")):
+        return None
+    return payload
+
+def verify_token(token: str) -> Union[str, None]:
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
+
+
+# ---------------------
+# Password hashing pool
+# ---------------------
+class PasswordHashPoolBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503 + Retry-After."""
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for bcrypt work so hashing never runs on the event loop.
+    bcrypt releases the GIL while hashing, so threads give real parallelism.
+    At most `max_pending` calls may be queued or running; beyond that new
+    calls fail fast with PasswordHashPoolBusy instead of piling up.
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS,
+                 max_pending: int = settings.PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHashPoolBusy("Password hashing queue is full")
+            self._pending += 1
+        enqueued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_ms_total += (started - enqueued) * 1000
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_ms_total += (time.perf_counter() - started) * 1000
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(job))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending - self._running,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_ms_total / completed, 2),
+                "avg_hash_ms": round(self._run_ms_total / completed, 2),
+            }
+
+
+# Singleton
+password_hash_pool = PasswordHashPool()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
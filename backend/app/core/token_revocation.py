@@ -0,0 +1,126 @@
+# app/core/token_revocation.py
+"""
+In-memory revocation list for access tokens.
+
+Revoked jtis live in the revoked_tokens table (shared by all workers) and are
+mirrored here. A Bloom filter sits in front of the exact set, so the common
+case (a token that was never revoked) is a few bit tests and no dict lookup
+or DB query. The filter can't delete entries, so it's rebuilt from the exact
+set whenever the list is synced from the database.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, capacity: int = settings.TOKEN_REVOCATION_BLOOM_CAPACITY):
+        self.capacity = capacity
+        self._revoked: Dict[str, float] = {}  # jti -> token expiry (unix time)
+        self._added_at: Dict[str, float] = {}  # local revocations, kept across a concurrent sync
+        self._bloom = BloomFilter(capacity)
+        self._lock = threading.Lock()
+        self.last_sync: Optional[float] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or jti not in self._bloom:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._added_at[jti] = time.time()
+            self._bloom.add(jti)
+
+    def replace(self, entries: Iterable[tuple], snapshot_started: float = 0.0) -> None:
+        """
+        Swap in a fresh (jti, expires_at) set and rebuild the filter without
+        expired jtis. Local revocations made after `snapshot_started` are kept.
+        """
+        now = time.time()
+        revoked = {jti: exp for jti, exp in entries if exp > now}
+        with self._lock:
+            for jti, added in self._added_at.items():
+                if added >= snapshot_started and jti in self._revoked:
+                    revoked[jti] = self._revoked[jti]
+            bloom = BloomFilter(max(self.capacity, len(revoked)))
+            for jti in revoked:
+                bloom.add(jti)
+            self._revoked, self._bloom = revoked, bloom
+            self._added_at = {jti: t for jti, t in self._added_at.items() if t >= snapshot_started}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    # ---------------------
+    # Database backing
+    # ---------------------
+    def revoke(self, db, jti: str, expires_at: datetime, user_id: Optional[int] = None) -> None:
+        """Persist a revoked jti and add it locally (other workers pick it up on their next sync)."""
+        from app.models.auth_token import RevokedToken
+
+        if db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+            db.commit()
+        self.add(jti, expires_at.timestamp())
+
+    def sync_from_db(self) -> None:
+        from app.core.database import SessionLocal
+        from app.models.auth_token import RevokedToken
+
+        started = time.time()
+        db = SessionLocal()
+        try:
+            rows = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+                RevokedToken.expires_at > datetime.now(timezone.utc)
+            ).all()
+        finally:
+            db.close()
+        self.replace(((jti, exp.timestamp()) for jti, exp in rows), snapshot_started=started)
+        self.last_sync = time.time()
+
+
+# Singleton
+revocation_list = RevocationList()
+
+
+async def revocation_sync_loop(interval: float = settings.TOKEN_REVOCATION_SYNC_SECONDS) -> None:
+    """Background task: periodically reload revoked jtis (run from app startup)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, revocation_list.sync_from_db)
+        except Exception:
+            logger.exception("Failed to sync token revocation list")
+        await asyncio.sleep(interval)
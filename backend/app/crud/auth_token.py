@@ -0,0 +1,91 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.auth_token import RefreshToken
+
+
+def hash_refresh_token(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+def create_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> Tuple[RefreshToken, str]:
+    """Create a refresh token; returns the row and the raw token (only ever handed to the client)."""
+    raw_token = secrets.token_urlsafe(48)
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(raw_token),
+        family_id=family_id or str(uuid.uuid4()),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(db_token)
+    db.commit()
+    db.refresh(db_token)
+    return db_token, raw_token
+
+def get_refresh_token(db: Session, raw_token: str) -> Optional[RefreshToken]:
+    return db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(raw_token)).first()
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> int:
+    """Revoke every still-active token of a login session."""
+    count = db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+    return count
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _reissue_or_revoke(db: Session, db_token: RefreshToken) -> Optional[Tuple[RefreshToken, str]]:
+    """
+    Handle a refresh with an already rotated token. Within
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS of the rotation, while the family is still
+    live, it's a concurrent refresh (two tabs sharing a session) and gets its own
+    token in the family. Anything later revokes the whole family (likely theft).
+    """
+    rotated_at = _as_utc(db_token.revoked_at)
+    grace_start = datetime.now(timezone.utc) - timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+    family_live = db.query(RefreshToken.id).filter(
+        RefreshToken.family_id == db_token.family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).first() is not None
+    if rotated_at > grace_start and family_live:
+        return create_refresh_token(db, db_token.user_id, family_id=db_token.family_id)
+    revoke_refresh_token_family(db, db_token.family_id)
+    return None
+
+def rotate_refresh_token(db: Session, raw_token: str) -> Optional[Tuple[RefreshToken, str]]:
+    """
+    Exchange a refresh token for a new one in the same family. Returns None if
+    the token is unknown or expired, or was rotated more than
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS ago (which also revokes the family).
+    """
+    db_token = get_refresh_token(db, raw_token)
+    if not db_token:
+        return None
+
+    if db_token.revoked_at is not None:
+        return _reissue_or_revoke(db, db_token)
+
+    if _as_utc(db_token.expires_at) <= datetime.now(timezone.utc):
+        return None
+
+    # Claim the token atomically so two concurrent refreshes can't both rotate it
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == db_token.id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+    if not claimed:
+        # A concurrent refresh rotated it first
+        db.rollback()
+        db.refresh(db_token)
+        return _reissue_or_revoke(db, db_token)
+
+    new_token, new_raw = create_refresh_token(db, db_token.user_id, family_id=db_token.family_id)
+    db_token.replaced_by_id = new_token.id
+    db.commit()
+    return new_token, new_raw
@@ -1,9 +1,14 @@
-from sqlalchemy.orm import Session
-from decimal import Decimal
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from datetime import datetime, timedelta
-from app.crud.user import get_user
-from app.models.billing import Subscription, Payment, BillingInfo, Invoice, SubscriptionPlan, PlanFeature, PlanSubject, TrialExtension
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, distinct, func, or_, select
+from app.core.entitlement_cache import entitlement_cache, grants_from_subscriptions
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page
+from app.core.pricing_catalog import PlanPricing, pricing_catalog
+from app.models.billing import (
+    Subscription, Payment, BillingInfo, Invoice, SubscriptionPlan, PlanFeature, PlanSubject, TrialExtension,
+    EntitlementGrant, SubscriptionStatus, PaymentStatus
+)
 from app.schemas.billing import (
     SubscriptionCreate, SubscriptionUpdate, PaymentCreate, PaymentUpdate,
     BillingInfoCreate, BillingInfoUpdate, InvoiceCreate, InvoiceUpdate,
@@ -12,9 +17,7 @@ from app.schemas.billing import (
 )
 
 from app.constants import (
-    BASIC_PLAN_PRICE_PER_SUBJECT, PREMIUM_PLAN_PRICE, DEFAULT_YEARLY_DISCOUNT_PERCENTAGE,
-    BILLING_CYCLE_ANNUAL, DEFAULT_TRIAL_PERIOD_DAYS, DEFAULT_YEARLY_DISCOUNT_PERCENTAGE,
-    PAYMENT_PLAN_BASIC
+    BILLING_CYCLE_ANNUAL, DEFAULT_TRIAL_PERIOD_DAYS, DEFAULT_YEARLY_DISCOUNT_PERCENTAGE
 )
 
 # Subscription CRUD operations
@@ -33,7 +36,8 @@ def create_trial_subscription(db: Session, parent_id: int, student_id: int, tria
     )
 
     db.add(db_subscription)
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, db_subscription.student_id)
     db.refresh(db_subscription)
     return db_subscription
 
@@ -53,7 +57,8 @@ def create_subscription(db: Session, subscription: SubscriptionCreate, parent_id
     )
 
     db.add(db_subscription)
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, db_subscription.student_id)
     db.refresh(db_subscription)
     return db_subscription
 
@@ -73,6 +78,10 @@ def get_all_subscriptions(db: Session) -> List[Subscription]:
     """Get all subscriptions"""
     return db.query(Subscription).all()
 
+def get_subscriptions_page(db: Session, cursor: Optional[str] = None, limit: Optional[int] = DEFAULT_PAGE_SIZE):
+    """One page of all subscriptions, newest first, and the next page's cursor"""
+    return keyset_page(db.query(Subscription), Subscription, cursor, limit)
+
 def update_subscription(db: Session, subscription_id: int, subscription_update: SubscriptionUpdate):
     """Update a subscription"""
     db_subscription = get_subscription(db, subscription_id)
@@ -82,7 +91,8 @@ def update_subscription(db: Session, subscription_id: int, subscription_update:
     for key, value in subscription_update.dict(exclude_unset=True).items():
         setattr(db_subscription, key, value)
 
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, db_subscription.student_id)
     db.refresh(db_subscription)
     return db_subscription
 
@@ -94,7 +104,8 @@ def cancel_subscription(db: Session, subscription_id: int):
 
     db_subscription.status = "cancelled"
     db_subscription.end_date = datetime.now()
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, db_subscription.student_id)
     db.refresh(db_subscription)
     return db_subscription
 
@@ -104,21 +115,23 @@ def delete_subscription(db: Session, subscription_id: int) -> bool:
     if not db_subscription:
         return False
 
+    student_id = db_subscription.student_id
     db.delete(db_subscription)
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, student_id)
     return True
 
 def get_active_subscriptions(db: Session, user_id: Optional[int] = None) -> List[Subscription]:
     """Get all active subscriptions for a user (parent or student)"""
     # Check if this is a parent user by looking for subscriptions where they are the parent
-    parent_subscriptions = db.query(Subscription).filter(
+    parent_subscriptions = db.query(Subscription).options(joinedload(Subscription.plan)).filter(
         Subscription.parent_id == user_id,
         Subscription.status.in_(["active", "trial"])
     ).all()
 
     # If no parent subscriptions found, check if this is a student user
     if not parent_subscriptions:
-        student_subscriptions = db.query(Subscription).filter(
+        student_subscriptions = db.query(Subscription).options(joinedload(Subscription.plan)).filter(
             Subscription.student_id == user_id,
             Subscription.status.in_(["active", "trial"])
         ).all()
@@ -126,6 +139,49 @@ def get_active_subscriptions(db: Session, user_id: Optional[int] = None) -> List
 
     return parent_subscriptions
 
+# Materialized entitlements (student_entitlements)
+
+def refresh_student_entitlements(db: Session, student_id: Optional[int]) -> List[EntitlementGrant]:
+    """
+    Rebuild a student's entitlement rows from their subscriptions and drop the
+    cached entitlement. Commits, so callers flush their subscription change
+    first and both land in one transaction.
+    """
+    if student_id is None:
+        db.commit()
+        return []
+    subscriptions = db.query(Subscription).options(joinedload(Subscription.plan)).filter(
+        Subscription.student_id == student_id,
+        Subscription.status.in_(["active", "trial"])
+    ).all()
+
+    db.query(EntitlementGrant).filter(EntitlementGrant.student_id == student_id).delete(synchronize_session=False)
+    grants = [EntitlementGrant(student_id=student_id, **grant) for grant in grants_from_subscriptions(subscriptions)]
+    db.add_all(grants)
+    db.commit()
+    entitlement_cache.invalidate(student_id)
+    return grants
+
+def refresh_plan_entitlements(db: Session, plan_id: int) -> int:
+    """Rebuild entitlements of every student subscribed to a plan"""
+    student_ids = [row.student_id for row in db.query(Subscription.student_id).filter(
+        Subscription.plan_id == plan_id
+    ).distinct()]
+    for student_id in student_ids:
+        refresh_student_entitlements(db, student_id)
+    return len(student_ids)
+
+def get_entitlement_grants(db: Session, student_id: int) -> List[dict]:
+    """Unexpired entitlement rows for a student (single indexed lookup)"""
+    rows = db.query(
+        EntitlementGrant.kind, EntitlementGrant.subject_id,
+        EntitlementGrant.all_subjects, EntitlementGrant.valid_until
+    ).filter(
+        EntitlementGrant.student_id == student_id,
+        or_(EntitlementGrant.valid_until.is_(None), EntitlementGrant.valid_until > datetime.now(timezone.utc))
+    ).all()
+    return [row._asdict() for row in rows]
+
 def get_trial_subscriptions(db: Session, parent_id: int) -> List[Subscription]:
     """Get all trial subscriptions for a parent"""
     return db.query(Subscription).filter(
@@ -181,6 +237,10 @@ def get_payment(db: Session, payment_id: int) -> Optional[Payment]:
     """Get a payment by ID"""
     return db.query(Payment).filter(Payment.id == payment_id).first()
 
+def get_payment_by_transaction_id(db: Session, transaction_id: str) -> Optional[Payment]:
+    """Get a payment by its gateway transaction ID"""
+    return db.query(Payment).filter(Payment.transaction_id == transaction_id).first()
+
 def get_payments_by_subscription(db: Session, subscription_id: int) -> List[Payment]:
     """Get all payments for a subscription"""
     return db.query(Payment).filter(Payment.subscription_id == subscription_id).all()
@@ -196,6 +256,12 @@ def get_payments_by_user(db: Session, user_id: int) -> List[Payment]:
 
     return db.query(Payment).filter(Payment.subscription_id.in_(subscription_ids)).all()
 
+def get_payments_page_by_user(db: Session, user_id: int, cursor: Optional[str] = None, limit: Optional[int] = DEFAULT_PAGE_SIZE):
+    """One page of a parent's payments, newest first, and the next page's cursor"""
+    subscription_ids = select(Subscription.id).where(Subscription.parent_id == user_id)
+    query = db.query(Payment).filter(Payment.subscription_id.in_(subscription_ids))
+    return keyset_page(query, Payment, cursor, limit)
+
 def update_payment(db: Session, payment_id: int, payment_update: PaymentUpdate):
     """Update a payment"""
     db_payment = get_payment(db, payment_id)
@@ -243,7 +309,7 @@ def mark_payment_as_failed(db: Session, payment_id: int, reason: str):
     if subscription:
         subscription.payment_status = "failed"
         subscription.status = "past_due"
-        db.commit()
+        refresh_student_entitlements(db, subscription.student_id)
 
     db.commit()
     db.refresh(db_payment)
@@ -340,6 +406,7 @@ def create_subscription_plan(db: Session, plan: SubscriptionPlanCreate) -> Subsc
 
     db.add(db_plan)
     db.commit()
+    pricing_catalog.invalidate()
     db.refresh(db_plan)
     return db_plan
 
@@ -369,7 +436,10 @@ def update_subscription_plan(db: Session, plan_id: int, plan_update: Subscriptio
         setattr(db_plan, key, value)
 
     db.commit()
+    pricing_catalog.invalidate()
     db.refresh(db_plan)
+    # plan_type decides premium (all subjects) access for every subscriber
+    refresh_plan_entitlements(db, plan_id)
     return db_plan
 
 def delete_subscription_plan(db: Session, plan_id: int) -> bool:
@@ -380,6 +450,8 @@ def delete_subscription_plan(db: Session, plan_id: int) -> bool:
 
     db.delete(db_plan)
     db.commit()
+    pricing_catalog.invalidate()
+    refresh_plan_entitlements(db, plan_id)
     return True
 
 # Plan Feature CRUD operations
@@ -395,6 +467,7 @@ def create_plan_feature(db: Session, feature: PlanFeatureCreate) -> PlanFeature:
 
     db.add(db_feature)
     db.commit()
+    pricing_catalog.invalidate()
     db.refresh(db_feature)
     return db_feature
 
@@ -416,6 +489,7 @@ def update_plan_feature(db: Session, feature_id: int, feature_update: PlanFeatur
         setattr(db_feature, key, value)
 
     db.commit()
+    pricing_catalog.invalidate()
     db.refresh(db_feature)
     return db_feature
 
@@ -427,6 +501,7 @@ def delete_plan_feature(db: Session, feature_id: int) -> bool:
 
     db.delete(db_feature)
     db.commit()
+    pricing_catalog.invalidate()
     return True
 
 # Plan Subject CRUD operations
@@ -440,6 +515,7 @@ def create_plan_subject(db: Session, plan_subject: PlanSubjectCreate) -> PlanSub
 
     db.add(db_plan_subject)
     db.commit()
+    pricing_catalog.invalidate()
     db.refresh(db_plan_subject)
     return db_plan_subject
 
@@ -463,6 +539,7 @@ def delete_plan_subject(db: Session, plan_subject_id: int) -> bool:
 
     db.delete(db_plan_subject)
     db.commit()
+    pricing_catalog.invalidate()
     return True
 
 # Trial Extension CRUD operations
@@ -486,7 +563,8 @@ def create_trial_extension(db: Session, trial_extension: TrialExtensionCreate):
         subscription.trial_end_date = db_extension.new_trial_end
 
     db.add(db_extension)
-    db.commit()
+    db.flush()
+    refresh_student_entitlements(db, subscription.student_id if subscription else None)
     db.refresh(db_extension)
     return db_extension
 
@@ -501,25 +579,12 @@ def get_trial_extension(db: Session, extension_id: int):
 # Pricing calculation functions
 
 def calculate_subscription_price(db: Session, plan_id: int, num_subjects: int = 1, billing_cycle: str = BILLING_CYCLE_ANNUAL) -> float:
-    """Calculate subscription price based on plan and billing cycle"""
-
-    plan = get_subscription_plan(db, plan_id)
-
-    if plan.plan_type == PAYMENT_PLAN_BASIC:
-        # Basic plan: fixed price per subject ($25 per subject)
-        base_price = BASIC_PLAN_PRICE_PER_SUBJECT * num_subjects
-    else:  # premium
-        # Premium plan: fixed price for all subjects
-        base_price = PREMIUM_PLAN_PRICE
-
-    # Apply yearly discount if applicable (20%)
-    if billing_cycle == BILLING_CYCLE_ANNUAL:
-        yearly_discount = Decimal(DEFAULT_YEARLY_DISCOUNT_PERCENTAGE / 100)
-        final_price = Decimal(plan.base_price) * Decimal(12) * (Decimal(1.0) - yearly_discount)
-    else:
-        final_price = base_price
-
-    return round(final_price, 2)
+    """Calculate subscription price based on plan and billing cycle (see PlanPricing.price)"""
+    plan = pricing_catalog.get(db).plan(plan_id)
+    if plan is None:
+        # Inactive plans aren't in the catalog
+        plan = PlanPricing.from_plan(get_subscription_plan(db, plan_id))
+    return plan.price(num_subjects, billing_cycle)
 
 def get_total_subjects_count(db: Session) -> int:
     """Get total number of available subjects"""
@@ -555,6 +620,10 @@ def get_invoices_by_user(db: Session, user_id: int) -> List[Invoice]:
     """Get all invoices for a user"""
     return db.query(Invoice).filter(Invoice.user_id == user_id).order_by(Invoice.created_at.desc()).all()
 
+def get_invoices_page_by_user(db: Session, user_id: int, cursor: Optional[str] = None, limit: Optional[int] = DEFAULT_PAGE_SIZE):
+    """One page of a user's invoices, newest first, and the next page's cursor"""
+    return keyset_page(db.query(Invoice).filter(Invoice.user_id == user_id), Invoice, cursor, limit)
+
 def get_invoices_by_subscription(db: Session, subscription_id: int) -> List[Invoice]:
     """Get all invoices for a subscription"""
     return db.query(Invoice).filter(Invoice.subscription_id == subscription_id).order_by(Invoice.created_at.desc()).all()
@@ -588,96 +657,91 @@ def mark_invoice_as_paid(db: Session, invoice_id: int):
 # Billing Summary and Helper Functions
 
 def check_trial_status(db: Session, user_id: int) -> dict:
-    """Check if user has active trials and their status"""
-    from datetime import datetime
-
+    """Check if user has active trials and their status (expired trials are moved to "expired" by the scheduler)"""
     subscriptions = get_subscriptions_by_parent(db, user_id)
     trial_subs = [sub for sub in subscriptions if sub.status == "trial"]
 
     if not trial_subs:
-        return {"has_trial": False, "trial_expired": False, "days_remaining": 0}
+        # An expired trial never got an end date of its own
+        trial_expired = any(sub.status == "expired" and sub.trial_end_date and not sub.end_date for sub in subscriptions)
+        return {"has_trial": trial_expired, "trial_expired": trial_expired, "days_remaining": 0}
 
     # Find the latest trial end date
     trial_end_dates = [sub.trial_end_date for sub in trial_subs if sub.trial_end_date]
     if not trial_end_dates:
         return {"has_trial": True, "trial_expired": False, "days_remaining": 0}
 
-    latest_trial_end = max(trial_end_dates)
-    now = datetime.now()
-
-    if latest_trial_end > now:
-        days_remaining = (latest_trial_end - now).days
-        return {"has_trial": True, "trial_expired": False, "days_remaining": days_remaining}
-    else:
-        return {"has_trial": True, "trial_expired": True, "days_remaining": 0}
+    days_remaining = max(0, (max(trial_end_dates) - datetime.now()).days)
+    return {"has_trial": True, "trial_expired": False, "days_remaining": days_remaining}
+
+def get_billing_aggregates(db: Session, parent_id: int):
+    """
+    Everything the billing summaries need for a parent, in one aggregated
+    statement: subscription counts per status, monthly cost, trial and end
+    dates, students, the next pending payment, payment methods and the
+    registration date. Uses ix_subscriptions_parent_id_status and
+    ix_payments_subscription_id_status.
+    """
+    from app.models.user import User
+
+    status = Subscription.status
+    active = status == SubscriptionStatus.ACTIVE
+    trial = status == SubscriptionStatus.TRIAL
+    active_or_trial = status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIAL])
+
+    parent_subscription_ids = select(Subscription.id).where(Subscription.parent_id == parent_id)
+    next_pending_payment = (
+        select(func.min(Payment.payment_date))
+        .where(Payment.subscription_id.in_(parent_subscription_ids), Payment.status == PaymentStatus.PENDING)
+        .scalar_subquery()
+    )
+    subjects_subscribed = (
+        select(func.count(distinct(EntitlementGrant.subject_id)))
+        .where(EntitlementGrant.subscription_id.in_(parent_subscription_ids))
+        .scalar_subquery()
+    )
+    payment_methods = select(func.count(BillingInfo.id)).where(BillingInfo.user_id == parent_id).scalar_subquery()
+    registered_at = select(User.created_at).where(User.id == parent_id).scalar_subquery()
+
+    stmt = select(
+        func.count(case((active, 1))).label("active"),
+        func.count(case((trial, 1))).label("trial"),
+        func.count(case((status == SubscriptionStatus.PAST_DUE, 1))).label("past_due"),
+        func.coalesce(func.sum(case((active, Subscription.price), else_=0)), 0).label("active_cost"),
+        func.coalesce(func.sum(case((active_or_trial, Subscription.price), else_=0)), 0).label("active_and_trial_cost"),
+        func.min(case((trial, Subscription.trial_end_date))).label("earliest_trial_end"),
+        func.max(case((trial, Subscription.trial_end_date))).label("latest_trial_end"),
+        func.min(case((active_or_trial, Subscription.end_date))).label("earliest_end_date"),
+        func.count(distinct(Subscription.student_id)).label("students"),
+        subjects_subscribed.label("subjects"),
+        next_pending_payment.label("next_pending_payment"),
+        payment_methods.label("payment_methods"),
+        registered_at.label("registered_at"),
+    ).where(Subscription.parent_id == parent_id)
+    return db.execute(stmt).one()
 
 def get_billing_summary(db: Session, user_id: int):
     """Get a summary of billing information for a user"""
+    totals = get_billing_aggregates(db, user_id)
+    now = datetime.now()
 
-    subscriptions = get_subscriptions_by_parent(db, user_id)
-    payments = get_payments_by_user(db, user_id)
-    billing_info = get_billing_info_by_user(db, user_id)
-    user = get_user(db, user_id)
-
-    active_subs = [sub for sub in subscriptions if sub.status in ["active", "trial"]]
-    trial_subs = [sub for sub in subscriptions if sub.status == "trial"]
-    past_due_subs = [sub for sub in subscriptions if sub.status == "past_due"]
-
-    # Calculate total monthly cost (sum of all active subscription prices)
-    total_monthly_cost = 0.0
-    for sub in active_subs:
-        if sub.status == "active":  # Only count paid subscriptions for monthly cost
-            total_monthly_cost += float(sub.price)
-
-    # Check if user is in free trial
-    in_free_trial = len(trial_subs) > 0
-
-    # Find trial end date and days remaining
-    trial_end_date = None
-    trial_start_date = None
-    days_remaining_in_trial = 0
-    if trial_subs:
-        # Find the latest trial end date
-        trial_end_dates = [sub.trial_end_date for sub in trial_subs if sub.trial_end_date]
-        if trial_end_dates:
-            trial_end_date = max(trial_end_dates)
-            if trial_end_date > datetime.now():
-                days_remaining_in_trial = (trial_end_date - datetime.now()).days
-            else:
-                days_remaining_in_trial = 0
-
-        # Calculate trial start date from user registration if no explicit trial start
-        if user and user.created_at:
-            trial_start_date = user.created_at
-    elif active_subs == 0 and user and user.created_at:
-        # For users with no subscriptions, assume trial started at registration
-        trial_start_date = user.created_at
-        trial_end_date = user.created_at + timedelta(days=DEFAULT_TRIAL_PERIOD_DAYS)
-        if trial_end_date > datetime.now():
-            days_remaining_in_trial = (trial_end_date - datetime.now()).days
-        else:
-            days_remaining_in_trial = 0
-
-    # Find next payment date
-    pending_payments = [p for p in payments if p.status == "pending"]
-    next_payment_date = None
-    if pending_payments:
-        # Find the earliest due payment
-        next_payment_date = min(p.payment_date for p in pending_payments if p.payment_date)
-
-    # Check if user has payment methods
-    has_payment_method = len(billing_info) > 0
+    # Latest trial end date and days remaining; the trial starts at registration
+    trial_end_date = totals.latest_trial_end
+    days_remaining_in_trial = (trial_end_date - now).days if trial_end_date and trial_end_date > now else 0
+    trial_start_date = totals.registered_at if totals.trial else None
 
     return {
-        "active_subscriptions": len(active_subs),
-        "trial_subscriptions": len(trial_subs),
-        "past_due_subscriptions": len(past_due_subs),
-        "total_monthly_cost": total_monthly_cost,
-        "next_payment_date": next_payment_date,
-        "in_free_trial": in_free_trial,
+        "active_subscriptions": totals.active + totals.trial,
+        "trial_subscriptions": totals.trial,
+        "past_due_subscriptions": totals.past_due,
+        # Only paid subscriptions count towards the monthly cost
+        "total_monthly_cost": float(totals.active_cost),
+        # Earliest pending payment
+        "next_payment_date": totals.next_pending_payment,
+        "in_free_trial": totals.trial > 0,
         "trial_end_date": trial_end_date,
         "trial_start_date": trial_start_date,
         "days_remaining_in_trial": days_remaining_in_trial,
-        "payment_methods": len(billing_info),
-        "has_payment_method": has_payment_method
+        "payment_methods": totals.payment_methods,
+        "has_payment_method": totals.payment_methods > 0
     }
\ No newline at end of file
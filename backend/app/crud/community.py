@@ -1,8 +1,59 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.models.community import Post, Comment, Notification
+from sqlalchemy import desc, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.core.notification_counts import notification_count_cache
+from app.core.notification_hub import EVENT_COUNT, EVENT_NOTIFICATION, notification_hub
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page
+from app.core.search import community_search
+from app.models.community import Post, Comment, Notification, UserCommunityCounters
+from app.models.user import User
 from app.schemas.community import PostCreate, PostUpdate, CommentCreate, CommentUpdate, NotificationCreate
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List
+
+# Counters: updated in the same transaction as the post/comment change
+def _bump_user_counters(db: Session, user_id: int, posts: int = 0, comments: int = 0) -> None:
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(UserCommunityCounters).values(
+        user_id=user_id, post_count=max(posts, 0), comment_count=max(comments, 0)
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserCommunityCounters.user_id],
+        set_={
+            "post_count": UserCommunityCounters.post_count + posts,
+            "comment_count": UserCommunityCounters.comment_count + comments,
+            "updated_at": func.now(),
+        },
+    ))
+
+def bump_unread_notifications(db: Session, user_ids: Iterable[int], delta: int = 1) -> None:
+    """Adjust unread_notifications for each user (one statement); callers invalidate the cache after commit"""
+    rows = [{"user_id": user_id, "unread_notifications": delta} for user_id in user_ids]
+    if not rows:
+        return
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(UserCommunityCounters)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserCommunityCounters.user_id],
+        set_={
+            "unread_notifications": UserCommunityCounters.unread_notifications + stmt.excluded.unread_notifications,
+            "updated_at": func.now(),
+        },
+    ), rows)
+
+def _bump_post_comment_count(db: Session, post_id: int, delta: int) -> None:
+    db.query(Post).filter(Post.id == post_id).update(
+        {Post.comment_count: Post.comment_count + delta}, synchronize_session=False
+    )
+
+def get_user_counters(db: Session, user_id: int) -> dict:
+    """A user's active post and comment counts (primary key lookup, no COUNT(*))"""
+    counters = db.get(UserCommunityCounters, user_id)
+    return {
+        "user_id": user_id,
+        "post_count": counters.post_count if counters else 0,
+        "comment_count": counters.comment_count if counters else 0,
+    }
 
 # Post CRUD operations
 def get_post(db: Session, post_id: int) -> Optional[Post]:
@@ -17,11 +68,21 @@ def get_posts_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 20)
         Post.is_active == True
     ).order_by(desc(Post.created_at)).offset(skip).limit(limit).all()
 
+def get_posts_page(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                   user_id: Optional[int] = None):
+    """One page of active posts (optionally one user's), newest first, and the next page's cursor"""
+    query = db.query(Post).filter(Post.is_active == True)
+    if user_id is not None:
+        query = query.filter(Post.user_id == user_id)
+    return keyset_page(query, Post, cursor, limit)
+
 def create_post(db: Session, post: PostCreate, user_id: int) -> Post:
     db_post = Post(**post.dict(), user_id=user_id)
     db.add(db_post)
+    _bump_user_counters(db, user_id, posts=1)
     db.commit()
     db.refresh(db_post)
+    community_search.post_changed(db_post)
     return db_post
 
 def update_post(db: Session, post_id: int, post_update: PostUpdate, user_id: int) -> Optional[Post]:
@@ -35,16 +96,27 @@ def update_post(db: Session, post_id: int, post_update: PostUpdate, user_id: int
     
     db.commit()
     db.refresh(db_post)
+    community_search.post_changed(db_post)
     return db_post
 
+def deactivate_post(db: Session, db_post: Post) -> None:
+    """Soft delete a post and update its author's post count"""
+    # Conditional update: of two concurrent deletes only one changes the row, so the count drops once
+    deactivated = db.query(Post).filter(Post.id == db_post.id, Post.is_active == True).update(
+        {Post.is_active: False}, synchronize_session=False
+    )
+    if deactivated == 1:
+        _bump_user_counters(db, db_post.user_id, posts=-1)
+    db.commit()
+    community_search.post_changed(db_post)
+
 def delete_post(db: Session, post_id: int, user_id: int) -> bool:
     db_post = db.query(Post).filter(Post.id == post_id, Post.user_id == user_id).first()
     if not db_post:
         return False
     
     # Soft delete
-    db_post.is_active = False
-    db.commit()
+    deactivate_post(db, db_post)
     return True
 
 # Comment CRUD operations
@@ -57,11 +129,40 @@ def get_comments_by_post(db: Session, post_id: int) -> List[Comment]:
         Comment.is_active == True
     ).order_by(Comment.created_at).all()
 
+def get_latest_comments(db: Session, post_ids: List[int], per_post: int) -> List[Comment]:
+    """The latest `per_post` active comments of each post (ROW_NUMBER window), oldest first within a post"""
+    if not post_ids or per_post <= 0:
+        return []
+    ranked = db.query(
+        Comment.id,
+        func.row_number().over(
+            partition_by=Comment.post_id,
+            order_by=(desc(Comment.created_at), desc(Comment.id)),
+        ).label("rank"),
+    ).filter(Comment.post_id.in_(post_ids), Comment.is_active == True).subquery()
+    return db.query(Comment).join(ranked, ranked.c.id == Comment.id).filter(
+        ranked.c.rank <= per_post
+    ).order_by(Comment.post_id, Comment.created_at, Comment.id).all()
+
+def get_author_summaries(db: Session, user_ids: Iterable[int]) -> Dict[int, dict]:
+    """Author info embedded in posts and comments, for all given users in one query"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = db.query(User.id, User.username, User.full_name, User.role).filter(User.id.in_(user_ids)).all()
+    return {
+        row.id: {"id": row.id, "username": row.username, "full_name": row.full_name, "role": row.role}
+        for row in rows
+    }
+
 def create_comment(db: Session, comment: CommentCreate, user_id: int) -> Comment:
     db_comment = Comment(**comment.dict(), user_id=user_id)
     db.add(db_comment)
+    _bump_post_comment_count(db, comment.post_id, 1)
+    _bump_user_counters(db, user_id, comments=1)
     db.commit()
     db.refresh(db_comment)
+    community_search.comment_changed(db_comment)
     return db_comment
 
 def update_comment(db: Session, comment_id: int, comment_update: CommentUpdate, user_id: int) -> Optional[Comment]:
@@ -75,24 +176,38 @@ def update_comment(db: Session, comment_id: int, comment_update: CommentUpdate,
     
     db.commit()
     db.refresh(db_comment)
+    community_search.comment_changed(db_comment)
     return db_comment
 
+def deactivate_comment(db: Session, db_comment: Comment) -> None:
+    """Soft delete a comment and update its post's and author's comment counts"""
+    deactivated = db.query(Comment).filter(Comment.id == db_comment.id, Comment.is_active == True).update(
+        {Comment.is_active: False}, synchronize_session=False
+    )
+    if deactivated == 1:
+        _bump_post_comment_count(db, db_comment.post_id, -1)
+        _bump_user_counters(db, db_comment.user_id, comments=-1)
+    db.commit()
+    community_search.comment_changed(db_comment)
+
 def delete_comment(db: Session, comment_id: int, user_id: int) -> bool:
     db_comment = db.query(Comment).filter(Comment.id == comment_id, Comment.user_id == user_id).first()
     if not db_comment:
         return False
     
     # Soft delete
-    db_comment.is_active = False
-    db.commit()
+    deactivate_comment(db, db_comment)
     return True
 
 # Notification CRUD operations
 def create_notification(db: Session, notification: NotificationCreate) -> Notification:
     db_notification = Notification(**notification.dict())
     db.add(db_notification)
+    bump_unread_notifications(db, [notification.user_id])
     db.commit()
+    notification_count_cache.invalidate(notification.user_id)
     db.refresh(db_notification)
+    publish_notification_events(db, [notification.user_id], [db_notification])
     return db_notification
 
 def get_user_notifications(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> List[Notification]:
@@ -106,6 +221,21 @@ def get_unread_notifications(db: Session, user_id: int) -> List[Notification]:
         Notification.is_read == False
     ).order_by(desc(Notification.created_at)).all()
 
+def _mark_read(db: Session, user_id: int, *criteria) -> int:
+    # Only rows that were unread are updated, so the counter drops by exactly the rows this call changed
+    updated_count = db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.is_read == False,
+        *criteria
+    ).update({"is_read": True}, synchronize_session=False)
+    if updated_count:
+        bump_unread_notifications(db, [user_id], -updated_count)
+    db.commit()
+    notification_count_cache.invalidate(user_id)
+    if updated_count:
+        publish_notification_events(db, [user_id])
+    return updated_count
+
 def mark_notification_read(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
     notification = db.query(Notification).filter(
         Notification.id == notification_id,
@@ -113,35 +243,62 @@ def mark_notification_read(db: Session, notification_id: int, user_id: int) -> O
     ).first()
     
     if notification:
-        notification.is_read = True
-        db.commit()
+        _mark_read(db, user_id, Notification.id == notification_id)
         db.refresh(notification)
     
     return notification
 
 def mark_notifications_read(db: Session, notification_ids: List[int], user_id: int) -> int:
-    updated_count = db.query(Notification).filter(
-        Notification.id.in_(notification_ids),
-        Notification.user_id == user_id
-    ).update({"is_read": True}, synchronize_session=False)
-    
-    db.commit()
-    return updated_count
+    return _mark_read(db, user_id, Notification.id.in_(notification_ids))
 
 def mark_all_notifications_read(db: Session, user_id: int) -> int:
-    updated_count = db.query(Notification).filter(
-        Notification.user_id == user_id,
-        Notification.is_read == False
-    ).update({"is_read": True}, synchronize_session=False)
-    
-    db.commit()
-    return updated_count
+    return _mark_read(db, user_id)
+
+def get_unread_notification_count(db: Session, user_id: int) -> int:
+    """From the cache or the maintained counter (primary key lookup, no COUNT(*))"""
+    count = notification_count_cache.get(user_id)
+    if count is None:
+        counters = db.get(UserCommunityCounters, user_id)
+        count = max(counters.unread_notifications, 0) if counters else 0
+        notification_count_cache.put(user_id, count)
+    return count
+
+def get_unread_notification_counts(db: Session, user_ids: Iterable[int]) -> Dict[int, int]:
+    """Unread counts for several users from the maintained counters (one query)"""
+    user_ids = list(user_ids)
+    counts = dict.fromkeys(user_ids, 0)
+    for user_id, count in db.query(UserCommunityCounters.user_id, UserCommunityCounters.unread_notifications).filter(
+        UserCommunityCounters.user_id.in_(user_ids)
+    ):
+        counts[user_id] = max(count, 0)
+    for user_id, count in counts.items():
+        notification_count_cache.put(user_id, count)
+    return counts
+
+def publish_notification_events(db: Session, user_ids: Iterable[int], notifications: Iterable = ()) -> None:
+    """Push new notifications and fresh unread counts to open streams; call after commit"""
+    user_ids = [user_id for user_id in user_ids if notification_hub.wants(user_id)]
+    if not user_ids:
+        return
+    counts = get_unread_notification_counts(db, user_ids)
+    events = [
+        (n.user_id, EVENT_NOTIFICATION, {
+            "id": n.id,
+            "user_id": n.user_id,
+            "title": n.title,
+            "message": n.message,
+            "is_read": bool(n.is_read),
+            "created_at": n.created_at.isoformat() if n.created_at else None,
+        })
+        for n in notifications if n.user_id in counts
+    ]
+    events += [(user_id, EVENT_COUNT, {"unread": count}) for user_id, count in counts.items()]
+    notification_hub.publish(events)
 
 def get_notification_count(db: Session, user_id: int, unread_only: bool = False) -> int:
-    query = db.query(Notification).filter(Notification.user_id == user_id)
     if unread_only:
-        query = query.filter(Notification.is_read == False)
-    return query.count()
+        return get_unread_notification_count(db, user_id)
+    return db.query(Notification).filter(Notification.user_id == user_id).count()
 
 # Helper function to create system notifications
 def create_system_notification(db: Session, user_id: int, title: str, message: str) -> Notification:
@@ -1,8 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import case, func, desc
 from app.models.progress import Progress, Badge, StudentBadge
 from app.schemas.progress import ProgressCreate, ProgressUpdate, BadgeCreate
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 
 def get_progress(db: Session, progress_id: int) -> Optional[Progress]:
@@ -59,6 +59,36 @@ def get_student_total_lessons(db: Session, student_id: int) -> int:
     ).scalar()
     return result or 0
 
+def get_progress_summaries(db: Session, student_ids: List[int]) -> Dict[int, dict]:
+    """Total points, current streak and total lessons for many students in one query"""
+    if not student_ids:
+        return {}
+    ranked = db.query(
+        Progress.student_id,
+        Progress.points_earned,
+        Progress.lessons_completed,
+        Progress.streak_days,
+        func.row_number().over(
+            partition_by=Progress.student_id,
+            order_by=(desc(Progress.week_start), desc(Progress.id)),
+        ).label("rank"),
+    ).filter(Progress.student_id.in_(student_ids)).subquery()
+    rows = db.query(
+        ranked.c.student_id,
+        func.coalesce(func.sum(ranked.c.points_earned), 0).label("total_points"),
+        func.coalesce(func.sum(ranked.c.lessons_completed), 0).label("total_lessons"),
+        # The streak of the most recent week, like get_student_current_streak
+        func.max(case((ranked.c.rank == 1, ranked.c.streak_days))).label("current_streak"),
+    ).group_by(ranked.c.student_id).all()
+    return {
+        row.student_id: {
+            "total_points": row.total_points,
+            "current_streak": row.current_streak or 0,
+            "total_lessons": row.total_lessons,
+        }
+        for row in rows
+    }
+
 # Badge management
 def create_badge(db: Session, badge: BadgeCreate) -> Badge:
     db_badge = Badge(**badge.dict())
@@ -97,6 +127,15 @@ def get_student_badges(db: Session, student_id: int) -> List[StudentBadge]:
         StudentBadge.student_id == student_id
     ).all()
 
+def get_badge_counts(db: Session, student_ids: List[int]) -> Dict[int, int]:
+    """Number of badges earned per student, in one grouped query"""
+    if not student_ids:
+        return {}
+    rows = db.query(StudentBadge.student_id, func.count(StudentBadge.id)).filter(
+        StudentBadge.student_id.in_(student_ids)
+    ).group_by(StudentBadge.student_id).all()
+    return dict(rows)
+
 def check_and_award_badges(db: Session, student_id: int):
     """Check if student qualifies for any badges and award them"""
     total_points = get_student_total_points(db, student_id)
@@ -1,11 +1,14 @@
 from sqlalchemy import desc
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, selectinload
 from app.models.user import StudentProfile, User
-from app.models.assessment import Assessment
+from app.models.assessment import Assessment, LatestAssessment
 from app.schemas.user import StudentProfileUpdate, LearningProfileUpdate
-from typing import Optional
+from typing import List, Optional
 from app.core.security import verify_password, get_password_hash
+from app.core.principal_cache import principal_cache
 
 def get_student(db: Session, student_id: int) -> Optional[StudentProfile]:
     return db.query(StudentProfile).filter(StudentProfile.id == student_id).first()
@@ -14,6 +17,78 @@ def get_student_by_username(db: Session, username: str) -> Optional[StudentProfi
     query = db.query(StudentProfile).filter(StudentProfile.username == username)
     return query.first()
 
+def get_latest_assessments(db: Session, student_ids: List[int]) -> List[Assessment]:
+    """Most recent assessment per (student, subject), straight from the assessments table.
+
+    Uses DISTINCT ON over ix_assessments_student_id_subject_created_at on PostgreSQL
+    and a ROW_NUMBER window elsewhere.
+    """
+    if not student_ids:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return (
+            db.query(Assessment)
+            .filter(Assessment.student_id.in_(student_ids))
+            .distinct(Assessment.student_id, Assessment.subject)
+            .order_by(Assessment.student_id, Assessment.subject, desc(Assessment.created_at), desc(Assessment.id))
+            .all()
+        )
+    ranked = (
+        db.query(
+            Assessment.id,
+            func.row_number().over(
+                partition_by=(Assessment.student_id, Assessment.subject),
+                order_by=(desc(Assessment.created_at), desc(Assessment.id)),
+            ).label("rank"),
+        )
+        .filter(Assessment.student_id.in_(student_ids))
+        .subquery()
+    )
+    return (
+        db.query(Assessment)
+        .join(ranked, ranked.c.id == Assessment.id)
+        .filter(ranked.c.rank == 1)
+        .order_by(Assessment.student_id, Assessment.subject)
+        .all()
+    )
+
+def get_latest_assessment_rows(db: Session, student_ids: List[int]) -> List[LatestAssessment]:
+    """Latest assessment per (student, subject) from the latest_assessments table (primary key lookup)"""
+    if not student_ids:
+        return []
+    return (
+        db.query(LatestAssessment)
+        .filter(LatestAssessment.student_id.in_(student_ids))
+        .order_by(LatestAssessment.student_id, LatestAssessment.subject)
+        .all()
+    )
+
+def record_latest_assessment(db: Session, assessment: Assessment) -> None:
+    """Upsert the assessment into latest_assessments unless a newer one is already recorded.
+
+    Called (before commit) when an assessment is created and when it completes,
+    so the row also picks up the final status and score.
+    """
+    dialect = db.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    values = {
+        "student_id": assessment.student_id,
+        "subject": assessment.subject,
+        "assessment_id": assessment.id,
+        "status": assessment.status,
+        "overall_score": assessment.overall_score,
+        "created_at": assessment.created_at,
+        "completed_at": assessment.completed_at,
+    }
+    stmt = insert(LatestAssessment).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LatestAssessment.student_id, LatestAssessment.subject],
+        set_={key: stmt.excluded[key] for key in values if key not in ("student_id", "subject")},
+        where=(LatestAssessment.assessment_id == stmt.excluded.assessment_id)
+        | (LatestAssessment.created_at <= stmt.excluded.created_at),
+    )
+    db.execute(stmt)
+
 def get_student_with_assessments(db: Session, student_id: int) -> Optional[dict]:
     # Load the student and base relations
     query = (
@@ -28,25 +103,14 @@ def get_student_with_assessments(db: Session, student_id: int) -> Optional[dict]
 
     student_dict = student.__dict__.copy()
 
-    # Fetch most recent assessment per subject
-    assessments = (
-        db.query(Assessment)
-        .filter(Assessment.student_id == student_id)
-        .order_by(Assessment.subject, desc(Assessment.created_at))
-        .all()
-    )
-
-    # Keep only the latest assessment per subject
-    unique_latest = {}
-    for a in assessments:
-        if a.subject not in unique_latest:  # first occurrence = most recent
-            unique_latest[a.subject] = {
-                "assessment_id": a.id,
-                "status": a.status,
-            }
-
-    # Replace the structure in student_dict
-    student_dict["assessments"] = unique_latest
+    # Only the most recent assessment per subject is loaded
+    student_dict["assessments"] = {
+        a.subject: {
+            "assessment_id": a.id,
+            "status": a.status,
+        }
+        for a in get_latest_assessments(db, [student_id])
+    }
 
     return student_dict
 
@@ -96,6 +160,7 @@ def update_student(db: Session, student_id: int, updates: StudentProfileUpdate)
 
     db.commit()
     db.refresh(db_student_profile)
+    principal_cache.invalidate_user(db_user.id)
 
     return db_student_profile
 
@@ -142,8 +207,10 @@ def delete_student(db: Session, student_id: int) -> bool:
     if not db_student:
         return False
 
+    user_id = db_student.user_id
     db.delete(db_student)
     db.commit()
+    principal_cache.invalidate_user(user_id)
     return True
 
 def get_student_by_parent_and_id(db: Session, parent_id: int, student_id: int) -> Optional[StudentProfile]:
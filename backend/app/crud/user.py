@@ -1,8 +1,11 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from app.models.user import User, StudentProfile, UserRole
 from app.schemas.user import UserCreate, UserUpdate, StudentProfileCreate, StudentProfileUpdate
-from app.core.security import get_password_hash, verify_password
-from typing import Optional
+from app.core.security import get_password_hash, verify_password, verify_password_async
+from app.core.principal_cache import principal_cache
+from typing import List, Optional
 
 
 def get_student_profile(db: Session, student_id: int) -> Optional[StudentProfile]:
@@ -18,8 +21,9 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    """Create a user; pass hashed_password when it was already hashed off the event loop."""
+    hashed_password = hashed_password or get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -46,6 +50,17 @@ def authenticate_user(db: Session, identifier: str, password: str) -> Optional[U
         return None
     return user
 
+async def authenticate_user_async(db: AsyncSession, identifier: str, password: str) -> Optional[User]:
+    """authenticate_user for async handlers: bcrypt runs on the password hash pool."""
+    column = User.email if "@" in identifier else User.username
+    user = (await db.execute(select(User).where(column == identifier))).scalars().first()
+
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
 def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
     db_user = get_user(db, user_id)
     if not db_user:
@@ -57,10 +72,12 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[
 
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate_user(db_user.id)
     return db_user
 
-def create_student(db: Session, student: StudentProfileCreate, parent_id: int) -> StudentProfile:
-    hashed_password = get_password_hash(student.password)
+def create_student(db: Session, student: StudentProfileCreate, parent_id: int,
+                   hashed_password: Optional[str] = None) -> StudentProfile:
+    hashed_password = hashed_password or get_password_hash(student.password)
     # Step 1: Create a User entry for the student
     student_user = User(
         role=UserRole.STUDENT,
@@ -100,20 +117,43 @@ def update_student(db: Session, student_id: int, student_update: StudentProfileU
 
     db.commit()
     db.refresh(db_student)
+    principal_cache.invalidate_user(db_student.user_id)
     return db_student
 
-from app.models.billing import Subscription
+from app.models.billing import Subscription, SubscriptionStatus
+
+# Statuses that grant access to courses
+ACCESS_STATUSES = (SubscriptionStatus.TRIAL, SubscriptionStatus.ACTIVE)
 
 
+def get_children_profiles(db: Session, parent_id: int) -> List[StudentProfile]:
+    """A parent's student profiles with their user rows joined in (one query)"""
+    return (
+        db.query(StudentProfile)
+        .options(joinedload(StudentProfile.user))
+        .filter(StudentProfile.parent_id == parent_id)
+        .order_by(StudentProfile.id)
+        .all()
+    )
+
 def get_students_by_parent(db: Session, parent_id: int):
-    students = db.query(StudentProfile).filter(StudentProfile.parent_id == parent_id).all()
+    """A parent's students plus subscription flags (two queries in total)"""
+    students = get_children_profiles(db, parent_id)
+    subscriptions = {}
+    if students:
+        rows = (
+            db.query(Subscription)
+            .filter(Subscription.student_id.in_([student.user_id for student in students]))
+            .order_by(Subscription.id)
+            .all()
+        )
+        for subscription in rows:
+            current = subscriptions.get(subscription.student_id)
+            # Prefer a trial or active subscription over older ones
+            if current is None or (subscription.status in ACCESS_STATUSES and current.status not in ACCESS_STATUSES):
+                subscriptions[subscription.student_id] = subscription
     for student in students:
-
-        subscription = db.query(Subscription).filter(Subscription.student_id == student.user_id).first()
-        if subscription:
-            student.has_active_subscription = subscription.has_active_subscription
-            student.active_subscription_id = subscription.id
-        else:
-            student.has_active_subscription = False
-            student.active_subscription_id = None
+        subscription = subscriptions.get(student.user_id)
+        student.has_active_subscription = subscription is not None and subscription.status in ACCESS_STATUSES
+        student.active_subscription_id = subscription.id if subscription else None
     return students
@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.notification_hub import notification_hub
 from app.api.v1.api import api_router
+from app.core.query_counter import QueryCounterMiddleware
+from app.core.token_revocation import revocation_sync_loop
+from app.services.community_counters import community_counter_reconciler
+from app.services.subscription_scheduler import subscription_scheduler
+from app.services.webhook_service import webhook_processor
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,8 +27,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query count / DB time (Server-Timing, X-DB-Query-Count, N+1 warnings)
+app.add_middleware(QueryCounterMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Keep references so background tasks aren't garbage collected
+_background_tasks = set()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    coros = [revocation_sync_loop(), webhook_processor.run_forever()]
+    if settings.SUBSCRIPTION_SCHEDULER_ENABLED:
+        coros.append(subscription_scheduler.run_forever())
+    if settings.COMMUNITY_COUNTERS_RECONCILE_ENABLED:
+        coros.append(community_counter_reconciler.run_forever())
+    if notification_hub.fanout:
+        coros.append(notification_hub.listen_forever())
+    for coro in coros:
+        _background_tasks.add(asyncio.create_task(coro))
+
 @app.get("/")
 async def root():
     return {"message": "Kaihle Platform API"}
@@ -1,12 +1,15 @@
 # Empty file to make models a package
-from .assessment import Assessment, AssessmentQuestion, QuestionBank, AssessmentReport, StudentKnowledgeProfile
+from .assessment import Assessment, AssessmentQuestion, QuestionBank, AssessmentReport, StudentKnowledgeProfile, LatestAssessment
 from .lesson import Lesson, StudyPlan, StudyPlanLesson
 from .user import User, StudentProfile
 from .progress import Progress, Badge, StudentBadge
-from .billing import Subscription, Payment, BillingInfo, Invoice
+from .billing import Subscription, Payment, BillingInfo, Invoice, EntitlementGrant
 from .subject import Subject
 from .course import MicroCourse, MicroCourseSection, MicroCourseQuestionLink
 from .ai_tutor import TutorSession, TutorInteraction, StudentAnswer
-from .community import Post, Comment, Notification
+from .community import Post, Comment, Notification, UserCommunityCounters
 from .curriculum import Curriculum, Topic, Subtopic, CurriculumTopic, TopicPrerequisite
+from .llm_usage import LLMCallLog
+from .auth_token import RefreshToken, RevokedToken
+from .webhook_event import WebhookEvent
 # Add other model imports as needed
\ No newline at end of file
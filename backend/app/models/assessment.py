@@ -1,5 +1,5 @@
 # app/models/assessment.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
@@ -32,6 +32,25 @@ class Assessment(Base, SerializerMixin):
     study_plan = relationship("StudyPlan", uselist=False, back_populates="assessment")
     reports = relationship("AssessmentReport", back_populates="assessment", cascade="all, delete-orphan")
 
+# Backs the latest-assessment-per-subject lookup (DISTINCT ON (subject) ... ORDER BY subject, created_at DESC)
+Index(
+    "ix_assessments_student_id_subject_created_at",
+    Assessment.student_id, Assessment.subject, Assessment.created_at.desc(),
+)
+
+
+class LatestAssessment(Base):
+    """Most recent assessment per student and subject, kept up to date on assessment create/complete"""
+    __tablename__ = "latest_assessments"
+
+    student_id = Column(Integer, ForeignKey("student_profiles.id", ondelete="CASCADE"), primary_key=True)
+    subject = Column(String, primary_key=True)
+    assessment_id = Column(Integer, ForeignKey("assessments.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, nullable=True)
+    overall_score = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)  # of the assessment
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
 class AssessmentQuestion(Base):
     __tablename__ = "assessment_questions"
 
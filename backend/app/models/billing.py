@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, DECIMAL, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, DECIMAL, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -21,6 +21,16 @@ class PaymentStatus(str, enum.Enum):
 
 class Subscription(Base, SerializerMixin):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index("ix_subscriptions_status_parent_id", "status", "parent_id"),
+        # Covers the billing summary aggregate (see crud.billing.get_billing_aggregates)
+        Index(
+            "ix_subscriptions_parent_id_status", "parent_id", "status",
+            postgresql_include=["price", "trial_end_date", "end_date", "student_id"],
+        ),
+        # Keyset pagination (newest first)
+        Index("ix_subscriptions_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     parent_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -46,8 +56,31 @@ class Subscription(Base, SerializerMixin):
     plan = relationship("SubscriptionPlan")
     payments = relationship("Payment", back_populates="subscription", cascade="all, delete-orphan")
 
+class EntitlementGrant(Base):
+    """
+    Materialized access grants, one row per currently-entitling subscription
+    (rebuilt by crud.billing.refresh_student_entitlements on every
+    subscription change). subject_id is only set for single-subject plans.
+    """
+    __tablename__ = "student_entitlements"
+    __table_args__ = (
+        Index("ix_student_entitlements_student_valid_until", "student_id", "valid_until"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # "trial" or "subscription"
+    subject_id = Column(Integer, nullable=True)
+    all_subjects = Column(Boolean, nullable=False, default=False)
+    valid_until = Column(DateTime(timezone=True), nullable=True)  # NULL = no end date
+
 class Payment(Base, SerializerMixin):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_subscription_id_status", "subscription_id", "status", "payment_date"),
+        Index("ix_payments_subscription_id_created_at_id", "subscription_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
@@ -55,6 +88,7 @@ class Payment(Base, SerializerMixin):
     currency = Column(String(3), default="USD")
     payment_method = Column(String(50), nullable=True)
     transaction_id = Column(String(100), nullable=True)
+    idempotency_key = Column(String(100), nullable=True, unique=True)  # e.g. billing:<period>:<parent_id>
     status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
     payment_date = Column(DateTime(timezone=True), nullable=True)
     description = Column(String(255), nullable=True)
@@ -66,6 +100,9 @@ class Payment(Base, SerializerMixin):
 
 class BillingInfo(Base, SerializerMixin):
     __tablename__ = "billing_info"
+    __table_args__ = (
+        Index("ix_billing_info_user_id_is_default", "user_id", "is_default"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -141,6 +178,9 @@ class PlanSubject(Base, SerializerMixin):
 
 class Invoice(Base, SerializerMixin):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
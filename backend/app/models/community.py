@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -6,12 +6,20 @@ from app.core.database import Base
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Feed keyset pagination (newest first), overall and per author
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     is_active = Column(Boolean, default=True)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")  # active comments, kept by crud.community
+    # search_vector: generated tsvector (title + content) with a GIN index, PostgreSQL only and
+    # deliberately unmapped; queried by app/core/search.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -22,12 +30,17 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Comment counts and latest comments per post
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     is_active = Column(Boolean, default=True)
+    # search_vector: generated tsvector (content) with a GIN index, see Post
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -36,8 +49,24 @@ class Comment(Base):
     # author = relationship("User", back_populates="comments")  # ✅ add reverse relation
 
 
+class UserCommunityCounters(Base):
+    """Active posts, comments and unread notifications per user, kept by crud.community and repaired by the counter reconciler"""
+    __tablename__ = "user_community_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Unread notifications per user, newest first; read rows stay out of the index
+        Index("ix_notifications_user_id_unread", "user_id", "created_at",
+              postgresql_where=text("is_read = false"), sqlite_where=text("is_read = 0")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class LLMCallLog(Base):
+    """Append-only ledger of LLM provider calls (latency, tokens, cost)."""
+    __tablename__ = "llm_call_logs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(20), nullable=False)
+    model = Column(String(100), nullable=False)
+    method = Column(String(50), nullable=False, index=True)  # generate_question, score_answer, ...
+    latency_ms = Column(Float, nullable=False)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    cached_tokens = Column(Integer, nullable=True)
+    cache_hit = Column(Boolean, default=False)
+    retry_count = Column(Integer, default=0)
+    success = Column(Boolean, default=True)
+    error = Column(String(255), nullable=True)
+    estimated_cost_usd = Column(Numeric(12, 6), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -86,7 +86,7 @@ class StudentProfile(Base, SerializerMixin):
         foreign_keys=[parent_id]
     )
     # Assessments
-    assessments = relationship("Assessment", back_populates="student", lazy="selectin",cascade="all, delete-orphan")
+    assessments = relationship("Assessment", back_populates="student", cascade="all, delete-orphan")
 
      # Progress tracking
     # progress_records = relationship("Progress", back_populates="student")
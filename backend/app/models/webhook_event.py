@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class WebhookEvent(Base):
+    """
+    Inbox of received Stripe webhook events, keyed by Stripe's event id so
+    redeliveries are deduplicated. Processed asynchronously, in order per
+    ordering_key (the subscription the event is about).
+    """
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        Index("ix_webhook_events_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_webhook_events_ordering_key_created", "ordering_key", "stripe_created"),
+    )
+
+    id = Column(String(255), primary_key=True)  # Stripe event id (evt_...)
+    source = Column(String(20), nullable=False, default="stripe")
+    type = Column(String(100), nullable=False)
+    ordering_key = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    stripe_created = Column(Integer, nullable=True)  # event.created (unix time), orders events per key
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, failed, processed, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
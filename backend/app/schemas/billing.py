@@ -46,7 +46,7 @@ class SubscriptionResponse(SubscriptionBase):
     end_date: Optional[datetime] = None
     payment_status: PaymentStatus = PaymentStatus.pending
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -75,7 +75,7 @@ class PaymentResponse(PaymentBase):
     status: PaymentStatus = PaymentStatus.pending
     payment_date: Optional[datetime] = None
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -111,7 +111,7 @@ class BillingInfoUpdate(BaseModel):
 class BillingInfoResponse(BillingInfoBase):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -139,7 +139,7 @@ class InvoiceUpdate(BaseModel):
 class InvoiceResponse(InvoiceBase):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -240,7 +240,7 @@ class PlanFeatureUpdate(BaseModel):
 class PlanFeatureResponse(PlanFeatureBase):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -255,7 +255,7 @@ class PlanSubjectCreate(PlanSubjectBase):
 class PlanSubjectResponse(PlanSubjectBase):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
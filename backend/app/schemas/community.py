@@ -42,10 +42,26 @@ class Post(PostBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     comments: List[Comment] = []
+    comment_count: int = 0
     
     class Config:
         from_attributes = True
 
+class SearchResult(BaseModel):
+    kind: str  # "post" or "comment"
+    id: int
+    post_id: int
+    score: float
+    title: Optional[str] = None
+    content: str
+    author: dict
+    created_at: datetime
+
+class UserCommunityStats(BaseModel):
+    user_id: int
+    post_count: int
+    comment_count: int
+
 class NotificationBase(BaseModel):
     title: str
     message: str
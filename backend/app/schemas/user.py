@@ -127,6 +127,49 @@ class StudentDetailResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# -------------------
+# PARENT DASHBOARD
+# -------------------
+class DashboardAssessment(BaseModel):
+    assessment_id: int
+    subject: str
+    status: Optional[str] = None
+    overall_score: Optional[float] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class DashboardAccessStatus(BaseModel):
+    has_active_trial: bool
+    has_active_subscription: bool
+    trial_end_date: Optional[datetime] = None
+    subscription_end_date: Optional[datetime] = None
+    show_subscribe_cta: bool
+    trial_status: str
+    subscription_status: str
+
+
+class DashboardProgress(BaseModel):
+    total_points: int = 0
+    current_streak: int = 0
+    total_lessons: int = 0
+    badges_earned: int = 0
+
+
+class DashboardChild(BaseModel):
+    id: int
+    user_id: int
+    age: Optional[int] = None
+    grade_level: Optional[str] = None
+    user: UserBase
+    latest_assessments: Dict[str, DashboardAssessment]
+    access: DashboardAccessStatus
+    progress: DashboardProgress
+
+
+class ParentDashboardResponse(BaseModel):
+    children: List[DashboardChild]
+
 # -------------------
 # LOGIN + TOKEN
 # -------------------
@@ -1,10 +1,26 @@
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 
-from app.crud.billing import get_active_subscriptions, get_subscriptions_by_parent
+from app.core.entitlement_cache import StudentEntitlement, entitlement_cache
+from app.crud.billing import get_entitlement_grants, get_subscriptions_by_parent
 from app.models.billing import Subscription
 
+RESTRICTION_NOTIFICATION = "All new courses and assessments are paused. Please subscribe to a plan to continue."
+
+
+def empty_student_status(student_id: int) -> Dict[str, Any]:
+    """Dashboard status of a student without any subscription"""
+    return {
+        "student_id": student_id,
+        "has_active_trial": False,
+        "has_active_subscription": False,
+        "trial_end_date": None,
+        "subscription_end_date": None,
+        "show_subscribe_cta": True,
+        "trial_status": "none",
+        "subscription_status": "none"
+    }
+
 
 class AccessControlService:
     """Service for handling access control logic based on subscriptions and trials"""
@@ -12,26 +28,17 @@ class AccessControlService:
     def __init__(self):
         pass
 
-    def can_access_courses(self, db: Session, student_id: int) -> bool:
-        """Check if student can access courses"""
-        # Get active subscriptions for student
-        subscriptions = get_active_subscriptions(db, student_id)
-
-        now = datetime.now()
+    def get_entitlement(self, db: Session, student_id: int) -> StudentEntitlement:
+        """Cached entitlement for a student (one indexed student_entitlements lookup on a miss)"""
+        entitlement = entitlement_cache.get(student_id)
+        if entitlement is None:
+            entitlement = StudentEntitlement.from_grants(student_id, get_entitlement_grants(db, student_id))
+            entitlement_cache.put(entitlement)
+        return entitlement
 
-        for sub in subscriptions:
-            # Check trial status
-            if sub.status == "trial":
-                if sub.trial_end_date and sub.trial_end_date > now:
-                    return True
-                continue
-
-            # Check active subscription
-            if sub.status == "active":
-                if not sub.end_date or sub.end_date > now:
-                    return True
-
-        return False
+    def can_access_courses(self, db: Session, student_id: int) -> bool:
+        """Check if student can access courses (active trial or subscription)"""
+        return self.get_entitlement(db, student_id).can_access_courses
 
     def can_create_courses(self, db: Session, student_id: int) -> bool:
         """Check if student can create new courses"""
@@ -43,116 +50,71 @@ class AccessControlService:
         if self.can_access_courses(db, student_id):
             return None
 
-        return "All new courses and assessments are paused. Please subscribe to a plan to continue."
+        return RESTRICTION_NOTIFICATION
 
     def can_access_subject(self, db: Session, student_id: int, subject_id: int) -> bool:
         """Check if student can access a specific subject"""
-        subscriptions = get_active_subscriptions(db, student_id)
-
-        now = datetime.now()
-
-        for sub in subscriptions:
-            # During trial, allow access to all subjects
-            if sub.status == "trial" and sub.trial_end_date and sub.trial_end_date > now:
-                return True
-
-            # For active subscriptions, check subject access based on plan type
-            if sub.status == "active" and (not sub.end_date or sub.end_date > now):
-                if sub.plan and sub.plan.plan_type == "premium":
-                    # Premium plan has access to all subjects
-                    return True
-                elif sub.subject_id == subject_id:
-                    # Basic plan has access to the specific subject
-                    return True
-
-        return False
+        return self.get_entitlement(db, student_id).can_access_subject(subject_id)
 
     def get_student_access_status(self, db: Session, student_id: int) -> Dict[str, Any]:
         """Get comprehensive access status for a student"""
-        subscriptions = get_active_subscriptions(db, student_id)
-
-        now = datetime.now()
-        has_active_trial = False
-        has_active_subscription = False
-        trial_end_date = None
-        subscription_end_date = None
-        accessible_subjects = []
-
-        for sub in subscriptions:
-            if sub.status == "trial" and sub.trial_end_date and sub.trial_end_date > now:
-                has_active_trial = True
-                trial_end_date = sub.trial_end_date
-
-            if sub.status == "active" and (not sub.end_date or sub.end_date > now):
-                has_active_subscription = True
-                if sub.end_date:
-                    subscription_end_date = sub.end_date
-
-                # Add accessible subjects based on plan
-                if sub.plan:
-                    if sub.plan.plan_type == "premium":
-                        # Premium has access to all subjects
-                        accessible_subjects = ["all"]
-                    elif sub.subject_id:
-                        accessible_subjects.append(sub.subject_id)
+        entitlement = self.get_entitlement(db, student_id)
+        can_access = entitlement.can_access_courses
 
         return {
-            "has_active_trial": has_active_trial,
-            "has_active_subscription": has_active_subscription,
-            "trial_end_date": trial_end_date,
-            "subscription_end_date": subscription_end_date,
-            "accessible_subjects": accessible_subjects,
-            "can_access_courses": self.can_access_courses(db, student_id),
-            "can_create_courses": self.can_create_courses(db, student_id),
-            "restriction_notification": self.get_access_restriction_notification(db, student_id)
+            "has_active_trial": entitlement.has_active_trial,
+            "has_active_subscription": entitlement.has_active_subscription,
+            "trial_end_date": entitlement.trial_end_date,
+            "subscription_end_date": entitlement.subscription_end_date,
+            "accessible_subjects": entitlement.accessible_subjects,
+            "can_access_courses": can_access,
+            "can_create_courses": can_access,
+            "restriction_notification": None if can_access else RESTRICTION_NOTIFICATION
         }
 
     def get_parent_dashboard_status(self, db: Session, parent_id: int) -> Dict[str, Any]:
         """Get access status for all students of a parent"""
-        subscriptions = get_subscriptions_by_parent(db, parent_id)
+        statuses = self.summarize_subscriptions(get_subscriptions_by_parent(db, parent_id))
+        return {"student_statuses": list(statuses.values())}
 
-        now = datetime.now()
+    def summarize_subscriptions(self, subscriptions: List[Subscription]) -> Dict[int, Dict[str, Any]]:
+        """Access status per student (user id) from already loaded subscriptions"""
         student_statuses = {}
 
         for sub in subscriptions:
             student_id = sub.student_id
             if student_id not in student_statuses:
-                student_statuses[student_id] = {
-                    "student_id": student_id,
-                    "has_active_trial": False,
-                    "has_active_subscription": False,
-                    "trial_end_date": None,
-                    "subscription_end_date": None,
-                    "show_subscribe_cta": False,
-                    "trial_status": "none",
-                    "subscription_status": "none"
-                }
+                student_statuses[student_id] = empty_student_status(student_id)
 
             status_info = student_statuses[student_id]
 
+            # Statuses are kept current by the subscription scheduler, no date checks needed
             if sub.status == "trial":
                 status_info["has_active_trial"] = True
                 status_info["trial_end_date"] = sub.trial_end_date
-                if sub.trial_end_date and sub.trial_end_date > now:
-                    status_info["trial_status"] = "active"
-                else:
-                    status_info["trial_status"] = "expired"
-                    status_info["show_subscribe_cta"] = True
+                status_info["trial_status"] = "active"
 
             elif sub.status == "active":
                 status_info["has_active_subscription"] = True
                 status_info["subscription_end_date"] = sub.end_date
-                if not sub.end_date or sub.end_date > now:
-                    status_info["subscription_status"] = "active"
-                else:
+                status_info["subscription_status"] = "active"
+
+            elif sub.status == "expired" and sub.end_date is None:
+                # A trial that ran out
+                status_info["trial_end_date"] = status_info["trial_end_date"] or sub.trial_end_date
+                if status_info["trial_status"] == "none":
+                    status_info["trial_status"] = "expired"
+
+            elif sub.status in ("past_due", "expired"):
+                status_info["subscription_end_date"] = status_info["subscription_end_date"] or sub.end_date
+                if status_info["subscription_status"] == "none":
                     status_info["subscription_status"] = "expired"
-                    status_info["show_subscribe_cta"] = True
 
+        for status_info in student_statuses.values():
             # If no active trial or subscription, show CTA
-            if not status_info["has_active_trial"] and not status_info["has_active_subscription"]:
-                status_info["show_subscribe_cta"] = True
+            status_info["show_subscribe_cta"] = not (status_info["has_active_trial"] or status_info["has_active_subscription"])
 
-        return {"student_statuses": list(student_statuses.values())}
+        return student_statuses
 
 
 # Singleton instance for easy access
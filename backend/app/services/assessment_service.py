@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from venv import logger
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, text
 from app.models.assessment import (
     Assessment,
@@ -15,6 +16,7 @@ from app.models.assessment import (
     StudentKnowledgeProfile
 )
 from app.models.user import StudentProfile  # adjust import to match your structure
+from app.crud.student import record_latest_assessment
 from app.services.llm_service import llm_service as llm
 
 from app.constants import (
@@ -451,13 +453,19 @@ def find_duplicates_question(
 
     return result
 
-async def create_question(db: Session, assessment: Assessment) -> AssessmentQuestion:
+async def create_question(db: AsyncSession, assessment: Assessment) -> AssessmentQuestion:
     """
     Create a question using LLM and persist it.
-    This enforces the MAX_PER_TOPIC limit and returns the created AssessmentQuestion.
+    This enforces the MAX_PER_TOPIC limit and returns the created AssessmentQuestion
+    (with question_bank loaded).
+
+    DB work runs on the async session, so the event loop is free while the
+    LLM call is in flight; the sync helpers are reused through run_sync.
     """
 
-    total_assessment_questions = len(assessment.questions)
+    total_assessment_questions = await db.scalar(
+        select(func.count(AssessmentQuestion.id)).where(AssessmentQuestion.assessment_id == assessment.id)
+    )
 
     if total_assessment_questions >= TOTAL_QUESTIONS_PER_ASSESSMENT:
         raise ValueError("Max questions per assessment reached")
@@ -467,7 +475,10 @@ async def create_question(db: Session, assessment: Assessment) -> AssessmentQues
     subtopic_index = int(total_assessment_questions / int(TOTAL_QUESTIONS_PER_ASSESSMENT / len(subtopic_list))) if subtopic_list and len(subtopic_list) > 1 else 0
     subtopic = subtopic_list[subtopic_index] if subtopic_list else None
 
-    difficulty = calculate_difficulty_from_history(db, assessment, subtopic) if subtopic else 0.5
+    difficulty = await db.run_sync(calculate_difficulty_from_history, assessment, subtopic) if subtopic else 0.5
+
+    # Release the connection while waiting on the LLM
+    await db.commit()
 
     # Ask LLM to generate question object
     # Expected return: dict with question_text, question_type, options, correct_answer, difficulty_level, ai_feedback, topic, subtopic
@@ -482,67 +493,44 @@ async def create_question(db: Session, assessment: Assessment) -> AssessmentQues
     except Exception as e:
         raise ValueError("Failed to generate question from LLM. Error: {}".format(str(e)))
 
-    duplicates = find_duplicates_question(
-        db,
+    duplicates = await db.run_sync(
+        find_duplicates_question,
         assessment.subject,
         str(assessment.grade_level),
         payload.get("canonical_form"),
         payload.get("problem_signature")
     )
 
-    if duplicates["canonical_match"]:
-        question_bank = db.query(QuestionBank).filter(QuestionBank.id == duplicates["canonical_match"]).first()
-        existing_q = True
-    elif duplicates["signature_match"]:
-        question_bank = db.query(QuestionBank).filter(QuestionBank.id == duplicates["signature_match"]).first()
-        existing_q = True
-    else:
-        question_bank = None
-        existing_q = False
-
-    q_text = payload.get("question_text")
-    q_type = payload.get("question_type")
-    options = payload.get("options")
-    correct_answer = payload.get("correct_answer")
-    difficulty_level = difficulty_float_from_label(payload.get("difficulty_level"))
-    learning_objectives = payload.get("learning_objectives")
-    description = payload.get("description")
-    prerequisites = payload.get("prerequisites")
-    subtopic = subtopic
-    subject = payload.get("subject")
-
-    if not existing_q:
+    existing_id = duplicates["canonical_match"] or duplicates["signature_match"]
+    question_bank = await db.get(QuestionBank, existing_id) if existing_id else None
+
+    if question_bank is None:
         question_bank = QuestionBank(
-            subject=subject,
+            subject=payload.get("subject"),
             subtopic=subtopic,
             grade_level=str(assessment.grade_level),
-            prerequisites=prerequisites,
-            description=description,
-            learning_objectives=learning_objectives,
-            question_text=q_text,
-            question_type=q_type,
-            options=options,
-            correct_answer=correct_answer,
-            difficulty_level=difficulty_level,
+            prerequisites=payload.get("prerequisites"),
+            description=payload.get("description"),
+            learning_objectives=payload.get("learning_objectives"),
+            question_text=payload.get("question_text"),
+            question_type=payload.get("question_type"),
+            options=payload.get("options"),
+            correct_answer=payload.get("correct_answer"),
+            difficulty_level=difficulty_float_from_label(payload.get("difficulty_level")),
             created_at=datetime.now(timezone.utc),
         )
         db.add(question_bank)
-        db.commit()
-        db.refresh(question_bank)
-
+        await db.flush()
 
     aq = AssessmentQuestion(
         assessment_id=assessment.id,
         question_bank_id=question_bank.id,
         question_number=total_assessment_questions+1
     )
+    aq.question_bank = question_bank
 
     db.add(aq)
-    db.commit()
-    db.refresh(aq)
-    db.add(assessment)
-    db.commit()
-    db.refresh(assessment)
+    await db.commit()
     return aq
 
 
@@ -633,6 +621,7 @@ async def score_answer_and_maybe_next(db: Session, assessment: Assessment, quest
         answers_scores = [q.score or 0.0 for q in assessment.questions]
         assessment.overall_score = (sum(answers_scores) / len(answers_scores)) * 100 if answers_scores else None
         db.add(assessment)
+        record_latest_assessment(db, assessment)
         db.commit()
         db.refresh(assessment)
         return {
@@ -657,6 +646,7 @@ async def score_answer_and_maybe_next(db: Session, assessment: Assessment, quest
         answers_scores = [q.score or 0.0 for q in assessment.questions]
         assessment.overall_score = (sum(answers_scores) / len(answers_scores)) * 100 if answers_scores else None
         db.add(assessment)
+        record_latest_assessment(db, assessment)
         db.commit()
         db.refresh(assessment)
         return {
@@ -4,25 +4,32 @@ from sqlalchemy.orm import Session
 
 from app.crud.billing import (
     create_subscription, get_subscriptions_by_parent, is_in_free_trial,
-    start_free_trial, create_payment, mark_payment_as_paid,
-    get_billing_info_by_user, get_default_billing_info,
-    get_subscription_plan, get_active_subscription_plans, calculate_subscription_price,
-    get_plan_features_by_plan, get_total_subjects_count, create_trial_extension,
+    start_free_trial,
+    get_subscription_plan, calculate_subscription_price, create_trial_extension, get_billing_aggregates,
     get_trial_extensions_by_subscription
 )
 from app.crud.user import get_user
-from app.models.user import User
-from app.schemas.billing import SubscriptionCreate, PaymentCreate
+from app.schemas.billing import SubscriptionCreate
 from app.core.config import settings
+from app.core.pricing_catalog import FREE_TRIAL_DAYS, pricing_catalog
+from app.services.billing_run import MonthlyBillingRun
 from app.constants import BILLING_CYCLE_ANNUAL, BILLING_CYCLE_MONTHLY
 
 
+SUBSCRIPTION_STATUS_DETAILS = {
+    "active": "Active subscription",
+    "past_due": "Payment overdue",
+    "cancelled": "Subscription cancelled",
+    "expired": "Subscription expired",
+}
+
+
 class BillingService:
     """Service for handling billing and subscription logic"""
 
     def __init__(self):
         self.PRICE_PER_STUDENT_PER_SUBJECT = 25.00  # $25 per student per subject per month
-        self.FREE_TRIAL_DAYS = 15
+        self.FREE_TRIAL_DAYS = FREE_TRIAL_DAYS
 
     def start_free_trial_for_new_parent(
         self, db: Session, parent_id: int, student_id: Optional[int] = None, subject_id: Optional[int] = None
@@ -99,103 +106,39 @@ class BillingService:
 
         return subscriptions
 
-    def process_monthly_payments(self, db: Session) -> Dict[str, Any]:
-        """Process monthly payments for all active subscriptions"""
-        # This would typically be run as a scheduled job
-
-        # Get all parents with active subscriptions
-        all_users = db.query(User).filter(User.role == "parent").all()
-
-        results = {
-            "total_processed": 0,
-            "total_amount": 0.0,
-            "successful_payments": 0,
-            "failed_payments": 0
-        }
-
-        for parent in all_users:
-            active_subs = get_subscriptions_by_parent(db, parent.id)
-            active_subs = [sub for sub in active_subs if sub.status == "active"]
-
-            if not active_subs:
-                continue
-
-            # Get default payment method
-            billing_info = get_default_billing_info(db, parent.id)
-            if not billing_info:
-                continue
-
-            # Calculate total amount
-            total_amount = sum(float(sub.price) for sub in active_subs)
-
-            # Create payment
-            payment_data = PaymentCreate(
-                subscription_id=active_subs[0].id,  # Use first subscription as reference
-                amount=total_amount,
-                currency="USD",
-                payment_method=billing_info.payment_method or "credit_card",
-                description=f"Monthly subscription payment for {len(active_subs)} subjects"
-            )
-
-            payment = create_payment(db, payment_data)
-
-            # In a real implementation, this would call the payment gateway
-            # For now, we'll simulate successful payment
-            paid_payment = mark_payment_as_paid(db, payment.id, f"simulated_{payment.id}")
-
-            results["total_processed"] += 1
-            results["total_amount"] += total_amount
-            results["successful_payments"] += 1
-
-        return results
+    def process_monthly_payments(self, db: Session, period: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process monthly payments for all active subscriptions (scheduled job).
+        Runs the chunked, idempotent MonthlyBillingRun with its own sessions;
+        `db` is kept for compatibility with existing callers.
+        """
+        return MonthlyBillingRun().run(period).as_dict()
 
     def get_billing_summary(self, db: Session, parent_id: int) -> Dict[str, Any]:
         """Get a comprehensive billing summary for a parent"""
-        subscriptions = get_subscriptions_by_parent(db, parent_id)
-        billing_info = get_billing_info_by_user(db, parent_id)
-
-        active_subs = [sub for sub in subscriptions if sub.status in ["active", "trial"]]
-        trial_subs = [sub for sub in subscriptions if sub.status == "trial"]
-        past_due_subs = [sub for sub in subscriptions if sub.status == "past_due"]
-
-        # Calculate metrics
-        total_monthly_cost = sum(float(sub.price) for sub in active_subs)
-
-        # Find next payment date
-        next_payment_date = None
-        if active_subs:
-            # Find the earliest end date among active subscriptions
-            active_subs_sorted = sorted(active_subs, key=lambda x: x.end_date if x.end_date else datetime.max)
-            if active_subs_sorted and active_subs_sorted[0].end_date:
-                next_payment_date = active_subs_sorted[0].end_date
-
-        # Check trial status
-        in_trial = len(trial_subs) > 0
-        trial_end_date = None
-        if trial_subs:
-            trial_subs_sorted = sorted(trial_subs, key=lambda x: x.trial_end_date if x.trial_end_date else datetime.max)
-            if trial_subs_sorted and trial_subs_sorted[0].trial_end_date:
-                trial_end_date = trial_subs_sorted[0].trial_end_date
-
-        # Calculate trial start date from user registration
-        trial_start_date = None
-        if user and user.created_at and in_trial:
-            trial_start_date = user.created_at
+        totals = get_billing_aggregates(db, parent_id)
+        now = datetime.now()
+
+        # Check trial status; the trial starts at registration
+        in_trial = totals.trial > 0
+        trial_end_date = totals.earliest_trial_end
+        trial_start_date = totals.registered_at if in_trial else None
 
         return {
-            "active_subscriptions": len(active_subs),
-            "trial_subscriptions": len(trial_subs),
-            "past_due_subscriptions": len(past_due_subs),
-            "total_monthly_cost": total_monthly_cost,
-            "next_payment_date": next_payment_date,
+            "active_subscriptions": totals.active + totals.trial,
+            "trial_subscriptions": totals.trial,
+            "past_due_subscriptions": totals.past_due,
+            "total_monthly_cost": float(totals.active_and_trial_cost),
+            # Earliest end date among active subscriptions
+            "next_payment_date": totals.earliest_end_date,
             "in_free_trial": in_trial,
             "trial_end_date": trial_end_date,
             "trial_start_date": trial_start_date,
-            "days_remaining_in_trial": (trial_end_date - datetime.now()).days if trial_end_date and trial_end_date > datetime.now() else 0,
-            "payment_methods": len(billing_info),
-            "has_payment_method": len(billing_info) > 0,
-            "students_enrolled": len(set(sub.student_id for sub in subscriptions if sub.student_id)),
-            "subjects_subscribed": len(set(sub.subject_id for sub in subscriptions if sub.subject_id))
+            "days_remaining_in_trial": (trial_end_date - now).days if trial_end_date and trial_end_date > now else 0,
+            "payment_methods": totals.payment_methods,
+            "has_payment_method": totals.payment_methods > 0,
+            "students_enrolled": totals.students,
+            "subjects_subscribed": totals.subjects
         }
 
     def check_subscription_status(self, db: Session, parent_id: int, student_id: int, subject_id: Optional[int] = None) -> Dict[str, Any]:
@@ -217,29 +160,13 @@ class BillingService:
                 "message": "No subscription found"
             }
 
-        now = datetime.now()
-        can_access = False
-        status_details = ""
-
+        # Statuses are kept current by the subscription scheduler
+        can_access = target_sub.status in ("trial", "active")
+        status_details = SUBSCRIPTION_STATUS_DETAILS.get(target_sub.status, "")
         if target_sub.status == "trial":
-            if target_sub.trial_end_date and target_sub.trial_end_date > now:
-                can_access = True
-                status_details = f"Free trial active until {target_sub.trial_end_date}"
-            else:
-                status_details = "Free trial expired"
-
-        elif target_sub.status == "active":
-            if not target_sub.end_date or target_sub.end_date > now:
-                can_access = True
-                status_details = "Active subscription"
-            else:
-                status_details = "Subscription expired"
-
-        elif target_sub.status == "past_due":
-            status_details = "Payment overdue"
-
-        elif target_sub.status == "cancelled":
-            status_details = "Subscription cancelled"
+            status_details = f"Free trial active until {target_sub.trial_end_date}"
+        elif target_sub.status == "expired" and target_sub.end_date is None:
+            status_details = "Free trial expired"
 
         return {
             "has_subscription": True,
@@ -253,65 +180,8 @@ class BillingService:
         }
 
     def get_pricing_options(self, db: Session) -> Dict[str, Any]:
-        """Get available pricing options from subscription plans"""
-        plans = get_active_subscription_plans(db)
-        pricing_options = []
-
-        for plan in plans:
-            # Calculate monthly and yearly prices
-            monthly_price = calculate_subscription_price(db, plan.id, 1, BILLING_CYCLE_MONTHLY)
-            yearly_price = calculate_subscription_price(db, plan.id, 1, BILLING_CYCLE_ANNUAL)
-
-            # Get features for this plan
-            features = get_plan_features_by_plan(db, plan.id)
-
-            # Get subjects for Basic plans
-            plan_subjects = []
-            if plan.plan_type == "basic":
-                from app.crud.billing import get_plan_subjects_by_plan
-                subjects = get_plan_subjects_by_plan(db, plan.id)
-                for subject_association in subjects:
-                    if subject_association.subject:
-                        plan_subjects.append({
-                            "subject_id": subject_association.subject.id,
-                            "name": subject_association.subject.name,
-                            "description": subject_association.subject.description
-                        })
-
-            pricing_options.append({
-                "plan_id": plan.id,
-                "name": plan.name,
-                "description": plan.description,
-                "plan_type": plan.plan_type,
-                "trial_days": plan.trial_days,
-                "monthly_price": monthly_price,
-                "yearly_price": yearly_price,
-                "currency": plan.currency,
-                "features": [
-                    {"name": feature.feature_name, "description": feature.feature_description}
-                    for feature in features
-                ],
-                "subjects": plan_subjects if plan.plan_type == "basic" else ["all"]
-            })
-
-        return {
-            "pricing_options": pricing_options,
-            "free_trial_days": self.FREE_TRIAL_DAYS,
-            "available_billing_cycles": [BILLING_CYCLE_MONTHLY, BILLING_CYCLE_ANNUAL],
-            "total_subjects_available": get_total_subjects_count(db),
-            "plan_types": [
-                {
-                    "type": "basic",
-                    "description": "Covers exactly one subject",
-                    "price_description": "$25 USD per month per student per subject"
-                },
-                {
-                    "type": "premium",
-                    "description": "Covers all subjects (Math, Science, English, Humanities)",
-                    "price_description": "$80 USD per month per student"
-                }
-            ]
-        }
+        """Get available pricing options from subscription plans (served from the pricing catalog)"""
+        return pricing_catalog.get(db).pricing_options()
 
     def validate_free_trial_eligibility(self, db: Session, parent_id: int) -> Dict[str, Any]:
         """Check if a parent is eligible for a free trial"""
@@ -0,0 +1,176 @@
+# app/services/community_counters.py
+"""
+Reconciler for the denormalized community counters.
+
+posts.comment_count and user_community_counters are kept by crud.community
+in the same transaction as the post/comment/notification change, but they can
+still drift (rows changed outside the crud functions). This job recounts them
+from posts/comments/notifications in id-range batches, one transaction per
+batch, and rewrites only the counters that differ. Counter rows are locked
+before they're recounted, so a write that commits mid-reconcile is never
+overwritten with a stale count.
+
+Like the subscription scheduler, every worker runs the loop and only the
+holder of the advisory lock (app/core/advisory_lock.py) does the work.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.advisory_lock import AdvisoryLockLeader
+from app.core.config import settings
+from app.core.notification_counts import notification_count_cache
+from app.models.community import Comment, Notification, Post, UserCommunityCounters
+
+logger = logging.getLogger(__name__)
+
+
+class CommunityCounterReconciler:
+    def __init__(self, session_factory=None, leader: Optional[AdvisoryLockLeader] = None,
+                 batch_size: int = settings.COMMUNITY_COUNTERS_RECONCILE_BATCH_SIZE,
+                 interval_seconds: float = settings.COMMUNITY_COUNTERS_RECONCILE_INTERVAL_SECONDS):
+        if session_factory is None:
+            from app.core.database import SessionLocal
+            session_factory = SessionLocal
+        if leader is None:
+            from app.core.database import engine
+            leader = AdvisoryLockLeader(engine, settings.COMMUNITY_COUNTERS_LOCK_ID, "community counter reconciler")
+        self.session_factory = session_factory
+        self.leader = leader
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+
+    def reconcile_posts(self, db: Session, first_id: int, last_id: int) -> int:
+        """Fix comment_count of posts first_id..last_id; returns how many were wrong"""
+        # Lock first, count in a later statement (same reason as in reconcile_users): a single
+        # UPDATE ... SET comment_count = (subquery) would wait for an in-flight comment write and
+        # then overwrite its increment with a count from the snapshot taken before it committed
+        stored = dict(db.execute(
+            select(Post.id, Post.comment_count)
+            .where(Post.id.between(first_id, last_id))
+            .order_by(Post.id)
+            .with_for_update()
+        ).all())
+        comments = dict(db.execute(
+            select(Comment.post_id, func.count(Comment.id))
+            .where(Comment.post_id.between(first_id, last_id), Comment.is_active.is_(True))
+            .group_by(Comment.post_id)
+        ).all())
+
+        fixes = [{"id": post_id, "comment_count": comments.get(post_id, 0)}
+                 for post_id, count in stored.items() if count != comments.get(post_id, 0)]
+        if fixes:
+            db.execute(update(Post), fixes)
+        return len(fixes)
+
+    def reconcile_users(self, db: Session, first_id: int, last_id: int) -> int:
+        """Fix the counters of users first_id..last_id; returns how many were wrong or missing"""
+        in_batch = UserCommunityCounters.user_id.between(first_id, last_id)
+        user_ids = set(db.scalars(
+            select(Post.user_id).where(Post.user_id.between(first_id, last_id), Post.is_active.is_(True))
+            .union(
+                select(Comment.user_id).where(Comment.user_id.between(first_id, last_id), Comment.is_active.is_(True)),
+                select(Notification.user_id).where(Notification.user_id.between(first_id, last_id),
+                                                   Notification.is_read == False),
+            )
+        ))
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        if user_ids:
+            db.execute(insert(UserCommunityCounters).on_conflict_do_nothing(), [
+                {"user_id": user_id, "post_count": 0, "comment_count": 0, "unread_notifications": 0}
+                for user_id in sorted(user_ids)
+            ])
+
+        # Lock the rows before counting: writers bump them in the same transaction as their
+        # insert/update, so every write either committed before the lock (and is counted below)
+        # or waits for this transaction and increments the repaired value
+        stored = {
+            row.user_id: (row.post_count, row.comment_count, row.unread_notifications)
+            for row in db.execute(
+                select(UserCommunityCounters.user_id, UserCommunityCounters.post_count,
+                       UserCommunityCounters.comment_count, UserCommunityCounters.unread_notifications)
+                .where(in_batch)
+                .order_by(UserCommunityCounters.user_id)
+                .with_for_update()
+            )
+        }
+        posts = dict(db.execute(
+            select(Post.user_id, func.count(Post.id))
+            .where(Post.user_id.between(first_id, last_id), Post.is_active.is_(True))
+            .group_by(Post.user_id)
+        ).all())
+        comments = dict(db.execute(
+            select(Comment.user_id, func.count(Comment.id))
+            .where(Comment.user_id.between(first_id, last_id), Comment.is_active.is_(True))
+            .group_by(Comment.user_id)
+        ).all())
+        unread = dict(db.execute(
+            select(Notification.user_id, func.count(Notification.id))
+            .where(Notification.user_id.between(first_id, last_id), Notification.is_read == False)
+            .group_by(Notification.user_id)
+        ).all())
+
+        fixes = []
+        for user_id, counts in stored.items():
+            actual = (posts.get(user_id, 0), comments.get(user_id, 0), unread.get(user_id, 0))
+            if counts != actual:
+                fixes.append({"user_id": user_id, "post_count": actual[0], "comment_count": actual[1],
+                              "unread_notifications": actual[2]})
+        if fixes:
+            db.execute(update(UserCommunityCounters), fixes)
+            notification_count_cache.invalidate(*(fix["user_id"] for fix in fixes))
+        return len(fixes)
+
+    def _batches(self, max_id: Optional[int]):
+        for first_id in range(1, (max_id or 0) + 1, self.batch_size):
+            yield first_id, first_id + self.batch_size - 1
+
+    def run_once(self) -> Dict[str, int]:
+        """Reconcile every post and user counter; returns how many were repaired"""
+        repaired = {"posts": 0, "users": 0}
+        db = self.session_factory()
+        try:
+            max_post_id = db.scalar(select(func.max(Post.id)))
+            for first_id, last_id in self._batches(max_post_id):
+                repaired["posts"] += self.reconcile_posts(db, first_id, last_id)
+                db.commit()
+
+            max_user_id = max(
+                db.scalar(select(func.max(Post.user_id))) or 0,
+                db.scalar(select(func.max(Comment.user_id))) or 0,
+                db.scalar(select(func.max(Notification.user_id))) or 0,
+                db.scalar(select(func.max(UserCommunityCounters.user_id))) or 0,
+            )
+            for first_id, last_id in self._batches(max_user_id):
+                repaired["users"] += self.reconcile_users(db, first_id, last_id)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if any(repaired.values()):
+            logger.warning("Community counters drifted, repaired: %s", repaired)
+        return repaired
+
+    def tick(self) -> None:
+        if self.leader.acquire():
+            self.run_once()
+
+    async def run_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await loop.run_in_executor(None, self.tick)
+            except Exception:
+                logger.exception("Community counter reconcile failed")
+
+
+# Singleton
+community_counter_reconciler = CommunityCounterReconciler()
@@ -0,0 +1,119 @@
+# app/services/community_feed.py
+"""
+Community feed.
+
+A feed page is built from a fixed number of queries, whatever the page size:
+
+    1. the page of posts (keyset on created_at, id; see app/core/pagination.py),
+       with their maintained comment_count
+    2. the latest COMMUNITY_FEED_COMMENTS_PER_POST comments per post (ROW_NUMBER window)
+    3. every post and comment author on the page (id, username, full name, role)
+
+Each author summary is built once per page and shared by all of their posts
+and comments, instead of touching post.author / comment.author per row.
+Search results are loaded the same way: one query for the hits' rows and
+one for their authors.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.search import SCOPE_POSTS, community_search
+from app.crud.community import (
+    get_author_summaries, get_comments_by_post, get_latest_comments, get_post, get_posts_page,
+)
+from app.models.community import Comment, Post
+
+UNKNOWN_AUTHOR = {"id": None, "username": None, "full_name": "Deleted user", "role": None}
+
+
+class CommunityFeed:
+    def __init__(self, comments_per_post: int = settings.COMMUNITY_FEED_COMMENTS_PER_POST):
+        self.comments_per_post = comments_per_post
+
+    @staticmethod
+    def _comment(comment: Comment, authors: Dict[int, dict]) -> Dict[str, Any]:
+        return {
+            "id": comment.id,
+            "post_id": comment.post_id,
+            "user_id": comment.user_id,
+            "content": comment.content,
+            "author": authors.get(comment.user_id, UNKNOWN_AUTHOR),
+            "is_active": comment.is_active,
+            "created_at": comment.created_at,
+            "updated_at": comment.updated_at,
+        }
+
+    @staticmethod
+    def _post(post: Post, authors: Dict[int, dict], comments: List[dict]) -> Dict[str, Any]:
+        return {
+            "id": post.id,
+            "user_id": post.user_id,
+            "title": post.title,
+            "content": post.content,
+            "author": authors.get(post.user_id, UNKNOWN_AUTHOR),
+            "is_active": post.is_active,
+            "created_at": post.created_at,
+            "updated_at": post.updated_at,
+            "comments": comments,
+            "comment_count": post.comment_count,
+        }
+
+    def page(self, db: Session, cursor: Optional[str] = None, limit: int = settings.COMMUNITY_FEED_PAGE_SIZE,
+             user_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """A page of posts with comment counts, latest comments and authors, plus the next page's cursor"""
+        posts, next_cursor = get_posts_page(db, cursor, limit, user_id=user_id)
+        if not posts:
+            return [], next_cursor
+        post_ids = [post.id for post in posts]
+        comments = get_latest_comments(db, post_ids, self.comments_per_post)
+        authors = get_author_summaries(db, [post.user_id for post in posts] + [c.user_id for c in comments])
+
+        by_post: Dict[int, List[dict]] = {}
+        for comment in comments:
+            by_post.setdefault(comment.post_id, []).append(self._comment(comment, authors))
+        return [
+            self._post(post, authors, by_post.get(post.id, []))
+            for post in posts
+        ], next_cursor
+
+    def search(self, db: Session, query: str, scope: str = SCOPE_POSTS, cursor: Optional[str] = None,
+               limit: int = settings.COMMUNITY_FEED_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Ranked search results (see app/core/search.py) with their authors, plus the next page's cursor"""
+        hits, next_cursor = community_search.search(db, scope, query, cursor, limit)
+        if not hits:
+            return [], next_cursor
+        model = Post if scope == SCOPE_POSTS else Comment
+        rows = {row.id: row for row in db.query(model).filter(model.id.in_([row_id for row_id, _ in hits]))}
+        authors = get_author_summaries(db, [row.user_id for row in rows.values()])
+
+        results = []
+        for row_id, score in hits:
+            row = rows.get(row_id)
+            if row is None:  # deleted since it was indexed
+                continue
+            results.append({
+                "kind": "post" if scope == SCOPE_POSTS else "comment",
+                "id": row.id,
+                "post_id": row.id if scope == SCOPE_POSTS else row.post_id,
+                "score": score,
+                "title": row.title if scope == SCOPE_POSTS else None,
+                "content": row.content,
+                "author": authors.get(row.user_id, UNKNOWN_AUTHOR),
+                "created_at": row.created_at,
+            })
+        return results, next_cursor
+
+    def post(self, db: Session, post_id: int) -> Optional[Dict[str, Any]]:
+        """One post with all of its comments and their authors (three queries)"""
+        post = get_post(db, post_id)
+        if not post:
+            return None
+        comments = get_comments_by_post(db, post_id)
+        authors = get_author_summaries(db, [post.user_id] + [c.user_id for c in comments])
+        return self._post(post, authors, [self._comment(c, authors) for c in comments])
+
+
+# Singleton
+community_feed = CommunityFeed()
@@ -0,0 +1,73 @@
+# app/services/dashboard_service.py
+"""
+Composite parent dashboard.
+
+Everything a parent's dashboard shows is fetched in a fixed number of
+queries, however many children the parent has:
+
+    1. children with their user rows (joined)
+    2. latest assessment per child and subject (latest_assessments table)
+    3. the parent's subscriptions, summarised into access status
+    4. progress totals and current streak per child (window + GROUP BY)
+    5. badge counts per child (GROUP BY)
+"""
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.crud.billing import get_subscriptions_by_parent
+from app.crud.progress import get_badge_counts, get_progress_summaries
+from app.crud.student import get_latest_assessment_rows
+from app.crud.user import get_children_profiles
+from app.services.access_control_service import access_control_service, empty_student_status
+
+DASHBOARD_QUERY_COUNT = 5
+
+
+class DashboardService:
+    def get_parent_dashboard(self, db: Session, parent_id: int) -> Dict[str, Any]:
+        children = get_children_profiles(db, parent_id)
+        if not children:
+            return {"children": []}
+        profile_ids = [child.id for child in children]
+
+        latest = {}
+        for assessment in get_latest_assessment_rows(db, profile_ids):
+            latest.setdefault(assessment.student_id, {})[assessment.subject] = {
+                "assessment_id": assessment.assessment_id,
+                "subject": assessment.subject,
+                "status": assessment.status,
+                "overall_score": assessment.overall_score,
+                "created_at": assessment.created_at,
+                "completed_at": assessment.completed_at,
+            }
+        # Subscriptions are keyed by the student's user id, the other tables by profile id
+        access = access_control_service.summarize_subscriptions(get_subscriptions_by_parent(db, parent_id))
+        progress = get_progress_summaries(db, profile_ids)
+        badges = get_badge_counts(db, profile_ids)
+
+        return {
+            "children": [
+                {
+                    "id": child.id,
+                    "user_id": child.user_id,
+                    "age": child.age,
+                    "grade_level": child.grade_level,
+                    "user": child.user,
+                    "latest_assessments": latest.get(child.id, {}),
+                    "access": access.get(child.user_id) or empty_student_status(child.user_id),
+                    "progress": {
+                        "total_points": 0,
+                        "current_streak": 0,
+                        "total_lessons": 0,
+                        **progress.get(child.id, {}),
+                        "badges_earned": badges.get(child.id, 0),
+                    },
+                }
+                for child in children
+            ]
+        }
+
+
+# Singleton
+dashboard_service = DashboardService()
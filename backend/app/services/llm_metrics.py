@@ -0,0 +1,174 @@
+# app/services/llm_metrics.py
+import logging
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.constants import LLM_MODEL_PRICING_PER_MILLION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMCallRecord:
+    provider: str
+    model: str
+    method: str
+    latency_ms: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    retry_count: int = 0
+    success: bool = True
+    error: Optional[str] = None
+    estimated_cost_usd: Optional[float] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def cache_hit(self) -> bool:
+        return bool(self.cached_tokens)
+
+
+def estimate_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int],
+                  cached_tokens: Optional[int] = None) -> Optional[float]:
+    """Estimate USD cost of a call from the static price table. None for unknown models."""
+    pricing = LLM_MODEL_PRICING_PER_MILLION.get(model)
+    if pricing is None or prompt_tokens is None:
+        return None
+    cached = min(cached_tokens or 0, prompt_tokens)
+    cost = (
+        (prompt_tokens - cached) * pricing["input"]
+        + cached * pricing["cached_input"]
+        + (completion_tokens or 0) * pricing["output"]
+    ) / 1_000_000
+    return round(cost, 6)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LLMMetrics:
+    """
+    Collects LLM call records into a bounded in-memory ring buffer (for live
+    percentiles) and a pending queue that is flushed to the llm_call_logs table.
+    """
+
+    def __init__(self, buffer_size: int = settings.LLM_METRICS_BUFFER_SIZE, persist: bool = settings.LLM_METRICS_PERSIST):
+        self._records: Deque[LLMCallRecord] = deque(maxlen=buffer_size)
+        self._pending: Deque[LLMCallRecord] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.persist = persist
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+            if self.persist:
+                self._pending.append(record)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._records)[-limit:]
+        return [dict(asdict(r), cache_hit=r.cache_hit) for r in reversed(items)]
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-method latency percentiles, token totals and cost over the ring buffer."""
+        with self._lock:
+            records = list(self._records)
+
+        by_method: Dict[str, List[LLMCallRecord]] = {}
+        for r in records:
+            by_method.setdefault(r.method, []).append(r)
+
+        methods = {}
+        for method, items in by_method.items():
+            latencies = sorted(r.latency_ms for r in items)
+            methods[method] = {
+                "calls": len(items),
+                "errors": sum(1 for r in items if not r.success),
+                "retries": sum(r.retry_count for r in items),
+                "cache_hits": sum(1 for r in items if r.cache_hit),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "prompt_tokens": sum(r.prompt_tokens or 0 for r in items),
+                "completion_tokens": sum(r.completion_tokens or 0 for r in items),
+                "estimated_cost_usd": round(sum(r.estimated_cost_usd or 0.0 for r in items), 6),
+            }
+
+        return {
+            "window_size": len(records),
+            "buffer_capacity": self._records.maxlen,
+            "pending_persist": self.pending_count(),
+            "methods": methods,
+        }
+
+    def flush(self, batch_size: int = settings.LLM_METRICS_FLUSH_BATCH) -> int:
+        """Write pending records to llm_call_logs. Safe to call from a worker thread."""
+        if not self.persist or not self._pending:
+            return 0
+        if not self._flush_lock.acquire(blocking=False):
+            return 0  # another flush is in progress
+
+        from app.core.database import SessionLocal
+        from app.models.llm_usage import LLMCallLog
+
+        written = 0
+        try:
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+                if not batch:
+                    break
+                db = SessionLocal()
+                try:
+                    db.bulk_insert_mappings(LLMCallLog, [
+                        {
+                            "provider": r.provider,
+                            "model": r.model,
+                            "method": r.method,
+                            "latency_ms": r.latency_ms,
+                            "prompt_tokens": r.prompt_tokens,
+                            "completion_tokens": r.completion_tokens,
+                            "cached_tokens": r.cached_tokens,
+                            "cache_hit": r.cache_hit,
+                            "retry_count": r.retry_count,
+                            "success": r.success,
+                            "error": r.error,
+                            "estimated_cost_usd": r.estimated_cost_usd,
+                            "created_at": r.created_at,
+                        }
+                        for r in batch
+                    ])
+                    db.commit()
+                    written += len(batch)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to persist %d LLM call records", len(batch))
+                    break
+                finally:
+                    db.close()
+        finally:
+            self._flush_lock.release()
+        return written
+
+    def reset(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._pending.clear()
+
+
+# Singleton
+llm_metrics = LLMMetrics()
@@ -1,12 +1,15 @@
 # app/services/llm_service.py
-import os
 import json
 import re
+import time
 import random
+import asyncio
 import logging
 import unicodedata
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.services.llm_metrics import llm_metrics, LLMCallRecord, estimate_cost
+from app.services.prompt_templates import prompt_templates, PromptBudgetExceeded, RenderedPrompt
 
 import httpx
 
@@ -18,7 +21,140 @@ class LLMService:
         self.provider = settings.LLM_PROVIDER.lower()
         self.openai_api_key = settings.OPENAI_API_KEY
         self.gemini_api_key = settings.GEMINI_API_KEY
+        self.gemini_base_url = settings.GEMINI_API_BASE_URL.rstrip("/")
+        self.openai_base_url = settings.OPENAI_BASE_URL
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.timeout = settings.LLM_REQUEST_TIMEOUT_SECONDS
 
+    # ---------------------
+    # Instrumented provider calls
+    # ---------------------
+    def _record_call(self, model: str, method: str, started: float, retries: int,
+                     usage: Optional[Dict[str, int]] = None, error: Optional[Exception] = None) -> None:
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        cached_tokens = usage.get("cached_tokens")
+        llm_metrics.record(LLMCallRecord(
+            provider=self.provider,
+            model=model,
+            method=method,
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            retry_count=retries,
+            success=error is None,
+            error=f"{type(error).__name__}: {error}"[:255] if error is not None else None,
+            estimated_cost_usd=estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+        ))
+        if llm_metrics.pending_count() >= settings.LLM_METRICS_FLUSH_BATCH:
+            # Persist off the event loop; the ring buffer already has the record
+            try:
+                asyncio.get_running_loop().run_in_executor(None, llm_metrics.flush)
+            except RuntimeError:
+                llm_metrics.flush()
+
+    @staticmethod
+    def _is_retryable(exc: Exception) -> bool:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code == 429 or exc.response.status_code >= 500
+        return isinstance(exc, httpx.TransportError)
+
+    async def _gemini_generate(self, method: str, model: str, prompt: RenderedPrompt) -> str:
+        """POST a prompt to Gemini generateContent and return the first candidate's text."""
+        url = f"{self.gemini_base_url}/v1beta/models/{model}:generateContent"
+        headers = {"Content-Type": "application/json", "x-goog-api-key": self.gemini_api_key or ""}
+        # The static system part goes first so Gemini's implicit prefix caching can reuse it
+        payload = {
+            "systemInstruction": {"parts": [{"text": prompt.system}]},
+            "contents": [{"role": "user", "parts": [{"text": prompt.user}]}],
+            "generationConfig": {"responseMimeType": "application/json"},
+        }
+
+        started = time.perf_counter()
+        retries = 0
+        while True:
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    resp = await client.post(url, headers=headers, json=payload)
+                    resp.raise_for_status()
+                    data = resp.json()
+                break
+            except Exception as e:
+                if retries < self.max_retries and self._is_retryable(e):
+                    retries += 1
+                    await asyncio.sleep(0.5 * (2 ** (retries - 1)))
+                    continue
+                self._record_call(model, method, started, retries, error=e)
+                raise
+
+        usage_meta = data.get("usageMetadata") or {}
+        self._record_call(model, method, started, retries, usage={
+            "prompt_tokens": usage_meta.get("promptTokenCount"),
+            "completion_tokens": usage_meta.get("candidatesTokenCount"),
+            "cached_tokens": usage_meta.get("cachedContentTokenCount"),
+        })
+
+        return (
+            data.get("candidates", [{}])[0]
+            .get("content", {})
+            .get("parts", [{}])[0]
+            .get("text", "")
+            .strip()
+        )
+
+    def _openai_retries_taken(self, exc: Exception) -> int:
+        """Retries the OpenAI SDK made before raising: all of them for errors it retries, none otherwise"""
+        import openai
+
+        taken = getattr(exc, "retries_taken", None)
+        if taken is not None:
+            return int(taken)
+        if isinstance(exc, openai.APIConnectionError):  # includes timeouts
+            return self.max_retries
+        if isinstance(exc, openai.APIStatusError) and (exc.status_code in (408, 409, 429) or exc.status_code >= 500):
+            return self.max_retries
+        return 0
+
+    async def _openai_chat(self, method: str, model: str, prompt: RenderedPrompt, max_tokens: int) -> str:
+        """Run an OpenAI chat completion and return the message content."""
+        from openai import OpenAI
+        client = OpenAI(
+            api_key=self.openai_api_key,
+            base_url=self.openai_base_url,
+            max_retries=self.max_retries,
+            timeout=self.timeout,
+        )
+        # Identical system message first -> eligible for OpenAI's automatic prompt caching
+        messages = [
+            {"role": "system", "content": prompt.system},
+            {"role": "user", "content": prompt.user},
+        ]
+
+        started = time.perf_counter()
+        try:
+            raw = await asyncio.to_thread(
+                client.chat.completions.with_raw_response.create,
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+            )
+            resp = raw.parse()
+        except Exception as e:
+            self._record_call(model, method, started, self._openai_retries_taken(e), error=e)
+            raise
+
+        usage = resp.usage
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        retries = int(raw.retries_taken) if hasattr(raw, "retries_taken") else 0
+        self._record_call(model, method, started, retries, usage={
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+            "cached_tokens": getattr(details, "cached_tokens", None) if details else None,
+        })
+        return resp.choices[0].message.content
 
     def _safe_parse_gemini_response(self, raw_text: str):
         """
@@ -44,9 +180,8 @@ class LLMService:
             return json.loads(cleaned)
 
         except Exception as e:
-            print("Could not parse Gemini JSON directly. Raw text:")
-            print(raw_text)
-            print(f"Parser error: {e}")
+            logger.warning("Could not parse Gemini JSON (%s); %d chars of raw text", e, len(raw_text))
+            logger.debug("Unparseable Gemini text: %s", raw_text)
             return None
 
 
@@ -74,130 +209,41 @@ class LLMService:
                 "difficulty_level": difficulty_level,
             }
 
-        prompt = f"""
-            Generate EXACTLY 1 {subject} assessment question for Grade {grade_level} with difficulty '{difficulty_level}'.
-            Follow ALL rules strictly and output STRICT JSON ONLY (no extra text).
-
-            RULES:
-            1. The question MUST be appropriate for Grade {grade_level}.
-            2. The subject MUST be exactly: {subject}. No cross-subject content.
-            3. The question MUST reflect the difficulty level '{difficulty_level}'.
-            4. The question type MUST be one of: 'MCQ' or 'True/False'.
-
-            5. If question_type = 'MCQ':
-            - Provide exactly 4 answer options.
-            - The correct_answer MUST match exactly one option.
-
-            6. If question_type = 'True/False':
-            - Omit 'options'.
-            - correct_answer MUST be 'True' or 'False'.
-
-            7. The question MUST be relevant to this topic: {topic or "General"}.
-
-            8. Include:
-            - a clear 'description' of what the question assesses.
-            - 1–2 learning_objectives.
-            - prerequisites array (skills needed).
-
-            9. MUST generate a deterministic 'canonical_form'.
-            Examples:
-                Math:
-                PERIMETER_RECTANGLE(L=8,W=3)
-                SOLVE_LINEAR_EQUATION(Ax+B=C)
-                English:
-                READING_THEME(PASSAGE=HASH123)
-                VOCAB_CONTEXT(WORD=reluctant,PARA=2)
-                Science:
-                BIOLOGY_CELL_FUNCTION(MITOCHONDRIA)
-                PHYSICS_SPEED(D=20,T=4)
-                Humanities:
-                HISTORY_EVENT_DATE(WWII_END)
-                GEOGRAPHY_RIVER_LONGEST()
-            - It MUST be compact, uppercase, no spaces unless inside text.
-
-            10. MUST generate a 'problem_signature' JSON summarizing the conceptual category.
-            Example:
-            {{
-                "subject": "Math",
-                "topic": "Geometry",
-                "subtopic": "Area & Perimeter",
-                "concept": "perimeter_rectangle",
-                "operation": "calculate",
-                "grade_level": "6",
-                "difficulty": "easy"
-            }}
-
-            OUTPUT STRICT JSON ONLY (no prose):
-            {{
-            "question_text": "",
-            "question_type": "",
-            "options": [],
-            "correct_answer": "",
-            "subject": "",
-            "subtopic": "",
-            "difficulty_level": "",
-            "learning_objectives": [],
-            "description": "",
-            "prerequisites": [],
-            "canonical_form": "",
-            "problem_signature": {{}},
-            }}
-        """
-
-        logger.debug("LLM Question Prompt: %s", prompt)
-        print("LLM Question Prompt: ", prompt)
+        try:
+            prompt = prompt_templates.render(
+                "generate_question",
+                subject=subject,
+                grade_level=grade_level,
+                difficulty_level=difficulty_level,
+                topic=topic or "General",
+            )
+        except PromptBudgetExceeded:
+            # No local fallback for questions; fails like a provider error (create_question reports it)
+            logger.exception("Question prompt over budget")
+            raise
+        logger.debug("LLM Question Prompt: %s", prompt.user)
 
         if self.provider == "openai":
             try:
-                from openai import OpenAI
-                client = OpenAI(api_key=self.openai_api_key)
-
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an educational question generator."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=400,
-                )
-                text = resp.choices[0].message["content"]
+                text = await self._openai_chat("generate_question", "gpt-4o-mini", prompt, max_tokens=400)
                 data = json.loads(text)
                 return data
-            except Exception as e:
+            except Exception:
                 logger.exception("Failed to generate or parse OpenAI question")
                 raise
 
         elif self.provider == "gemini":
             try:
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={self.gemini_api_key}"
-                headers = {"Content-Type": "application/json"}
-                payload = {
-                    "contents": [{"parts": [{"text": json.dumps(prompt)}]}],
-                }
-
-                async with httpx.AsyncClient(timeout=60) as client:
-                    resp = await client.post(url, headers=headers, json=payload)
-                    print("Gemini response:", resp.text)
-                    resp.raise_for_status()
-                    data = resp.json()
-
-                text = (
-                    data.get("candidates", [{}])[0]
-                    .get("content", {})
-                    .get("parts", [{}])[0]
-                    .get("text", "")
-                    .strip()
-                )
-                # --- Clean up Markdown code fences ---
+                text = await self._gemini_generate("generate_question", "gemini-2.5-flash", prompt)
 
                 try:
-                    logger.debug("LLM Question Prompt: %s", text)
+                    logger.debug("LLM Question Response: %s", text)
                     return self._safe_parse_gemini_response(text)
                 except json.JSONDecodeError:
                     logger.warning("⚠️ Could not parse Gemini JSON directly. Raw text:\n%s", text)
                     # Fallback: wrap raw text in a basic dict
                     return {"question_text": text, "question_type": "open", "options": [], "correct_answer": "", "topic": topic or "General", "subtopic": None, "difficulty_level": difficulty_level}
-            except Exception as e:
+            except Exception:
                 logger.exception("Failed to generate or parse Gemini question")
                 raise
 
@@ -212,40 +258,22 @@ class LLMService:
         Return: { is_correct: bool, score: float (0-1), feedback: str }
         """
         if self.provider == "mock":
-            correct = str(question.get("correct_answer", "")).strip().lower()
-            ans = (student_answer or "").strip().lower()
-            is_correct = False
-            if question.get("question_type") == "multiple_choice":
-                is_correct = ans == correct.lower()
-            else:
-                is_correct = correct and (correct in ans)
-            return {
-                "is_correct": bool(is_correct),
-                "score": 1.0 if is_correct else 0.0,
-                "feedback": "Correct!" if is_correct else "Not quite — review the concept.",
-            }
+            return self._local_score(question, student_answer)
 
-        grading_prompt = (
-            "Grade the student's answer. "
-            f"Question: {question.get('question_text')}\n"
-            f"Correct answer: {question.get('correct_answer')}\n"
-            f"Student answer: {student_answer}\n"
-            "Output only JSON with keys: {is_correct: bool, score: float, feedback: str}"
-        )
+        try:
+            grading_prompt = prompt_templates.render(
+                "score_answer",
+                question_text=question.get("question_text"),
+                correct_answer=question.get("correct_answer"),
+                student_answer=student_answer,
+            )
+        except PromptBudgetExceeded:
+            logger.warning("Grading prompt over budget (answer of %d chars); grading locally", len(student_answer or ""))
+            return self._local_score(question, student_answer)
 
         if self.provider == "openai":
             try:
-                from openai import OpenAI
-                client = OpenAI(api_key=self.openai_api_key)
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an objective grader."},
-                        {"role": "user", "content": grading_prompt},
-                    ],
-                    max_tokens=256,
-                )
-                text = resp.choices[0].message["content"]
+                text = await self._openai_chat("score_answer", "gpt-4o-mini", grading_prompt, max_tokens=256)
                 return json.loads(text)
             except Exception:
                 logger.exception("OpenAI grading parse error")
@@ -253,22 +281,7 @@ class LLMService:
 
         elif self.provider == "gemini":
             try:
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.gemini_api_key}"
-                headers = {"Content-Type": "application/json"}
-                payload = {"contents": [{"parts": [{"text": grading_prompt}]}]}
-
-                async with httpx.AsyncClient(timeout=60) as client:
-                    resp = await client.post(url, headers=headers, json=payload)
-                    resp.raise_for_status()
-                    data = resp.json()
-
-                text = (
-                    data.get("candidates", [{}])[0]
-                    .get("content", {})
-                    .get("parts", [{}])[0]
-                    .get("text", "")
-                    .strip()
-                )
+                text = await self._gemini_generate("score_answer", "gemini-1.5-flash", grading_prompt)
                 return json.loads(text)
             except Exception:
                 logger.exception("Gemini grading parse error")
@@ -276,6 +289,22 @@ class LLMService:
 
         raise NotImplementedError(f"LLM provider {self.provider} not implemented")
 
+    @staticmethod
+    def _local_score(question: Dict[str, Any], student_answer: str) -> Dict[str, Any]:
+        """Exact/substring match against correct_answer; the mock provider and the over-budget fallback"""
+        correct = str(question.get("correct_answer", "")).strip().lower()
+        ans = (student_answer or "").strip().lower()
+        is_correct = False
+        if question.get("question_type") == "multiple_choice":
+            is_correct = ans == correct.lower()
+        else:
+            is_correct = correct and (correct in ans)
+        return {
+            "is_correct": bool(is_correct),
+            "score": 1.0 if is_correct else 0.0,
+            "feedback": "Correct!" if is_correct else "Not quite — review the concept.",
+        }
+
     # ---------------------
     # Study plan generation
     # ---------------------
@@ -283,60 +312,50 @@ class LLMService:
         self, mastery_map: Dict[str, float], subject: str, grade_level: str, top_n: int = 5
     ) -> Dict[str, Any]:
         if self.provider == "mock":
-            items = sorted(mastery_map.items(), key=lambda x: x[1])[:top_n]
-            lessons = []
-            for week, (topic, score) in enumerate(items, start=1):
-                lessons.append(
-                    {
-                        "title": f"Practice {topic}",
-                        "topic": topic,
-                        "suggested_duration_mins": 20,
-                        "week": week,
-                        "details": f"Work through fundamentals of {topic}. 3 practice problems, 1 short quiz.",
-                    }
-                )
-            return {
-                "summary": f"Focus on {', '.join([t for t, _ in items])}",
-                "lessons": lessons,
-            }
+            return self._local_study_plan(mastery_map, top_n)
 
-        study_prompt = (
-            f"Generate a {subject} study plan for {grade_level} student. "
-            f"Mastery map: {json.dumps(mastery_map)}. Focus on weakest {top_n} topics. "
-            "Return JSON: {summary: str, lessons: [{title, topic, suggested_duration_mins, week, details}]}"
-        )
+        try:
+            study_prompt = prompt_templates.render(
+                "generate_study_plan",
+                subject=subject,
+                grade_level=grade_level,
+                mastery_map=json.dumps(mastery_map),
+                top_n=top_n,
+            )
+        except PromptBudgetExceeded:
+            logger.warning("Study plan prompt over budget (%d topics); building the plan locally", len(mastery_map))
+            return self._local_study_plan(mastery_map, top_n)
 
         if self.provider == "openai":
-            from openai import OpenAI
-            client = OpenAI(api_key=self.openai_api_key)
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": study_prompt}],
-                max_tokens=512,
-            )
-            return json.loads(resp.choices[0].message["content"])
+            text = await self._openai_chat("generate_study_plan", "gpt-4o-mini", study_prompt, max_tokens=512)
+            return json.loads(text)
 
         elif self.provider == "gemini":
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.gemini_api_key}"
-            headers = {"Content-Type": "application/json"}
-            payload = {"contents": [{"parts": [{"text": study_prompt}]}]}
-
-            async with httpx.AsyncClient(timeout=60) as client:
-                resp = await client.post(url, headers=headers, json=payload)
-                resp.raise_for_status()
-                data = resp.json()
-
-            text = (
-                data.get("candidates", [{}])[0]
-                .get("content", {})
-                .get("parts", [{}])[0]
-                .get("text", "")
-                .strip()
-            )
+            text = await self._gemini_generate("generate_study_plan", "gemini-1.5-flash", study_prompt)
             return json.loads(text)
 
         raise NotImplementedError(f"LLM provider {self.provider} not implemented")
 
+    @staticmethod
+    def _local_study_plan(mastery_map: Dict[str, float], top_n: int) -> Dict[str, Any]:
+        """One lesson per week on the weakest topics; the mock provider and the over-budget fallback"""
+        items = sorted(mastery_map.items(), key=lambda x: x[1])[:top_n]
+        lessons = []
+        for week, (topic, score) in enumerate(items, start=1):
+            lessons.append(
+                {
+                    "title": f"Practice {topic}",
+                    "topic": topic,
+                    "suggested_duration_mins": 20,
+                    "week": week,
+                    "details": f"Work through fundamentals of {topic}. 3 practice problems, 1 short quiz.",
+                }
+            )
+        return {
+            "summary": f"Focus on {', '.join([t for t, _ in items])}",
+            "lessons": lessons,
+        }
+
 
 # Singleton
 llm_service = LLMService()
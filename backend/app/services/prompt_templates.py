@@ -0,0 +1,112 @@
+# app/services/prompt_templates.py
+import logging
+import math
+import re
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE_HEADER = re.compile(r"^# (\S+)\s*$", re.MULTILINE)
+_SECTION_HEADER = re.compile(r"^## (SYSTEM|USER):\s*$", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting before a call."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+class PromptBudgetExceeded(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    name: str
+    system: str
+    user: str
+    estimated_tokens: int
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt split into a static system part (identical on every call, so the
+    provider can cache it as a prefix) and a small user part with {placeholders}.
+    """
+    name: str
+    system: str
+    user: str
+    fields: FrozenSet[str]
+    system_tokens: int
+
+    @classmethod
+    def compile(cls, name: str, system: str, user: str) -> "PromptTemplate":
+        fields = frozenset(f for _, f, _, _ in string.Formatter().parse(user) if f)
+        return cls(name=name, system=system, user=user, fields=fields, system_tokens=estimate_tokens(system))
+
+    def render(self, **values) -> RenderedPrompt:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for: {', '.join(sorted(missing))}")
+        user = self.user.format(**values)
+        return RenderedPrompt(
+            name=self.name,
+            system=self.system,
+            user=user,
+            estimated_tokens=self.system_tokens + estimate_tokens(user),
+        )
+
+
+def parse_prompt_templates(text: str) -> Dict[str, PromptTemplate]:
+    """
+    Parse a prompts markdown file. Each template starts with `# <name>` followed
+    by `## SYSTEM:` and `## USER:` sections (see app/prompts/llm_prompts.md).
+    """
+    templates: Dict[str, PromptTemplate] = {}
+    headers = list(_TEMPLATE_HEADER.finditer(text))
+    for i, header in enumerate(headers):
+        body = text[header.end(): headers[i + 1].start() if i + 1 < len(headers) else len(text)]
+        sections: Dict[str, str] = {}
+        parts = list(_SECTION_HEADER.finditer(body))
+        for j, part in enumerate(parts):
+            end = parts[j + 1].start() if j + 1 < len(parts) else len(body)
+            sections[part.group(1)] = body[part.end():end].strip()
+        if "USER" not in sections:
+            raise ValueError(f"Prompt template '{header.group(1)}' has no USER section")
+        templates[header.group(1)] = PromptTemplate.compile(header.group(1), sections.get("SYSTEM", ""), sections["USER"])
+    return templates
+
+
+class PromptRegistry:
+    """Loads templates once at startup and renders them within per-method token budgets."""
+
+    def __init__(self, path: str = settings.LLM_PROMPT_TEMPLATES_PATH,
+                 budgets: Optional[Dict[str, int]] = None):
+        self.path = Path(path)
+        self.budgets = budgets if budgets is not None else settings.LLM_PROMPT_TOKEN_BUDGETS
+        self._templates = parse_prompt_templates(self.path.read_text(encoding="utf-8"))
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt template '{name}'") from None
+
+    def render(self, name: str, /, **values) -> RenderedPrompt:
+        prompt = self.get(name).render(**values)
+        budget = self.budgets.get(name)
+        if budget is not None and prompt.estimated_tokens > budget:
+            raise PromptBudgetExceeded(
+                f"Prompt '{name}' is ~{prompt.estimated_tokens} tokens, over its budget of {budget}"
+            )
+        logger.debug("Rendered prompt %s (~%d tokens)", name, prompt.estimated_tokens)
+        return prompt
+
+
+# Singleton
+prompt_templates = PromptRegistry()
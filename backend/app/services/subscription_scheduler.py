@@ -0,0 +1,202 @@
+# app/services/subscription_scheduler.py
+"""
+Background scheduler for trial and subscription expiry.
+
+Statuses are moved forward in batched updates as their dates pass:
+
+    trial     -> expired   at trial_end_date
+    active    -> past_due  at end_date (the renewal payment is due)
+    past_due  -> expired   SUBSCRIPTION_PAST_DUE_GRACE_DAYS after end_date
+
+so read paths can trust the stored status instead of re-checking dates.
+Each transition also drops the subscriptions' entitlement rows and notifies
+the parent (one notification per parent and transition per batch, pushed to
+their open notification streams).
+
+Every worker runs the loop, but only the holder of a Postgres advisory lock
+(see app/core/advisory_lock.py) does the work. The leader sleeps until the
+next known expiry, capped at SUBSCRIPTION_SCHEDULER_MAX_SLEEP_SECONDS so
+subscriptions created meanwhile are picked up.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.advisory_lock import AdvisoryLockLeader
+from app.core.config import settings
+from app.core.entitlement_cache import entitlement_cache
+from app.core.notification_counts import notification_count_cache
+from app.crud.community import bump_unread_notifications, publish_notification_events
+from app.models.billing import EntitlementGrant, Subscription, SubscriptionStatus
+from app.models.community import Notification
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Transition:
+    name: str
+    from_status: SubscriptionStatus
+    to_status: SubscriptionStatus
+    date_column: str
+    title: str
+    message: str
+    grace: timedelta = timedelta(0)
+
+    def due_before(self, now: datetime) -> datetime:
+        return now - self.grace
+
+
+def default_transitions(past_due_grace_days: int = settings.SUBSCRIPTION_PAST_DUE_GRACE_DAYS) -> List[Transition]:
+    return [
+        Transition(
+            "trial_expired", SubscriptionStatus.TRIAL, SubscriptionStatus.EXPIRED, "trial_end_date",
+            "Free trial ended",
+            "Your free trial has ended. Subscribe to a plan to keep access to courses and assessments.",
+        ),
+        Transition(
+            "subscription_past_due", SubscriptionStatus.ACTIVE, SubscriptionStatus.PAST_DUE, "end_date",
+            "Payment due",
+            "Your subscription period has ended and the renewal payment is due. "
+            "Please check your payment method to keep access.",
+        ),
+        Transition(
+            "subscription_expired", SubscriptionStatus.PAST_DUE, SubscriptionStatus.EXPIRED, "end_date",
+            "Subscription expired",
+            "Your subscription has expired because the renewal payment wasn't received. "
+            "Subscribe to a plan to continue.",
+            grace=timedelta(days=past_due_grace_days),
+        ),
+    ]
+
+
+class SubscriptionScheduler:
+    def __init__(self, session_factory=None, leader: Optional[AdvisoryLockLeader] = None,
+                 batch_size: int = settings.SUBSCRIPTION_SCHEDULER_BATCH_SIZE,
+                 max_sleep_seconds: float = settings.SUBSCRIPTION_SCHEDULER_MAX_SLEEP_SECONDS,
+                 transitions: Optional[List[Transition]] = None):
+        if session_factory is None:
+            from app.core.database import SessionLocal
+            session_factory = SessionLocal
+        if leader is None:
+            from app.core.database import engine
+            leader = AdvisoryLockLeader(engine, settings.SUBSCRIPTION_SCHEDULER_LOCK_ID, "subscription scheduler")
+        self.session_factory = session_factory
+        self.leader = leader
+        self.batch_size = batch_size
+        self.max_sleep_seconds = max_sleep_seconds
+        self.transitions = transitions or default_transitions()
+
+    def apply_batch(self, db: Session, transition: Transition, now: datetime) -> int:
+        """Move one batch of due subscriptions; returns how many moved (0 = done)."""
+        date_column = getattr(Subscription, transition.date_column)
+        rows = db.execute(
+            select(Subscription.id, Subscription.parent_id, Subscription.student_id)
+            .where(
+                Subscription.status == transition.from_status,
+                date_column.isnot(None),
+                date_column <= transition.due_before(now),
+            )
+            .order_by(Subscription.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            db.commit()
+            return 0
+
+        ids = [row.id for row in rows]
+        db.execute(
+            update(Subscription)
+            .where(Subscription.id.in_(ids), Subscription.status == transition.from_status)
+            .values(status=transition.to_status)
+            .execution_options(synchronize_session=False)
+        )
+        # Neither past_due nor expired subscriptions grant access
+        db.query(EntitlementGrant).filter(EntitlementGrant.subscription_id.in_(ids)).delete(synchronize_session=False)
+        parent_ids = sorted({row.parent_id for row in rows})
+        notifications = db.execute(Notification.__table__.insert().returning(*Notification.__table__.c), [
+            {"user_id": parent_id, "title": transition.title, "message": transition.message, "is_read": False}
+            for parent_id in parent_ids
+        ]).all()
+        bump_unread_notifications(db, parent_ids)
+        db.commit()
+
+        entitlement_cache.invalidate(*{row.student_id for row in rows}, *parent_ids)
+        notification_count_cache.invalidate(*parent_ids)
+        publish_notification_events(db, parent_ids, notifications)
+        return len(rows)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Apply every due transition; returns the number of subscriptions moved per transition."""
+        now = now or datetime.now(timezone.utc)
+        moved = {}
+        db = self.session_factory()
+        try:
+            for transition in self.transitions:
+                total = 0
+                while True:
+                    count = self.apply_batch(db, transition, now)
+                    total += count
+                    if count < self.batch_size:
+                        break
+                moved[transition.name] = total
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if any(moved.values()):
+            logger.info("Subscription scheduler transitions: %s", moved)
+        return moved
+
+    def next_due(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """When the earliest pending transition falls due (uses the status indexes)."""
+        now = now or datetime.now(timezone.utc)
+        db = self.session_factory()
+        try:
+            due = []
+            for transition in self.transitions:
+                date_column = getattr(Subscription, transition.date_column)
+                earliest = db.execute(
+                    select(func.min(date_column)).where(
+                        Subscription.status == transition.from_status, date_column.isnot(None)
+                    )
+                ).scalar()
+                if earliest is not None:
+                    if earliest.tzinfo is None:
+                        earliest = earliest.replace(tzinfo=timezone.utc)
+                    due.append(earliest + transition.grace)
+            return min(due) if due else None
+        finally:
+            db.close()
+
+    def tick(self) -> float:
+        """One scheduler round; returns how long to sleep before the next one."""
+        if not self.leader.acquire():
+            return self.max_sleep_seconds
+        self.run_once()
+        next_due = self.next_due()
+        if next_due is None:
+            return self.max_sleep_seconds
+        wait = (next_due - datetime.now(timezone.utc)).total_seconds()
+        return min(self.max_sleep_seconds, max(1.0, wait))
+
+    async def run_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                delay = await loop.run_in_executor(None, self.tick)
+            except Exception:
+                logger.exception("Subscription scheduler round failed")
+                delay = self.max_sleep_seconds
+            await asyncio.sleep(delay)
+
+
+# Singleton
+subscription_scheduler = SubscriptionScheduler()
@@ -0,0 +1,412 @@
+# app/services/webhook_service.py
+"""
+Durable Stripe webhook ingestion.
+
+POST /billing/stripe-webhook only verifies the signature and inserts the
+event into the webhook_events inbox (keyed by Stripe's event id, so
+redeliveries are no-ops) before acking. WebhookProcessor then applies the
+events in the background:
+
+- events are ordered per ordering_key (the subscription they concern); only
+  the oldest unfinished event of a key is processed, so a retrying event
+  holds back later events for the same subscription but not for others
+- heads of different keys run concurrently on a thread pool
+- failures are retried with exponential backoff and dead-lettered
+  (status "dead") after WEBHOOK_MAX_ATTEMPTS; scripts/replay_webhook_events.py
+  puts events back in the queue
+- handlers are idempotent (payments are deduplicated on the payment intent
+  id), since an event may be applied again after a crash
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.billing import (
+    get_payment_by_transaction_id, get_payments_by_subscription, get_subscription, refresh_student_entitlements
+)
+from app.models.billing import Payment, PaymentStatus
+from app.models.webhook_event import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_PENDING = "pending"
+EVENT_PROCESSING = "processing"
+EVENT_FAILED = "failed"  # waiting for a retry
+EVENT_PROCESSED = "processed"
+EVENT_DEAD = "dead"
+
+
+class WebhookSignatureError(ValueError):
+    pass
+
+
+# ---------------------
+# Signatures (Stripe's scheme: HMAC-SHA256 over "<timestamp>.<payload>")
+# ---------------------
+def sign_stripe_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Build a Stripe-Signature header value (for fixtures and local testing)."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def verify_stripe_signature(payload: bytes, sig_header: Optional[str], secret: str,
+                            tolerance: int = settings.STRIPE_WEBHOOK_TOLERANCE_SECONDS) -> Dict[str, Any]:
+    """Verify the Stripe-Signature header and return the decoded event."""
+    if not sig_header:
+        raise WebhookSignatureError("Missing Stripe-Signature header")
+    timestamp, signatures = None, []
+    for part in sig_header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise WebhookSignatureError("Malformed Stripe-Signature header")
+
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, s) for s in signatures):
+        raise WebhookSignatureError("No signatures found matching the expected signature")
+    if tolerance and abs(time.time() - int(timestamp)) > tolerance:
+        raise WebhookSignatureError("Timestamp outside the tolerance zone")
+
+    try:
+        event = json.loads(payload)
+    except ValueError as e:
+        raise WebhookSignatureError(f"Invalid payload: {e}")
+    if not isinstance(event, dict) or not event.get("id") or not event.get("type"):
+        raise WebhookSignatureError("Payload is not a Stripe event")
+    return event
+
+
+def ordering_key_for(event: Dict[str, Any]) -> str:
+    obj = (event.get("data") or {}).get("object") or {}
+    subscription_id = (obj.get("metadata") or {}).get("subscription_id")
+    if subscription_id:
+        return f"subscription:{subscription_id}"
+    return f"object:{obj.get('id') or event['id']}"
+
+
+def new_webhook_event(event: Dict[str, Any]) -> WebhookEvent:
+    return WebhookEvent(
+        id=event["id"],
+        source="stripe",
+        type=event["type"],
+        ordering_key=ordering_key_for(event),
+        payload=event,
+        stripe_created=event.get("created"),
+        status=EVENT_PENDING,
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+
+
+# ---------------------
+# Event handlers (idempotent; each commits via refresh_student_entitlements)
+# ---------------------
+def _subscription_from_metadata(db: Session, obj: Dict[str, Any]):
+    subscription_id = (obj.get("metadata") or {}).get("subscription_id")
+    return get_subscription(db, int(subscription_id)) if subscription_id else None
+
+
+def handle_payment_success(db: Session, payment_intent: Dict[str, Any]) -> None:
+    """Record the payment (once per payment intent) and activate the subscription"""
+    subscription = _subscription_from_metadata(db, payment_intent)
+    if not subscription:
+        return
+
+    if get_payment_by_transaction_id(db, payment_intent["id"]) is None:
+        db.add(Payment(
+            subscription_id=subscription.id,
+            amount=payment_intent.get("amount", 0) / 100,  # Convert from cents
+            currency=(payment_intent.get("currency") or "usd").upper(),
+            payment_method=payment_intent.get("payment_method") or "credit_card",
+            transaction_id=payment_intent["id"],
+            status=PaymentStatus.PAID,
+            payment_date=datetime.now(timezone.utc),
+            description=f"Payment for subscription {subscription.id}",
+        ))
+
+    subscription.status = "active"
+    subscription.payment_status = "paid"
+    db.flush()
+    refresh_student_entitlements(db, subscription.student_id)
+
+
+def handle_payment_failed(db: Session, payment_intent: Dict[str, Any]) -> None:
+    """Mark the payment failed and the subscription past due"""
+    subscription = _subscription_from_metadata(db, payment_intent)
+    if not subscription:
+        return
+
+    error = payment_intent.get("last_payment_error") or {}
+    for payment in get_payments_by_subscription(db, subscription.id):
+        if payment.transaction_id == payment_intent["id"]:
+            payment.status = "failed"
+            payment.description = f"Payment failed: {error.get('message') or 'Unknown error'}"
+            break
+
+    subscription.status = "past_due"
+    subscription.payment_status = "failed"
+    db.flush()
+    refresh_student_entitlements(db, subscription.student_id)
+
+
+# Stripe subscription status -> our SubscriptionStatus
+STRIPE_SUBSCRIPTION_STATUS = {
+    "active": "active",
+    "trialing": "trial",
+    "canceled": "cancelled",
+    "past_due": "past_due",
+    "unpaid": "past_due",
+    "incomplete": "past_due",
+    "incomplete_expired": "expired",
+}
+
+
+def handle_subscription_update(db: Session, stripe_subscription: Dict[str, Any]) -> None:
+    """Mirror Stripe's subscription status"""
+    subscription = _subscription_from_metadata(db, stripe_subscription)
+    if not subscription:
+        return
+
+    stripe_status = stripe_subscription.get("status")
+    subscription.status = STRIPE_SUBSCRIPTION_STATUS.get(stripe_status, "active")
+    subscription.payment_status = "paid" if stripe_status == "active" else "pending"
+    if stripe_subscription.get("current_period_end"):
+        # A renewal moves the end date; the expiry scheduler goes by it
+        subscription.end_date = datetime.fromtimestamp(stripe_subscription["current_period_end"], timezone.utc)
+    db.flush()
+    refresh_student_entitlements(db, subscription.student_id)
+
+
+def handle_subscription_cancellation(db: Session, stripe_subscription: Dict[str, Any]) -> None:
+    """End the subscription"""
+    subscription = _subscription_from_metadata(db, stripe_subscription)
+    if not subscription:
+        return
+
+    if subscription.status != "cancelled":
+        subscription.status = "cancelled"
+        subscription.end_date = datetime.now(timezone.utc)
+    db.flush()
+    refresh_student_entitlements(db, subscription.student_id)
+
+
+EVENT_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], None]] = {
+    "payment_intent.succeeded": handle_payment_success,
+    "payment_intent.payment_failed": handle_payment_failed,
+    "customer.subscription.updated": handle_subscription_update,
+    "customer.subscription.deleted": handle_subscription_cancellation,
+}
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class WebhookProcessor:
+    def __init__(self, session_factory=None, workers: int = settings.WEBHOOK_WORKERS,
+                 batch_size: int = settings.WEBHOOK_BATCH_SIZE,
+                 max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS,
+                 retry_base_seconds: float = settings.WEBHOOK_RETRY_BASE_SECONDS,
+                 processing_timeout_seconds: float = settings.WEBHOOK_PROCESSING_TIMEOUT_SECONDS,
+                 handlers: Optional[Dict[str, Callable]] = None):
+        self._session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.processing_timeout_seconds = processing_timeout_seconds
+        self.handlers = EVENT_HANDLERS if handlers is None else handlers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(3600.0, self.retry_base_seconds * (2 ** max(0, attempts - 1)))
+
+    def claim_batch(self) -> List[str]:
+        """
+        Claim the head (oldest unfinished event) of each ordering key if it is
+        due. A head that is processing elsewhere or waiting for a retry blocks
+        its key.
+        """
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=self.processing_timeout_seconds)
+        db = self.session_factory()
+        try:
+            rows = db.query(
+                WebhookEvent.id, WebhookEvent.ordering_key, WebhookEvent.status,
+                WebhookEvent.next_attempt_at, WebhookEvent.locked_at
+            ).filter(
+                WebhookEvent.status.in_([EVENT_PENDING, EVENT_FAILED, EVENT_PROCESSING])
+            ).order_by(
+                WebhookEvent.stripe_created, WebhookEvent.received_at, WebhookEvent.id
+            ).limit(self.batch_size * 5).all()
+
+            seen_keys = set()
+            claimed = []
+            for row in rows:
+                if row.ordering_key in seen_keys:
+                    continue
+                seen_keys.add(row.ordering_key)
+                if row.status == EVENT_PROCESSING:
+                    locked_at = _as_utc(row.locked_at)
+                    if locked_at is not None and locked_at > stale_before:
+                        continue
+                elif _as_utc(row.next_attempt_at) is not None and _as_utc(row.next_attempt_at) > now:
+                    continue
+
+                # Conditional update: only one worker/process wins the claim
+                result = db.execute(
+                    update(WebhookEvent)
+                    .where(WebhookEvent.id == row.id, WebhookEvent.status == row.status,
+                           or_(WebhookEvent.locked_at.is_(None), WebhookEvent.locked_at == row.locked_at))
+                    .values(status=EVENT_PROCESSING, locked_at=now)
+                )
+                if result.rowcount == 1:
+                    claimed.append(row.id)
+                if len(claimed) >= self.batch_size:
+                    break
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def process_event(self, event_id: str) -> str:
+        """Apply one claimed event; returns its new status."""
+        db = self.session_factory()
+        try:
+            event = db.get(WebhookEvent, event_id)
+            if event is None:
+                return EVENT_PROCESSED
+            handler = self.handlers.get(event.type)
+            error = None
+            try:
+                if handler is not None:
+                    handler(db, (event.payload.get("data") or {}).get("object") or {})
+                else:
+                    logger.debug("Ignoring webhook event %s of type %s", event.id, event.type)
+            except Exception as e:
+                db.rollback()
+                error = e
+
+            event = db.get(WebhookEvent, event_id)
+            event.attempts = (event.attempts or 0) + 1
+            event.locked_at = None
+            if error is None:
+                event.status = EVENT_PROCESSED
+                event.processed_at = datetime.now(timezone.utc)
+                event.last_error = None
+            else:
+                event.last_error = f"{type(error).__name__}: {error}"[:2000]
+                if event.attempts >= self.max_attempts:
+                    event.status = EVENT_DEAD
+                    logger.error("Webhook event %s (%s) dead-lettered after %d attempts: %s",
+                                 event.id, event.type, event.attempts, event.last_error)
+                else:
+                    event.status = EVENT_FAILED
+                    event.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(event.attempts))
+                    logger.warning("Webhook event %s (%s) failed (attempt %d): %s",
+                                   event.id, event.type, event.attempts, event.last_error)
+            db.commit()
+            return event.status
+        finally:
+            db.close()
+
+    def process_due(self) -> int:
+        """Claim and process one batch of key heads concurrently; returns the number processed."""
+        event_ids = self.claim_batch()
+        if not event_ids:
+            return 0
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="webhook")
+        list(self._pool.map(self.process_event, event_ids))
+        return len(event_ids)
+
+    def drain(self, max_rounds: int = 1000) -> int:
+        """Process until nothing is due (tests, replay tool)."""
+        total = 0
+        for _ in range(max_rounds):
+            processed = self.process_due()
+            if not processed:
+                break
+            total += processed
+        return total
+
+    def requeue(self, db: Session, event_ids: Optional[Iterable[str]] = None,
+                statuses: Optional[Iterable[str]] = None, since: Optional[datetime] = None) -> int:
+        """Put events back in the queue (replay). Selects by id and/or status and received_at."""
+        query = db.query(WebhookEvent)
+        if event_ids:
+            query = query.filter(WebhookEvent.id.in_(list(event_ids)))
+        if statuses:
+            query = query.filter(WebhookEvent.status.in_(list(statuses)))
+        if since is not None:
+            query = query.filter(WebhookEvent.received_at >= since)
+        count = query.update({
+            WebhookEvent.status: EVENT_PENDING,
+            WebhookEvent.attempts: 0,
+            WebhookEvent.next_attempt_at: datetime.now(timezone.utc),
+            WebhookEvent.locked_at: None,
+            WebhookEvent.last_error: None,
+        }, synchronize_session=False)
+        db.commit()
+        self.wake()
+        return count
+
+    def stats(self, db: Session) -> Dict[str, int]:
+        rows = db.query(WebhookEvent.status, func.count(WebhookEvent.id)).group_by(WebhookEvent.status).all()
+        return {status: count for status, count in rows}
+
+    # ---------------------
+    # Background loop (started from app startup)
+    # ---------------------
+    def wake(self) -> None:
+        """Nudge the background loop after enqueueing (safe from any thread)."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run_forever(self, poll_seconds: float = settings.WEBHOOK_POLL_SECONDS) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self._loop.run_in_executor(None, self.process_due)
+            except Exception:
+                logger.exception("Webhook processing round failed")
+                processed = 0
+            if processed:
+                continue  # keep draining while there's work
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+# Singleton
+webhook_processor = WebhookProcessor()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Billing summary benchmark.
+
+Seeds one parent with --children subscriptions and --years of monthly
+payments per subscription in the configured database, then times the
+aggregated billing summary (crud.billing.get_billing_summary) against
+loading the parent's subscriptions, payments, billing info and user as
+rows (what the summary used to do before summing in Python). The seeded
+rows are deleted afterwards unless --keep is given.
+
+    python scripts/benchmark_billing_summary.py --children 20 --years 5 --iterations 200
+"""
+
+import argparse
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import event
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal, engine
+from app.crud.billing import (
+    get_billing_info_by_user, get_billing_summary, get_payments_by_user, get_subscriptions_by_parent,
+)
+from app.crud.user import get_user
+from app.models.billing import BillingInfo, Payment, PaymentStatus, Subscription, SubscriptionStatus
+from app.models.user import User, UserRole
+from app.services.llm_metrics import percentile
+
+
+def seed(db, children: int, years: int) -> User:
+    run_id = uuid.uuid4().hex[:8]
+    parent = User(email=f"billing-bench-{run_id}@example.com", hashed_password="-", full_name="Billing Bench",
+                  role=UserRole.PARENT, personality={})
+    db.add(parent)
+    db.flush()
+
+    statuses = [SubscriptionStatus.ACTIVE, SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIAL,
+                SubscriptionStatus.PAST_DUE, SubscriptionStatus.CANCELLED]
+    now = datetime.now()
+    for i in range(children):
+        student = User(username=f"billing_bench_{run_id}_{i}", hashed_password="-", full_name=f"Student {i}",
+                       role=UserRole.STUDENT, personality={})
+        db.add(student)
+        db.flush()
+        subscription = Subscription(
+            parent_id=parent.id, student_id=student.id, status=statuses[i % len(statuses)], price=25,
+            trial_end_date=now + timedelta(days=i + 1), end_date=now + timedelta(days=30 + i),
+        )
+        db.add(subscription)
+        db.flush()
+        db.execute(Payment.__table__.insert(), [
+            {
+                "subscription_id": subscription.id, "amount": 25, "currency": "USD",
+                "status": PaymentStatus.PENDING if month == 0 else PaymentStatus.PAID,
+                "payment_date": now - timedelta(days=30 * month),
+            }
+            for month in range(years * 12)
+        ])
+    db.add_all([BillingInfo(user_id=parent.id, payment_method="credit_card", is_default=n == 0) for n in range(2)])
+    db.commit()
+    return parent
+
+
+def cleanup(db, parent: User) -> None:
+    subscription_ids = [sub.id for sub in get_subscriptions_by_parent(db, parent.id)]
+    student_ids = [row[0] for row in db.query(Subscription.student_id).filter(Subscription.parent_id == parent.id)]
+    db.query(Payment).filter(Payment.subscription_id.in_(subscription_ids)).delete(synchronize_session=False)
+    db.query(Subscription).filter(Subscription.parent_id == parent.id).delete(synchronize_session=False)
+    db.query(BillingInfo).filter(BillingInfo.user_id == parent.id).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(student_ids + [parent.id])).delete(synchronize_session=False)
+    db.commit()
+
+
+def load_rows(db, parent_id: int):
+    get_subscriptions_by_parent(db, parent_id)
+    get_payments_by_user(db, parent_id)
+    get_billing_info_by_user(db, parent_id)
+    get_user(db, parent_id)
+
+
+def measure(name: str, fn: Callable, db, parent_id: int, iterations: int) -> None:
+    statements: List[str] = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies = []
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(iterations):
+            db.expunge_all()
+            started = time.perf_counter()
+            fn(db, parent_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    latencies.sort()
+    print(f"{name}: {len(statements) / iterations:.0f} queries/call, p50={percentile(latencies, 50):.2f}ms "
+          f"p95={percentile(latencies, 95):.2f}ms max={latencies[-1]:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parent billing summary")
+    parser.add_argument("--children", type=int, default=20, help="subscriptions (one per child)")
+    parser.add_argument("--years", type=int, default=5, help="years of monthly payments per subscription")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Seeding {args.children} subscriptions with {args.years * 12} payments each...")
+        parent = seed(db, args.children, args.years)
+        print(get_billing_summary(db, parent.id))
+        measure("rows loaded into Python", load_rows, db, parent.id, args.iterations)
+        measure("aggregated summary", get_billing_summary, db, parent.id, args.iterations)
+        if not args.keep:
+            cleanup(db, parent)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
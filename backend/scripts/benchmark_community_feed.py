@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Community feed benchmark.
+
+Seeds --posts posts (default 100k) with up to --comments comments each,
+written by --authors users, in the configured database. Then it times a
+feed page at the top of the feed and --depth posts deep in two ways:
+
+  - keyset: the feed engine (app/services/community_feed.py)
+  - offset: OFFSET pagination plus per-row author and comment lookups,
+    which is what read_posts used to do
+
+The seeded rows are deleted afterwards unless --keep is given.
+
+    python scripts/benchmark_community_feed.py --posts 100000 --depth 50000 --iterations 50
+"""
+
+import argparse
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import event, select
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal, engine
+from app.core.pagination import encode_cursor
+from app.crud.community import get_comments_by_post, get_posts
+from app.models.community import Comment, Post
+from app.models.user import User, UserRole
+from app.services.community_feed import community_feed
+from app.services.llm_metrics import percentile
+
+BATCH_SIZE = 5000
+
+
+def seed(db, posts: int, comments: int, authors: int) -> List[int]:
+    run_id = uuid.uuid4().hex[:8]
+    users = [
+        User(username=f"feed_bench_{run_id}_{n}", hashed_password="-", full_name=f"Feed Bench {n}",
+             role=UserRole.PARENT, personality={})
+        for n in range(authors)
+    ]
+    db.add_all(users)
+    db.flush()
+    user_ids = [user.id for user in users]
+
+    start = datetime.now() - timedelta(minutes=posts)
+    for first in range(0, posts, BATCH_SIZE):
+        numbers = range(first, min(first + BATCH_SIZE, posts))
+        rows = db.execute(Post.__table__.insert().returning(Post.id, sort_by_parameter_order=True), [
+            {
+                "user_id": user_ids[n % authors], "title": f"Post {n}", "content": "Benchmark post " * 10,
+                "is_active": True, "comment_count": n % (comments + 1), "created_at": start + timedelta(minutes=n),
+            }
+            for n in numbers
+        ]).all()
+        db.execute(Comment.__table__.insert(), [
+            {
+                "post_id": row.id, "user_id": user_ids[(n + c) % authors], "content": f"Comment {c}",
+                "is_active": True, "created_at": start + timedelta(minutes=n, seconds=c + 1),
+            }
+            for n, row in zip(numbers, rows)
+            for c in range(n % (comments + 1))
+        ])
+        db.commit()
+    return user_ids
+
+
+def cleanup(db, user_ids: List[int]) -> None:
+    post_ids = select(Post.id).where(Post.user_id.in_(user_ids))
+    db.query(Comment).filter(Comment.post_id.in_(post_ids)).delete(synchronize_session=False)
+    db.query(Comment).filter(Comment.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(Post).filter(Post.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def offset_page(db, skip: int, limit: int) -> None:
+    # Per-row lookups stand in for the post.author / comment.author relationship loads
+    for post in get_posts(db, skip=skip, limit=limit):
+        db.get(User, post.user_id)
+        for comment in get_comments_by_post(db, post.id):
+            db.get(User, comment.user_id)
+
+
+def measure(name: str, fn: Callable, db, iterations: int) -> None:
+    statements: List[str] = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies = []
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(iterations):
+            db.expunge_all()
+            started = time.perf_counter()
+            fn(db)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    latencies.sort()
+    print(f"{name}: {len(statements) / iterations:.0f} queries/page, p50={percentile(latencies, 50):.2f}ms "
+          f"p95={percentile(latencies, 95):.2f}ms max={latencies[-1]:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the community feed")
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--comments", type=int, default=5, help="max comments per post")
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20, help="posts per page")
+    parser.add_argument("--depth", type=int, default=50_000, help="posts skipped for the deep page")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Seeding {args.posts} posts with up to {args.comments} comments each...")
+        user_ids = seed(db, args.posts, args.comments, args.authors)
+        # The cursor a client holds after paging --depth posts into the feed
+        anchor = db.query(Post).filter(Post.is_active == True).order_by(
+            Post.created_at.desc(), Post.id.desc()
+        ).offset(args.depth - 1).first()
+        deep_cursor = encode_cursor(anchor.created_at, anchor.id)
+
+        for label, skip, cursor in (("first page", 0, None), (f"page at depth {args.depth}", args.depth, deep_cursor)):
+            print(label)
+            measure("  offset + per-row lookups", lambda db: offset_page(db, skip, args.limit), db, args.iterations)
+            measure("  keyset feed", lambda db: community_feed.page(db, cursor, args.limit), db, args.iterations)
+        if not args.keep:
+            cleanup(db, user_ids)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
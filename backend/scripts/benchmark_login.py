@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Creates --users parent accounts, then hammers POST /auth/login with
+--concurrency clients for --duration seconds while probing GET /health.
+The /health latency shows whether bcrypt is blocking the event loop
+(it should stay flat while logins are queued on the password hash pool).
+
+    python scripts/benchmark_login.py --base-url http://localhost:8000 --users 20 --concurrency 50 --duration 20
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+import time
+import uuid
+from collections import Counter
+from typing import List
+
+import httpx
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.llm_metrics import percentile
+
+PASSWORD = "LoginBench123!"
+
+
+async def create_users(client: httpx.AsyncClient, count: int) -> List[str]:
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"login-bench-{run_id}-{i}@example.com" for i in range(count)]
+    for i, email in enumerate(emails):
+        resp = await client.post("/auth/signup", json={
+            "email": email, "username": f"login_bench_{run_id}_{i}", "password": PASSWORD,
+            "full_name": f"Login Bench {i}", "role": "parent",
+        })
+        resp.raise_for_status()
+    return emails
+
+
+async def login_worker(client: httpx.AsyncClient, emails: List[str], worker: int, deadline: float,
+                       latencies: List[float], statuses: Counter):
+    i = worker
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        resp = await client.post("/auth/login", json={
+            "identifier": emails[i % len(emails)], "password": PASSWORD, "role": "parent",
+        })
+        statuses[resp.status_code] += 1
+        if resp.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        elif resp.status_code == 503:
+            await asyncio.sleep(float(resp.headers.get("retry-after", "1")))
+        i += 1
+
+
+async def health_probe(client: httpx.AsyncClient, deadline: float, latencies: List[float]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.05)
+
+
+def summarize(name: str, values: List[float]) -> str:
+    if not values:
+        return f"{name}: no samples"
+    values = sorted(values)
+    return (f"{name}: n={len(values)} p50={percentile(values, 50):.1f}ms "
+            f"p95={percentile(values, 95):.1f}ms p99={percentile(values, 99):.1f}ms max={values[-1]:.1f}ms")
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", timeout=60, limits=limits) as client:
+        print(f"Creating {args.users} users...")
+        emails = await create_users(client, args.users)
+
+        login_latencies: List[float] = []
+        statuses: Counter = Counter()
+        deadline = time.perf_counter() + args.duration
+
+        async with httpx.AsyncClient(base_url=args.base_url.rstrip("/"), timeout=60) as probe_client:
+            health_latencies: List[float] = []
+            started = time.perf_counter()
+            await asyncio.gather(
+                health_probe(probe_client, deadline, health_latencies),
+                *(login_worker(client, emails, w, deadline, login_latencies, statuses) for w in range(args.concurrency)),
+            )
+            elapsed = time.perf_counter() - started
+
+        print(f"\nLogins: {statuses[200]} ok in {elapsed:.1f}s -> {statuses[200] / elapsed:.1f} logins/s")
+        print(f"Status codes: {dict(statuses)}")
+        print(summarize("login", login_latencies))
+        print(summarize("health (event loop)", health_latencies))
+
+        if args.admin_token:
+            resp = await client.get("/admin/password-hash-pool", headers={"Authorization": f"Bearer {args.admin_token}"})
+            if resp.status_code == 200:
+                print(f"Password hash pool: {resp.json()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /auth/login throughput")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--admin-token", help="admin bearer token to print password hash pool stats")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
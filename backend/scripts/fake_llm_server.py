@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Local fake LLM provider for load testing.
+
+Mimics the Gemini (generateContent / streamGenerateContent) and OpenAI
+(/v1/chat/completions) endpoints used by app/services/llm_service.py with
+configurable latency, 429/500 injection and malformed JSON, returning canned
+but realistic question / grading / study plan payloads.
+
+Usage:
+    python scripts/fake_llm_server.py --port 8090 --latency-median-ms 800 --latency-p99-ms 4000 --rate-429 0.02
+
+Then point the backend at it:
+    GEMINI_API_BASE_URL=http://localhost:8090 OPENAI_BASE_URL=http://localhost:8090/v1 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+
+class FakeConfig(BaseModel):
+    latency_median_ms: float = 600.0
+    latency_p99_ms: float = 3000.0
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    malformed_rate: float = 0.0
+    stream_chunks: int = 4
+    seed: Optional[int] = None
+
+
+config = FakeConfig()
+stats: Counter = Counter()
+_seen_prefixes = set()
+_rng = random.Random()
+
+app = FastAPI(title="Fake LLM provider")
+
+
+# ---------------------
+# Behaviour helpers
+# ---------------------
+def _latency_seconds() -> float:
+    """Log-normal latency with the configured median and p99."""
+    median = max(config.latency_median_ms, 1.0)
+    p99 = max(config.latency_p99_ms, median)
+    sigma = math.log(p99 / median) / 2.326
+    return _rng.lognormvariate(math.log(median), sigma) / 1000.0
+
+
+def _injected_error() -> Optional[JSONResponse]:
+    roll = _rng.random()
+    if roll < config.rate_429:
+        stats["429"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": 429, "message": "Resource has been exhausted (fake)", "status": "RESOURCE_EXHAUSTED"}},
+            headers={"retry-after": "1"},
+        )
+    if roll < config.rate_429 + config.rate_500:
+        stats["500"] += 1
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"code": 500, "message": "Internal error (fake)", "status": "INTERNAL"}},
+        )
+    return None
+
+
+def _tokens(text: str) -> int:
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _cached_tokens(system: str) -> int:
+    """Pretend the provider caches identical system prefixes after the first call."""
+    if not system:
+        return 0
+    key = hashlib.sha1(system.encode()).hexdigest()
+    if key in _seen_prefixes:
+        return _tokens(system)
+    _seen_prefixes.add(key)
+    return 0
+
+
+def _field(user: str, label: str, default: str) -> str:
+    match = re.search(rf"{label}:?\s*(.+)", user)
+    return match.group(1).strip() if match else default
+
+
+def _canned_question(user: str) -> Dict[str, Any]:
+    header = re.search(r"Generate EXACTLY 1 (.+?) assessment question for Grade (\S+?)\.", user)
+    subject, grade = (header.group(1), header.group(2)) if header else ("Math", "6")
+    topic = _field(user, "Topic", "General")
+    difficulty = _field(user, "Difficulty", "medium")
+    a, b = _rng.randint(2, 40), _rng.randint(2, 40)
+    options = [str(a + b), str(a + b + 1), str(a + b - 1), str(a * b)]
+    _rng.shuffle(options)
+    return {
+        "question_text": f"What is {a} + {b}?",
+        "question_type": "MCQ",
+        "options": options,
+        "correct_answer": str(a + b),
+        "subject": subject,
+        "subtopic": topic,
+        "difficulty_level": difficulty,
+        "learning_objectives": [f"Apply {topic} skills"],
+        "description": f"Assesses {topic} at grade {grade}",
+        "prerequisites": ["Addition"],
+        "canonical_form": f"ADD_INTEGERS(A={a},B={b})",
+        "problem_signature": {
+            "subject": subject,
+            "topic": topic,
+            "subtopic": topic,
+            "concept": "add_integers",
+            "operation": "calculate",
+            "grade_level": grade,
+            "difficulty": difficulty,
+            "variant": _rng.randint(0, 10 ** 9),
+        },
+    }
+
+
+def _canned_grade(user: str) -> Dict[str, Any]:
+    correct = _field(user, "Correct answer", "").lower()
+    answer = _field(user, "Student answer", "").lower()
+    is_correct = bool(correct) and correct == answer
+    return {
+        "is_correct": is_correct,
+        "score": 1.0 if is_correct else 0.0,
+        "feedback": "Correct!" if is_correct else "Not quite — review the concept.",
+    }
+
+
+def _canned_study_plan(user: str) -> Dict[str, Any]:
+    try:
+        mastery = json.loads(_field(user, "Mastery map", "{}"))
+    except ValueError:
+        mastery = {}
+    weakest = sorted(mastery.items(), key=lambda x: x[1])[:5] or [("General", 0.0)]
+    return {
+        "summary": f"Focus on {', '.join(t for t, _ in weakest)}",
+        "lessons": [
+            {"title": f"Practice {t}", "topic": t, "suggested_duration_mins": 20, "week": i,
+             "details": f"Work through fundamentals of {t}."}
+            for i, (t, _) in enumerate(weakest, start=1)
+        ],
+    }
+
+
+def _completion_text(system: str, user: str) -> str:
+    if config.malformed_rate and _rng.random() < config.malformed_rate:
+        stats["malformed"] += 1
+        return '```json\n{"question_text": "What is 2 + 2?", "options": ["4", "5",]\n'
+    if "Student answer:" in user:
+        payload = _canned_grade(user)
+    elif "study plan" in user:
+        payload = _canned_study_plan(user)
+    else:
+        payload = _canned_question(user)
+    return json.dumps(payload)
+
+
+def _chunks(text: str, n: int):
+    size = max(1, math.ceil(len(text) / max(n, 1)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# ---------------------
+# Gemini
+# ---------------------
+def _gemini_parts(body: Dict[str, Any]):
+    system = " ".join(p.get("text", "") for p in (body.get("systemInstruction") or {}).get("parts", []))
+    user = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+    return system, user
+
+
+def _gemini_payload(text: str, system: str, user: str, finish: Optional[str] = "STOP") -> Dict[str, Any]:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": _tokens(system) + _tokens(user),
+            "candidatesTokenCount": _tokens(text),
+            "cachedContentTokenCount": _cached_tokens(system),
+        },
+    }
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def gemini_generate(model: str, request: Request):
+    stats["gemini"] += 1
+    await asyncio.sleep(_latency_seconds())
+    error = _injected_error()
+    if error:
+        return error
+    system, user = _gemini_parts(await request.json())
+    return _gemini_payload(_completion_text(system, user), system, user)
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def gemini_stream(model: str, request: Request):
+    stats["gemini_stream"] += 1
+    error = _injected_error()
+    if error:
+        return error
+    system, user = _gemini_parts(await request.json())
+    text = _completion_text(system, user)
+    chunks = _chunks(text, config.stream_chunks)
+    total = _latency_seconds()
+
+    async def events():
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(total / len(chunks))
+            last = i == len(chunks) - 1
+            yield f"data: {json.dumps(_gemini_payload(chunk, system, user, 'STOP' if last else None))}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# ---------------------
+# OpenAI
+# ---------------------
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    stats["openai"] += 1
+    body = await request.json()
+    error = _injected_error()
+    if error:
+        await asyncio.sleep(_latency_seconds() / 10)
+        return error
+    messages = body.get("messages", [])
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = " ".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    text = _completion_text(system, user)
+    created = int(time.time())
+    model = body.get("model", "gpt-4o-mini")
+    usage = {
+        "prompt_tokens": _tokens(system) + _tokens(user),
+        "completion_tokens": _tokens(text),
+        "total_tokens": _tokens(system) + _tokens(user) + _tokens(text),
+        "prompt_tokens_details": {"cached_tokens": _cached_tokens(system)},
+    }
+
+    if body.get("stream"):
+        chunks = _chunks(text, config.stream_chunks)
+        total = _latency_seconds()
+
+        async def events():
+            for chunk in chunks:
+                await asyncio.sleep(total / len(chunks))
+                yield "data: " + json.dumps({
+                    "id": f"chatcmpl-fake-{created}", "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                }) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(_latency_seconds())
+    return {
+        "id": f"chatcmpl-fake-{created}",
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+# ---------------------
+# Control
+# ---------------------
+@app.get("/_fake/config")
+def get_config():
+    return config
+
+
+@app.post("/_fake/config")
+def update_config(update: Dict[str, Any]):
+    """Change behaviour at runtime, e.g. {"rate_429": 0.2} to simulate a rate-limit storm."""
+    global config
+    config = config.model_copy(update=update)
+    if "seed" in update:
+        _rng.seed(config.seed)
+    return config
+
+
+@app.get("/_fake/stats")
+def get_stats():
+    return dict(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini/OpenAI server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-median-ms", type=float, default=config.latency_median_ms)
+    parser.add_argument("--latency-p99-ms", type=float, default=config.latency_p99_ms)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    update_config({
+        "latency_median_ms": args.latency_median_ms,
+        "latency_p99_ms": args.latency_p99_ms,
+        "rate_429": args.rate_429,
+        "rate_500": args.rate_500,
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    })
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Load generator for the adaptive assessment flow.
+
+Each virtual student runs the real hot path against a running app instance:
+parent signup/login -> create student -> student login -> POST /assessments/
+-> POST /{id}/questions -> repeated POST /{id}/questions/{qid}/answer
+-> POST /{id}/completed -> GET /{id}/report
+
+Assessment routes are gated: a freshly signed-up student has no trial or
+subscription and gets 402. Start the app with SUBSCRIPTION_GATING_ENABLED=false
+for load tests; the run stops with an explanation if it hits a 402.
+
+Run it against a local app backed by a local Postgres and the fake LLM
+provider (scripts/fake_llm_server.py):
+
+    SUBSCRIPTION_GATING_ENABLED=false uvicorn app.main:app
+    python scripts/load_test_assessment.py --base-url http://localhost:8000 --students 50 --concurrency 20
+
+Reports throughput, per-endpoint latency percentiles and DB queries per
+request (from the X-DB-Query-Count / Server-Timing response headers; shown
+as n/a when the server doesn't send them). Students whose --questions ran
+out before the assessment finished are reported as incomplete.
+With --baseline, exits non-zero when an endpoint's p95 regresses.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import os
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.constants import TOTAL_QUESTIONS_PER_ASSESSMENT
+from app.services.llm_metrics import percentile
+
+
+class SubscriptionRequired(RuntimeError):
+    """The server gates assessments and the load-test students have no trial."""
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    latency_ms: float
+    db_queries: Optional[int]
+    db_ms: Optional[float]
+
+
+def _server_timing_db_ms(header: Optional[str]) -> Optional[float]:
+    """Extract dur= of the `db` metric from a Server-Timing header."""
+    if not header:
+        return None
+    for metric in header.split(","):
+        parts = [p.strip() for p in metric.split(";")]
+        if parts[0] == "db":
+            for p in parts[1:]:
+                if p.startswith("dur="):
+                    return float(p[4:])
+    return None
+
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.samples: List[Sample] = []
+        self.failures: Dict[str, int] = defaultdict(int)
+        self.completed_students = 0
+        self.incomplete_students = 0
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str,
+                   token: Optional[str] = None, **kwargs) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        started = time.perf_counter()
+        resp = await client.request(method, url, headers=headers, **kwargs)
+        query_count = resp.headers.get("x-db-query-count")
+        self.samples.append(Sample(
+            endpoint=endpoint,
+            status=resp.status_code,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            db_queries=int(query_count) if query_count else None,
+            db_ms=_server_timing_db_ms(resp.headers.get("server-timing")),
+        ))
+        if resp.status_code == 402:
+            raise SubscriptionRequired(f"{endpoint} -> 402: the student has no active trial or subscription; "
+                                       "run the server with SUBSCRIPTION_GATING_ENABLED=false")
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{endpoint} -> {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    async def think(self):
+        if self.args.think_time_ms > 0:
+            await asyncio.sleep(random.expovariate(1000.0 / self.args.think_time_ms))
+
+    def pick_answer(self, question: Dict[str, Any]) -> str:
+        bank = question.get("question_bank") or {}
+        if random.random() < self.args.accuracy:
+            return bank.get("correct_answer", "")
+        options = bank.get("options") or ["True", "False"]
+        return random.choice(options)
+
+    async def virtual_student(self, client: httpx.AsyncClient, n: int):
+        tag = f"{uuid.uuid4().hex[:10]}{n}"
+        password = "LoadTest123!"
+
+        await self.call(client, "POST /auth/signup", "POST", "/auth/signup", json={
+            "email": f"load-{tag}@example.com", "username": f"load_parent_{tag}",
+            "password": password, "full_name": f"Load Parent {n}", "role": "parent",
+        })
+        resp = await self.call(client, "POST /auth/login", "POST", "/auth/login", json={
+            "identifier": f"load-{tag}@example.com", "password": password, "role": "parent",
+        })
+        parent_token = resp.json()["access_token"]
+
+        resp = await self.call(client, "POST /users/me/students", "POST", "/users/me/students", parent_token, json={
+            "name": f"Load Student {n}", "username": f"load_student_{tag}", "password": password,
+            "age": 11, "grade_level": self.args.grade_level,
+        })
+        student_id = resp.json()["id"]
+
+        resp = await self.call(client, "POST /auth/login", "POST", "/auth/login", json={
+            "identifier": f"load_student_{tag}", "password": password, "role": "student",
+        })
+        token = resp.json()["access_token"]
+
+        resp = await self.call(client, "POST /assessments/", "POST", "/assessments/", token, json={
+            "student_id": student_id, "subject": self.args.subject,
+        })
+        assessment_id = resp.json()["id"]
+
+        resp = await self.call(client, "POST /assessments/{id}/questions", "POST",
+                               f"/assessments/{assessment_id}/questions", token)
+        question = resp.json()
+
+        for _ in range(self.args.questions):
+            await self.think()
+            resp = await self.call(
+                client, "POST /assessments/{id}/questions/{qid}/answer", "POST",
+                f"/assessments/{assessment_id}/questions/{question['id']}/answer", token,
+                json={"answer_text": self.pick_answer(question), "time_taken": int(self.args.think_time_ms / 1000)},
+            )
+            body = resp.json()
+            if body["status"] != "in_progress" or not body.get("next_question"):
+                break
+            question = body["next_question"]
+        else:
+            # Stopped early (--questions below the assessment length); nothing to report on
+            self.incomplete_students += 1
+            return
+
+        await self.call(client, "POST /assessments/{id}/completed", "POST",
+                        f"/assessments/{assessment_id}/completed", token)
+        await self.call(client, "GET /assessments/{id}/report", "GET",
+                        f"/assessments/{assessment_id}/report", token)
+        self.completed_students += 1
+
+    async def run(self) -> float:
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        base_url = self.args.base_url.rstrip("/") + "/api/v1"
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=self.args.timeout, limits=limits) as client:
+            async def guarded(n: int):
+                if self.args.ramp_up_s:
+                    await asyncio.sleep(self.args.ramp_up_s * n / self.args.students)
+                async with semaphore:
+                    try:
+                        await self.virtual_student(client, n)
+                    except SubscriptionRequired:
+                        raise  # every student would fail the same way
+                    except Exception as e:
+                        self.failures[type(e).__name__] += 1
+                        if self.args.verbose:
+                            print(f"student {n} failed: {e}")
+
+            started = time.perf_counter()
+            await asyncio.gather(*(guarded(n) for n in range(self.args.students)))
+            return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+        for s in self.samples:
+            by_endpoint[s.endpoint].append(s)
+
+        endpoints = {}
+        for endpoint, samples in by_endpoint.items():
+            latencies = sorted(s.latency_ms for s in samples)
+            queries = [s.db_queries for s in samples if s.db_queries is not None]
+            db_ms = [s.db_ms for s in samples if s.db_ms is not None]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if s.status >= 400),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "max_ms": round(latencies[-1], 1),
+                "db_queries_avg": round(sum(queries) / len(queries), 1) if queries else None,
+                "db_queries_max": max(queries) if queries else None,
+                "db_ms_avg": round(sum(db_ms) / len(db_ms), 1) if db_ms else None,
+            }
+
+        return {
+            "students": self.args.students,
+            "completed_students": self.completed_students,
+            "incomplete_students": self.incomplete_students,
+            "failures": dict(self.failures),
+            "elapsed_s": round(elapsed, 2),
+            "requests": len(self.samples),
+            "throughput_rps": round(len(self.samples) / elapsed, 2) if elapsed else None,
+            "endpoints": endpoints,
+        }
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\nStudents: {result['completed_students']}/{result['students']} completed, "
+          f"{result['incomplete_students']} stopped by --questions, failures: {result['failures'] or 0}")
+    print(f"Requests: {result['requests']} in {result['elapsed_s']}s ({result['throughput_rps']} req/s)\n")
+    header = f"{'endpoint':<48}{'n':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'queries':>9}{'db ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, row in sorted(result["endpoints"].items()):
+        queries = "n/a" if row["db_queries_avg"] is None else f"{row['db_queries_avg']}"
+        db_ms = "n/a" if row["db_ms_avg"] is None else f"{row['db_ms_avg']}"
+        print(f"{endpoint:<48}{row['requests']:>6}{row['errors']:>5}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['max_ms']:>9}{queries:>9}{db_ms:>8}")
+
+
+def check_regressions(result: Dict[str, Any], baseline_path: str, max_regression: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for endpoint, row in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        if row["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']}ms -> {row['p95_ms']}ms")
+        if before.get("db_queries_max") is not None and row["db_queries_max"] is not None \
+                and row["db_queries_max"] > before["db_queries_max"]:
+            regressions.append(f"{endpoint}: queries {before['db_queries_max']} -> {row['db_queries_max']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the adaptive assessment flow")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--students", type=int, default=20, help="number of virtual students")
+    parser.add_argument("--concurrency", type=int, default=10, help="students running at the same time")
+    parser.add_argument("--ramp-up-s", type=float, default=0.0, help="spread student start times over this many seconds")
+    parser.add_argument("--think-time-ms", type=float, default=500.0, help="mean think time between answers")
+    parser.add_argument("--questions", type=int, default=TOTAL_QUESTIONS_PER_ASSESSMENT, help="answers per assessment")
+    parser.add_argument("--accuracy", type=float, default=0.6, help="probability a student answers correctly")
+    parser.add_argument("--subject", default="Math")
+    parser.add_argument("--grade-level", type=int, default=6)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json-out", help="write the results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="previous --json-out file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase vs baseline (0.2 = 20%%)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    run = LoadRun(args)
+    try:
+        elapsed = asyncio.run(run.run())
+    except SubscriptionRequired as e:
+        sys.exit(str(e))
+    result = run.report(elapsed)
+    print_report(result)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+    if args.baseline:
+        regressions = check_regressions(result, args.baseline, args.max_regression)
+        if regressions:
+            print("\nRegressions vs baseline:")
+            for r in regressions:
+                print(f"  {r}")
+            sys.exit(1)
+        print("\nNo regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Replay Stripe webhook events.
+
+Requeue events from the webhook_events inbox (e.g. dead-lettered ones after a
+fix is deployed) and optionally process them right away:
+
+    python scripts/replay_webhook_events.py requeue --status dead --drain
+    python scripts/replay_webhook_events.py requeue --event-id evt_123 --event-id evt_456
+    python scripts/replay_webhook_events.py requeue --status failed --since 2026-10-01T00:00:00
+
+Or send a recorded event (JSON file) to a running server, signed with the
+webhook secret, to exercise the endpoint end to end:
+
+    python scripts/replay_webhook_events.py send tests/fixtures/stripe/payment_intent_succeeded.json \
+        --url http://localhost:8000/api/v1/billing/stripe-webhook
+"""
+
+import argparse
+import json
+import sys
+import os
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.webhook_service import sign_stripe_payload, webhook_processor
+
+
+def requeue(args):
+    db = SessionLocal()
+    try:
+        since = datetime.fromisoformat(args.since) if args.since else None
+        count = webhook_processor.requeue(db, event_ids=args.event_id, statuses=args.status, since=since)
+        print(f"Requeued {count} events")
+        if args.drain:
+            print(f"Processed {webhook_processor.drain()} events")
+        print(json.dumps(webhook_processor.stats(db), indent=2))
+    finally:
+        db.close()
+
+
+def send(args):
+    import httpx
+
+    for path in args.files:
+        with open(path, "rb") as f:
+            payload = f.read()
+        response = httpx.post(
+            args.url,
+            content=payload,
+            headers={"Content-Type": "application/json", "Stripe-Signature": sign_stripe_payload(payload, args.secret)},
+        )
+        print(f"{path}: {response.status_code} {response.text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Stripe webhook events")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    requeue_parser = subparsers.add_parser("requeue", help="requeue stored events")
+    requeue_parser.add_argument("--event-id", action="append", help="event id (repeatable)")
+    requeue_parser.add_argument("--status", action="append", help="e.g. dead or failed (repeatable)")
+    requeue_parser.add_argument("--since", help="only events received after this ISO timestamp")
+    requeue_parser.add_argument("--drain", action="store_true", help="process the requeued events now")
+    requeue_parser.set_defaults(func=requeue)
+
+    send_parser = subparsers.add_parser("send", help="POST signed event files to the webhook endpoint")
+    send_parser.add_argument("files", nargs="+", help="Stripe event JSON files")
+    send_parser.add_argument("--url", default="http://localhost:8000/api/v1/billing/stripe-webhook")
+    send_parser.add_argument("--secret", default=settings.STRIPE_WEBHOOK_SECRET)
+    send_parser.set_defaults(func=send)
+
+    args = parser.parse_args()
+    if args.command == "requeue" and not (args.event_id or args.status or args.since):
+        parser.error("requeue needs --event-id, --status or --since")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
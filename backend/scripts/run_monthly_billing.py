@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Run the monthly billing job.
+
+Bills every parent with active subscriptions once per period, in chunks
+processed concurrently. Safe to re-run: parents already billed for the
+period are skipped, so a crashed run is resumed by running it again.
+
+    python scripts/run_monthly_billing.py --period 2026-10 --chunk-size 1000 --workers 8
+"""
+
+import argparse
+import json
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.billing_run import MonthlyBillingRun
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the monthly billing job")
+    parser.add_argument("--period", help="billing period as YYYY-MM (default: current month)")
+    parser.add_argument("--chunk-size", type=int, default=settings.BILLING_RUN_CHUNK_SIZE, help="parents per transaction")
+    parser.add_argument("--workers", type=int, default=settings.BILLING_RUN_WORKERS, help="chunks processed concurrently")
+    args = parser.parse_args()
+
+    result = MonthlyBillingRun(chunk_size=args.chunk_size, workers=args.workers).run(args.period)
+    print(json.dumps(result.as_dict(), indent=2))
+    if result.failed:
+        print(f"{result.failed} parents in {len(result.failed_chunks)} chunks failed; re-run to retry them")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+
+
+@pytest.fixture
+def make_session_factory(tmp_path):
+    """Returns make(models, users=None): a sessionmaker over a fresh SQLite file with only those models' tables.
+
+    users has PostgreSQL-only columns (JSONB), so it's never created from the model; tests that read it
+    pass the column definitions they need, e.g. users="id INTEGER PRIMARY KEY, username VARCHAR".
+    """
+    engines = []
+
+    def make(models, users=None):
+        engine = create_engine(f"sqlite:///{tmp_path / f'test{len(engines)}.db'}",
+                               connect_args={"check_same_thread": False})
+        engines.append(engine)
+        if users is not None:
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE TABLE users ({users})"))
+        Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+        return sessionmaker(bind=engine)
+
+    yield make
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.billing import BillingInfo, Invoice, Payment, Subscription, SubscriptionPlan
+from app.services.billing_run import MonthlyBillingRun
+
+
+@pytest.fixture
+def session_factory(make_session_factory):
+    factory = make_session_factory([SubscriptionPlan, Subscription, BillingInfo, Payment, Invoice])
+    db = factory()
+    end = datetime.now() + timedelta(days=30)
+    for parent_id in range(1, 6):
+        for student_id in (parent_id * 10, parent_id * 10 + 1):
+            db.add(Subscription(parent_id=parent_id, student_id=student_id, status="active", price=25, end_date=end))
+        if parent_id != 3:  # parent 3 has no payment method and is skipped
+            db.add(BillingInfo(user_id=parent_id, payment_method="card", is_default=True))
+    db.add(Subscription(parent_id=6, student_id=60, status="cancelled", price=25, end_date=end))
+    db.add(BillingInfo(user_id=6, payment_method="card", is_default=True))
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_billing_run_bills_each_parent_once(session_factory):
+    run = MonthlyBillingRun(session_factory, chunk_size=2, workers=1)
+    result = run.run("2026-10")
+    assert result.due_parents == 5
+    assert result.chunks == 3
+    assert result.billed == 4
+    assert result.amount == 200.0
+
+    db = session_factory()
+    payments = db.query(Payment).order_by(Payment.idempotency_key).all()
+    assert [p.idempotency_key for p in payments] == [f"billing:2026-10:{i}" for i in (1, 2, 4, 5)]
+    assert all(float(p.amount) == 50.0 for p in payments)
+    assert db.query(Invoice).count() == 4
+    db.close()
+
+    # Re-running the same period (e.g. after a crash) bills nobody twice
+    again = run.run("2026-10")
+    assert again.billed == 0
+    assert again.skipped == 5
+    assert run.run("2026-11").billed == 4
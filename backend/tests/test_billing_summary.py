@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from app.crud.billing import get_billing_summary
+from app.models.billing import BillingInfo, EntitlementGrant, Payment, Subscription, SubscriptionPlan
+from app.services.billing_service import billing_service
+
+NOW = datetime.now()
+REGISTERED = datetime(2026, 1, 5, 9, 30)
+
+
+@pytest.fixture
+def db(make_session_factory):
+    # The summary only reads users.created_at
+    db = make_session_factory([SubscriptionPlan, Subscription, Payment, BillingInfo, EntitlementGrant],
+                              users="id INTEGER PRIMARY KEY, created_at DATETIME")()
+    db.execute(text("INSERT INTO users (id, created_at) VALUES (1, :created_at)"), {"created_at": REGISTERED})
+    db.add_all([
+        Subscription(id=1, parent_id=1, student_id=10, status="active", price=25, end_date=NOW + timedelta(days=20)),
+        Subscription(id=2, parent_id=1, student_id=11, status="active", price=85, end_date=NOW + timedelta(days=5)),
+        Subscription(id=3, parent_id=1, student_id=12, status="trial", price=25,
+                     trial_end_date=NOW + timedelta(days=3, hours=1)),
+        Subscription(id=4, parent_id=1, student_id=12, status="trial", price=25,
+                     trial_end_date=NOW + timedelta(days=9, hours=1)),
+        Subscription(id=5, parent_id=1, student_id=13, status="past_due", price=25),
+        Subscription(id=6, parent_id=2, student_id=20, status="active", price=25),
+        EntitlementGrant(student_id=10, subscription_id=1, kind="subscription", subject_id=3),
+        EntitlementGrant(student_id=11, subscription_id=2, kind="subscription", all_subjects=True),
+        BillingInfo(user_id=1, payment_method="credit_card", is_default=True),
+        BillingInfo(user_id=1, payment_method="paypal"),
+        BillingInfo(user_id=2, payment_method="credit_card", is_default=True),
+    ])
+    for month in range(36):
+        db.add(Payment(subscription_id=1, amount=25, status="paid", payment_date=NOW - timedelta(days=30 * month)))
+    db.add(Payment(subscription_id=2, amount=85, status="pending", payment_date=NOW + timedelta(days=5)))
+    db.add(Payment(subscription_id=1, amount=25, status="pending", payment_date=NOW + timedelta(days=20)))
+    db.add(Payment(subscription_id=6, amount=25, status="pending", payment_date=NOW + timedelta(days=1)))
+    db.commit()
+    yield db
+    db.close()
+
+
+def test_billing_summary_is_one_query(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    summary = get_billing_summary(db, 1)
+
+    assert len(statements) == 1
+    assert summary == {
+        "active_subscriptions": 4,
+        "trial_subscriptions": 2,
+        "past_due_subscriptions": 1,
+        "total_monthly_cost": 110.0,
+        "next_payment_date": NOW + timedelta(days=5),
+        "in_free_trial": True,
+        "trial_end_date": NOW + timedelta(days=9, hours=1),
+        "trial_start_date": REGISTERED,
+        "days_remaining_in_trial": 9,
+        "payment_methods": 2,
+        "has_payment_method": True,
+    }
+
+
+def test_service_billing_summary(db):
+    summary = billing_service.get_billing_summary(db, 1)
+    assert summary["total_monthly_cost"] == 160.0  # active and trial subscriptions
+    assert summary["next_payment_date"] == NOW + timedelta(days=5)
+    assert summary["trial_end_date"] == NOW + timedelta(days=3, hours=1)
+    assert summary["days_remaining_in_trial"] == 3
+    assert summary["students_enrolled"] == 4
+    assert summary["subjects_subscribed"] == 1
+
+
+def test_billing_summary_without_subscriptions(db):
+    summary = get_billing_summary(db, 3)
+    assert summary["active_subscriptions"] == 0
+    assert summary["total_monthly_cost"] == 0.0
+    assert summary["in_free_trial"] is False
+    assert summary["next_payment_date"] is None
+    assert summary["has_payment_method"] is False
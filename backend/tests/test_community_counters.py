@@ -0,0 +1,72 @@
+import pytest
+
+from app.core.advisory_lock import AdvisoryLockLeader
+from app.crud.community import (
+    create_comment, create_post, deactivate_comment, deactivate_post, delete_comment, delete_post, get_user_counters,
+)
+from app.models.community import Comment, Notification, Post, UserCommunityCounters
+from app.schemas.community import CommentCreate, PostCreate
+from app.services.community_counters import CommunityCounterReconciler
+
+
+@pytest.fixture
+def session_factory(make_session_factory):
+    return make_session_factory([Post, Comment, Notification, UserCommunityCounters], users="id INTEGER PRIMARY KEY")
+
+
+def test_counters_follow_creates_and_soft_deletes(session_factory):
+    db = session_factory()
+    post = create_post(db, PostCreate(title="Hello", content="..."), user_id=1)
+    other = create_post(db, PostCreate(title="Again", content="..."), user_id=1)
+    comments = [create_comment(db, CommentCreate(post_id=post.id, content=f"c{n}"), user_id=2) for n in range(3)]
+
+    assert delete_comment(db, comments[0].id, user_id=2)
+    assert delete_comment(db, comments[0].id, user_id=2)  # already deleted: counted once
+    assert delete_post(db, other.id, user_id=1)
+    deactivate_post(db, other)
+
+    db.refresh(post)
+    assert post.comment_count == 2
+    assert get_user_counters(db, 1) == {"user_id": 1, "post_count": 1, "comment_count": 0}
+    assert get_user_counters(db, 2) == {"user_id": 2, "post_count": 0, "comment_count": 2}
+    assert get_user_counters(db, 3) == {"user_id": 3, "post_count": 0, "comment_count": 0}
+
+
+def test_reconciler_repairs_drift_in_batches(session_factory):
+    db = session_factory()
+    for n in range(1, 8):
+        create_post(db, PostCreate(title=f"p{n}", content="..."), user_id=n)
+        create_comment(db, CommentCreate(post_id=n, content="c"), user_id=n + 1)
+    # Drift: rows written behind the crud functions' back
+    db.execute(Post.__table__.update().where(Post.id == 2).values(comment_count=40))
+    db.execute(Comment.__table__.insert().values(post_id=5, user_id=9, content="raw", is_active=True))
+    db.execute(UserCommunityCounters.__table__.update().where(UserCommunityCounters.user_id == 3).values(post_count=0))
+    db.commit()
+
+    engine = db.get_bind()
+    reconciler = CommunityCounterReconciler(session_factory, AdvisoryLockLeader(engine, 1), batch_size=3)
+    assert reconciler.run_once() == {"posts": 2, "users": 2}
+    assert reconciler.run_once() == {"posts": 0, "users": 0}
+
+    db.expire_all()
+    assert [db.get(Post, n).comment_count for n in (2, 5)] == [1, 2]
+    assert get_user_counters(db, 3) == {"user_id": 3, "post_count": 1, "comment_count": 1}
+    assert get_user_counters(db, 9) == {"user_id": 9, "post_count": 0, "comment_count": 1}
+
+
+def test_concurrent_deletes_decrement_once(session_factory):
+    db = session_factory()
+    post = create_post(db, PostCreate(title="Hello", content="..."), user_id=1)
+    comment = create_comment(db, CommentCreate(post_id=post.id, content="c"), user_id=2)
+
+    # Both sessions loaded the rows while they were still active
+    first, second = session_factory(), session_factory()
+    loaded = [(s.get(Post, post.id), s.get(Comment, comment.id)) for s in (first, second)]
+    for session, (db_post, db_comment) in zip((first, second), loaded):
+        deactivate_comment(session, db_comment)
+        deactivate_post(session, db_post)
+
+    db.expire_all()
+    assert db.get(Post, post.id).comment_count == 0
+    assert get_user_counters(db, 1)["post_count"] == 0
+    assert get_user_counters(db, 2)["comment_count"] == 0
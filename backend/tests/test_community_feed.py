@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.query_counter import assert_max_queries
+from app.models.community import Comment, Post
+from app.services.community_feed import CommunityFeed
+
+START = datetime(2026, 5, 1, 8, 0)
+
+
+@pytest.fixture
+def db(make_session_factory):
+    # The feed only reads these users columns
+    db = make_session_factory([Post, Comment],
+                              users="id INTEGER PRIMARY KEY, username VARCHAR, full_name VARCHAR, role VARCHAR")()
+    for user_id in range(1, 6):
+        db.execute(text("INSERT INTO users VALUES (:id, :username, :name, 'PARENT')"),
+                   {"id": user_id, "username": f"user{user_id}", "name": f"User {user_id}"})
+    for n in range(1, 13):
+        db.add(Post(id=n, user_id=n % 5 + 1, title=f"Post {n}", content="...", is_active=n != 7,
+                    comment_count=n % 6, created_at=START + timedelta(minutes=n)))
+        for c in range(n % 6):
+            db.add(Comment(post_id=n, user_id=c % 5 + 1, content=f"comment {c}", is_active=True,
+                           created_at=START + timedelta(minutes=n, seconds=c + 1)))
+    db.commit()
+    yield db
+    db.close()
+
+
+def test_feed_page_uses_a_constant_number_of_queries(db):
+    feed = CommunityFeed(comments_per_post=3)
+
+    with assert_max_queries(3):
+        posts, cursor = feed.page(db, limit=5)
+
+    assert [post["id"] for post in posts] == [12, 11, 10, 9, 8]
+    post = posts[1]  # post 11 has 5 comments
+    assert post["comment_count"] == 5
+    assert [c["content"] for c in post["comments"]] == ["comment 2", "comment 3", "comment 4"]
+    assert post["author"] == {"id": 2, "username": "user2", "full_name": "User 2", "role": "parent"}
+    assert posts[0]["comments"] == [] and posts[0]["comment_count"] == 0
+
+
+def test_feed_cursor_walks_every_active_post_once(db):
+    feed = CommunityFeed(comments_per_post=1)
+    seen, cursor = [], None
+    while True:
+        posts, cursor = feed.page(db, cursor, limit=4)
+        seen += [post["id"] for post in posts]
+        if cursor is None:
+            break
+
+    assert seen == [12, 11, 10, 9, 8, 6, 5, 4, 3, 2, 1]
+    user_posts, _ = feed.page(db, limit=10, user_id=3)
+    assert [post["id"] for post in user_posts] == [12, 2]
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.core.search import LocalInvertedIndex, PostgresFullTextSearch, community_search
+from app.crud.community import create_comment, create_post, delete_post, update_post
+from app.models.community import Comment, Post, UserCommunityCounters
+from app.schemas.community import CommentCreate, PostCreate, PostUpdate
+from app.services.community_feed import CommunityFeed
+
+
+@pytest.fixture
+def db(make_session_factory, monkeypatch):
+    monkeypatch.setattr(community_search, "local", LocalInvertedIndex())
+    db = make_session_factory([Post, Comment, UserCommunityCounters],
+                              users="id INTEGER PRIMARY KEY, username VARCHAR, full_name VARCHAR, role VARCHAR")()
+    db.execute(text("INSERT INTO users VALUES (1, 'ana', 'Ana', 'PARENT')"))
+    db.commit()
+    yield db
+    db.close()
+
+
+def test_local_search_ranks_and_follows_writes(db):
+    feed = CommunityFeed()
+    in_content = create_post(db, PostCreate(title="Weekend ideas", content="Fractions practice with pizza"), user_id=1)
+    create_post(db, PostCreate(title="Reading list", content="Books for grade 4"), user_id=1)
+
+    # The index is built on the first search and then maintained by the crud hooks
+    assert [r["id"] for r in feed.search(db, "fractions")[0]] == [in_content.id]
+    in_title = create_post(db, PostCreate(title="Fractions games", content="Card games for fractions"), user_id=1)
+    results, _ = feed.search(db, "fractions")
+    assert [r["id"] for r in results] == [in_title.id, in_content.id]
+    assert results[0]["author"]["username"] == "ana" and results[0]["kind"] == "post"
+    assert feed.search(db, "fractions pizza")[0][0]["id"] == in_content.id  # every term must match
+
+    update_post(db, in_content.id, PostUpdate(content="Decimals practice"), user_id=1)
+    delete_post(db, in_title.id, user_id=1)
+    assert feed.search(db, "fractions")[0] == []
+
+    comment = create_comment(db, CommentCreate(post_id=in_content.id, content="Try decimal dominoes"), user_id=1)
+    results, _ = feed.search(db, "dominoes", scope="comments")
+    assert [(r["kind"], r["id"], r["post_id"]) for r in results] == [("comment", comment.id, in_content.id)]
+
+
+def test_search_cursor_walks_every_match_once(db):
+    feed = CommunityFeed()
+    for n in range(7):
+        create_post(db, PostCreate(title=f"Science fair {n}", content="science " * (n % 3)), user_id=1)
+
+    seen, cursor = [], None
+    while True:
+        results, cursor = feed.search(db, "science", cursor=cursor, limit=3)
+        seen += [(r["score"], r["id"]) for r in results]
+        if cursor is None:
+            break
+    assert len(seen) == 7 and len(set(seen)) == 7
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_postgres_backend_uses_the_indexed_vector():
+    class FakeResult:
+        def all(self):
+            return []
+
+    class FakeSession:
+        def execute(self, statement):
+            self.statement = statement
+            return FakeResult()
+
+    session = FakeSession()
+    PostgresFullTextSearch("english").search(session, "posts", "fractions", (0.5, 10), 21)
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "posts.search_vector @@ websearch_to_tsquery" in sql
+    assert "(ts_rank_cd(posts.search_vector, websearch_to_tsquery" in sql and "CAST(" in sql
+    assert "ORDER BY ts_rank_cd" in sql
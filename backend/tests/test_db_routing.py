@@ -0,0 +1,56 @@
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from app.core.database import ReplicaRouter
+
+
+def make_router(tmp_path, replicas=2, **kwargs):
+    primary = create_engine(f"sqlite:///{tmp_path}/primary.db")
+    replica_engines = [create_engine(f"sqlite:///{tmp_path}/replica{i}.db") for i in range(replicas)]
+    return ReplicaRouter(primary, replica_engines, **kwargs), primary, replica_engines
+
+
+def test_without_replicas_reads_go_to_primary(tmp_path):
+    router, primary, _ = make_router(tmp_path, replicas=0)
+    assert router.read_engine() is primary
+
+
+def test_round_robin_over_healthy_replicas(tmp_path):
+    router, _, replicas = make_router(tmp_path)
+    assert [router.read_engine() for _ in range(4)] == [replicas[0], replicas[1], replicas[0], replicas[1]]
+
+
+def test_lagging_or_unreachable_replicas_fall_back(tmp_path):
+    router, primary, replicas = make_router(tmp_path, max_lag_seconds=5, check_interval=60)
+    lag = {replicas[0]: 30.0, replicas[1]: None}
+    router.measure_lag = lambda replica: lag[replica]
+    assert router.read_engine() is primary
+
+    # Cached lag is reused until the check interval passes
+    lag[replicas[1]] = 0.5
+    assert router.read_engine() is primary
+    router.check_interval = 0
+    assert router.read_engine() is replicas[1]
+
+
+def test_slow_lag_check_does_not_block_other_reads(tmp_path):
+    router, _, replicas = make_router(tmp_path, check_interval=60)
+    release = threading.Event()
+
+    def measure_lag(replica):
+        if replica is replicas[0]:
+            release.wait(5)  # e.g. connecting to an unreachable replica
+        return 0.0
+
+    router.measure_lag = measure_lag
+    slow = threading.Thread(target=router.read_engine)
+    slow.start()
+    try:
+        started = time.monotonic()
+        assert router.read_engine() is replicas[1]
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        slow.join()
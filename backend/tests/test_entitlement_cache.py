@@ -0,0 +1,74 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.entitlement_cache import EntitlementCache, StudentEntitlement
+
+
+def make_sub(status, trial_end=None, end=None, plan_type=None, subject_id=None, student_id=5, parent_id=2):
+    plan = SimpleNamespace(plan_type=plan_type) if plan_type else None
+    return SimpleNamespace(id=1, status=status, trial_end_date=trial_end, end_date=end, plan=plan,
+                           subject_id=subject_id, student_id=student_id, parent_id=parent_id)
+
+
+def test_entitlement_from_subscriptions():
+    now = datetime.now()
+    entitlement = StudentEntitlement.from_subscriptions(5, [
+        make_sub("active", end=now + timedelta(days=30), plan_type="basic", subject_id=3),
+        make_sub("trial", trial_end=now - timedelta(days=1)),
+    ])
+    assert entitlement.can_access_courses
+    assert not entitlement.has_active_trial
+    assert entitlement.can_access_subject(3)
+    assert not entitlement.can_access_subject(4)
+    assert entitlement.accessible_subjects == [3]
+    assert abs(entitlement.valid_until - (now + timedelta(days=30)).timestamp()) < 1
+
+
+def test_trial_and_premium_cover_all_subjects():
+    now = datetime.now()
+    trial = StudentEntitlement.from_subscriptions(5, [make_sub("trial", trial_end=now + timedelta(days=3))])
+    assert trial.can_access_subject(42)
+    premium = StudentEntitlement.from_subscriptions(5, [make_sub("active", plan_type="premium")])
+    assert premium.accessible_subjects == ["all"]
+    assert premium.valid_until is None
+    assert not StudentEntitlement.from_subscriptions(5, []).can_access_courses
+
+
+def test_cache_expires_at_nearest_expiry():
+    cache = EntitlementCache(ttl_seconds=300, max_entries=10)
+    cache.put(StudentEntitlement(student_id=5, has_active_trial=True, valid_until=time.time() - 1))
+    assert cache.get(5) is None
+    cache.put(StudentEntitlement(student_id=5, has_active_trial=True, valid_until=time.time() + 60))
+    assert cache.get(5).can_access_courses
+
+
+def test_invalidate_subscription_drops_student_and_parent():
+    cache = EntitlementCache(ttl_seconds=300, max_entries=10)
+    cache.put(StudentEntitlement(student_id=5))
+    cache.put(StudentEntitlement(student_id=2))
+    cache.put(StudentEntitlement(student_id=9))
+    cache.invalidate_subscription(make_sub("cancelled"))
+    assert cache.get(5) is None and cache.get(2) is None
+    assert cache.get(9) is not None
+
+
+def test_expired_grants_are_ignored():
+    now = datetime.now()
+    entitlement = StudentEntitlement.from_grants(5, [
+        {"kind": "trial", "subject_id": None, "all_subjects": True, "valid_until": now - timedelta(minutes=1)},
+        {"kind": "subscription", "subject_id": 3, "all_subjects": False, "valid_until": now + timedelta(days=1)},
+    ])
+    assert not entitlement.has_active_trial
+    assert entitlement.has_active_subscription
+    assert entitlement.accessible_subjects == [3]
+
+
+def test_no_access_entries_expire_quickly():
+    cache = EntitlementCache(ttl_seconds=300, max_entries=10, negative_ttl_seconds=0.05)
+    cache.put(StudentEntitlement(student_id=5))
+    cache.put(StudentEntitlement(student_id=6, has_active_subscription=True))
+    assert cache.get(5) is not None
+    time.sleep(0.1)
+    assert cache.get(5) is None
+    assert cache.get(6).can_access_courses
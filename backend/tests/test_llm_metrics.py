@@ -0,0 +1,44 @@
+import pytest
+
+from app.services.llm_metrics import LLMMetrics, LLMCallRecord, estimate_cost, percentile
+
+
+def _record(method="generate_question", latency_ms=100.0, **kwargs):
+    return LLMCallRecord(provider="gemini", model="gemini-2.5-flash", method=method, latency_ms=latency_ms, **kwargs)
+
+
+def test_percentile_nearest_rank():
+    values = sorted(float(v) for v in range(1, 101))
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_ring_buffer_is_bounded():
+    metrics = LLMMetrics(buffer_size=10, persist=False)
+    for i in range(25):
+        metrics.record(_record(latency_ms=float(i)))
+    summary = metrics.summary()
+    assert summary["window_size"] == 10
+    assert summary["methods"]["generate_question"]["p50_ms"] == 19.0
+    assert metrics.pending_count() == 0
+
+
+def test_summary_groups_by_method():
+    metrics = LLMMetrics(buffer_size=100, persist=False)
+    metrics.record(_record(prompt_tokens=100, completion_tokens=20, cached_tokens=50))
+    metrics.record(_record(method="score_answer", success=False, retry_count=2, error="HTTPStatusError: 503"))
+    methods = metrics.summary()["methods"]
+    assert methods["generate_question"]["cache_hits"] == 1
+    assert methods["generate_question"]["prompt_tokens"] == 100
+    assert methods["score_answer"]["errors"] == 1
+    assert methods["score_answer"]["retries"] == 2
+
+
+def test_estimate_cost():
+    # 1M uncached input tokens on gemini-2.5-flash
+    assert estimate_cost("gemini-2.5-flash", 1_000_000, 0) == pytest.approx(0.30)
+    # Cached tokens are billed at the discounted rate
+    assert estimate_cost("gemini-2.5-flash", 1_000_000, 0, cached_tokens=1_000_000) == pytest.approx(0.075)
+    assert estimate_cost("unknown-model", 100, 100) is None
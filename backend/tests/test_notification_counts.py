@@ -0,0 +1,60 @@
+import pytest
+
+from app.core.advisory_lock import AdvisoryLockLeader
+from app.core.notification_counts import NotificationCountCache
+from app.core.query_counter import assert_max_queries
+from app.crud import community
+from app.crud.community import (
+    create_system_notification, get_notification_count, mark_all_notifications_read, mark_notification_read,
+    mark_notifications_read,
+)
+from app.models.community import Comment, Notification, Post, UserCommunityCounters
+from app.services import community_counters
+from app.services.community_counters import CommunityCounterReconciler
+
+
+@pytest.fixture
+def session_factory(make_session_factory, monkeypatch):
+    cache = NotificationCountCache(ttl_seconds=60)
+    monkeypatch.setattr(community, "notification_count_cache", cache)
+    monkeypatch.setattr(community_counters, "notification_count_cache", cache)
+    return make_session_factory([Post, Comment, Notification, UserCommunityCounters], users="id INTEGER PRIMARY KEY")
+
+
+def test_unread_count_follows_writes_without_counting(session_factory):
+    db = session_factory()
+    notifications = [create_system_notification(db, 1, f"n{n}", "...") for n in range(5)]
+    create_system_notification(db, 2, "other", "...")
+
+    with assert_max_queries(1) as stats:
+        assert get_notification_count(db, 1, unread_only=True) == 5
+    assert "count(" not in " ".join(stats.statements).lower()
+    with assert_max_queries(0):
+        assert get_notification_count(db, 1, unread_only=True) == 5  # cached
+
+    assert mark_notification_read(db, notifications[0].id, user_id=1).is_read
+    assert mark_notification_read(db, notifications[0].id, user_id=1)  # already read: counted once
+    assert mark_notification_read(db, notifications[0].id, user_id=2) is None
+    assert get_notification_count(db, 1, unread_only=True) == 4
+
+    assert mark_notifications_read(db, [n.id for n in notifications[:3]], user_id=1) == 2
+    assert get_notification_count(db, 1, unread_only=True) == 2
+    assert mark_all_notifications_read(db, user_id=1) == 2
+    assert get_notification_count(db, 1, unread_only=True) == 0
+    assert get_notification_count(db, 1) == 5
+    assert get_notification_count(db, 2, unread_only=True) == 1
+    assert get_notification_count(db, 3, unread_only=True) == 0
+
+
+def test_reconciler_repairs_unread_counts(session_factory):
+    db = session_factory()
+    create_system_notification(db, 1, "counted", "...")
+    db.execute(Notification.__table__.insert(), [{"user_id": user_id, "title": "raw", "message": "...", "is_read": False}
+                                                 for user_id in (1, 4)])
+    db.commit()
+    assert get_notification_count(db, 1, unread_only=True) == 1
+
+    reconciler = CommunityCounterReconciler(session_factory, AdvisoryLockLeader(db.get_bind(), 1), batch_size=2)
+    assert reconciler.run_once() == {"posts": 0, "users": 2}
+    assert get_notification_count(db, 1, unread_only=True) == 2
+    assert get_notification_count(db, 4, unread_only=True) == 1
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.core.notification_counts import NotificationCountCache
+from app.core.notification_hub import EVENT_RESYNC, NotificationHub, StreamSubscription, SubscriptionStreamingResponse
+from app.crud import community
+from app.crud.community import create_system_notification, mark_all_notifications_read
+from app.models.community import Notification, UserCommunityCounters
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_is_bounded_and_told_to_resync():
+    subscription = StreamSubscription(user_id=1, max_events=3)
+    for n in range(3):
+        subscription.offer(("count", {"unread": n}))
+    subscription.offer(("count", {"unread": 3}))
+    assert drain(subscription) == [(EVENT_RESYNC, {})] and subscription.dropped == 3
+
+    subscription.offer(("count", {"unread": 4}))
+    assert drain(subscription) == [("count", {"unread": 4})]
+
+
+@pytest.mark.asyncio
+async def test_connections_per_user_are_capped():
+    hub = NotificationHub(max_connections_per_user=2, fanout=False)
+    first, second = hub.subscribe(1), hub.subscribe(1)
+    assert hub.subscribe(1) is None and hub.subscribe(2) is not None
+    hub.unsubscribe(first)
+    assert hub.subscribe(1) is not None
+    assert hub.connection_count(1) == 2 and second is not None
+
+
+@pytest.mark.asyncio
+async def test_notification_writes_reach_open_streams(make_session_factory, monkeypatch):
+    hub = NotificationHub(fanout=False)
+    monkeypatch.setattr(community, "notification_hub", hub)
+    monkeypatch.setattr(community, "notification_count_cache", NotificationCountCache(ttl_seconds=60))
+    db = make_session_factory([Notification, UserCommunityCounters], users="id INTEGER PRIMARY KEY")()
+
+    subscription = hub.subscribe(1)
+    created = create_system_notification(db, 1, "Payment due", "Please update your card")
+    create_system_notification(db, 2, "Not yours", "...")  # no stream for user 2
+    mark_all_notifications_read(db, 1)
+    await asyncio.sleep(0)  # deliveries are scheduled on the event loop
+
+    events = drain(subscription)
+    assert [event for event, _ in events] == ["notification", "count", "count"]
+    assert events[0][1]["id"] == created.id and events[0][1]["title"] == "Payment due"
+    assert [data for _, data in events[1:]] == [{"unread": 1}, {"unread": 0}]
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_formats_events_and_unsubscribes_on_disconnect():
+    hub = NotificationHub(fanout=False)
+    subscription = hub.subscribe(1)
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    body = hub.stream(subscription, [("count", {"unread": 2})], is_disconnected, heartbeat_seconds=0.01)
+    assert (await body.__anext__()).startswith("retry: ")
+    assert await body.__anext__() == 'event: count\ndata: {"unread":2}\n\n'
+    assert await body.__anext__() == ": keepalive\n\n"
+    hub.dispatch([(1, "count", {"unread": 3})])
+    assert await body.__anext__() == 'event: count\ndata: {"unread":3}\n\n'
+
+    disconnected = True
+    with pytest.raises(StopAsyncIteration):
+        await body.__anext__()
+    assert hub.connection_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_response_releases_the_slot_when_the_body_never_starts():
+    hub = NotificationHub(max_connections_per_user=1, fanout=False)
+    subscription = hub.subscribe(1)
+
+    async def is_disconnected():
+        return False
+
+    async def receive():
+        await asyncio.sleep(60)
+
+    async def send(message):
+        raise OSError("client went away")  # while the headers are being sent
+
+    response = SubscriptionStreamingResponse(hub, subscription, hub.stream(subscription, [], is_disconnected),
+                                             media_type="text/event-stream")
+    with pytest.raises(OSError):
+        await response({"type": "http"}, receive, send)
+    assert hub.connection_count(1) == 0 and hub.subscribe(1) is not None
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.pagination import csv_stream, decode_cursor, encode_cursor, json_array_stream, stream_rows
+from app.crud.billing import get_payments_page_by_user, get_subscriptions_page
+from app.models.billing import Payment, Subscription, SubscriptionPlan
+
+START = datetime(2026, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def factory(make_session_factory):
+    factory = make_session_factory([SubscriptionPlan, Subscription, Payment])
+    db = factory()
+    for n in range(1, 8):
+        # Pairs of subscriptions share a created_at, so pages must break ties on id
+        db.add(Subscription(id=n, parent_id=1 if n % 2 else 2, student_id=10 + n, status="active", price=25,
+                            created_at=START + timedelta(days=n // 2)))
+    for n in range(1, 26):
+        db.add(Payment(id=n, subscription_id=1 if n % 5 else 2, amount=25, status="paid",
+                       created_at=START + timedelta(days=n)))
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_keyset_pages_cover_every_row_once(factory):
+    db = factory()
+    seen, cursor = [], None
+    while True:
+        page, cursor = get_subscriptions_page(db, cursor, limit=3)
+        seen.extend(sub.id for sub in page)
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+    db.close()
+
+
+def test_payments_are_paged_per_parent(factory):
+    db = factory()
+    page, cursor = get_payments_page_by_user(db, 1, limit=10)
+    assert [p.id for p in page] == [24, 23, 22, 21, 19, 18, 17, 16, 14, 13]
+    page, cursor = get_payments_page_by_user(db, 1, cursor, limit=100)
+    assert len(page) == 10 and cursor is None
+    # Every fifth payment belongs to subscription 2, of parent 2
+    assert [p.id for p in get_payments_page_by_user(db, 2)[0]] == [25, 20, 15, 10, 5]
+    db.close()
+
+
+def test_requests_without_limit_or_cursor_are_unpaged(factory):
+    db = factory()
+    page, cursor = get_payments_page_by_user(db, 1, limit=None)
+    assert len(page) == 20 and cursor is None
+    page, cursor = get_subscriptions_page(db, limit=2)
+    page, cursor = get_subscriptions_page(db, cursor, limit=None)  # following a cursor: default page size
+    assert [sub.id for sub in page] == [5, 4, 3, 2, 1] and cursor is None
+    db.close()
+
+
+def test_cursor_roundtrip_and_validation():
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_exports_stream_rows(factory):
+    table = Subscription.__table__
+    statement = select(table).order_by(table.c.id)
+
+    exported = json.loads("".join(json_array_stream(stream_rows(factory, statement, batch_size=2))))
+    assert [row["id"] for row in exported] == [1, 2, 3, 4, 5, 6, 7]
+    assert exported[0]["status"] == "active"
+
+    columns = [column.name for column in table.columns]
+    rows = list(csv.DictReader(io.StringIO("".join(csv_stream(stream_rows(factory, statement), columns)))))
+    assert len(rows) == 7
+    assert rows[0]["parent_id"] == "1" and rows[0]["status"] == "active"
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.query_counter import assert_max_queries
+from app.crud.student import get_latest_assessment_rows, get_latest_assessments, record_latest_assessment
+from app.crud.user import get_students_by_parent
+from app.models.assessment import Assessment, LatestAssessment
+from app.models.billing import Subscription
+from app.models.progress import Badge, Progress, StudentBadge
+from app.models.user import StudentProfile
+from app.schemas.user import ParentDashboardResponse
+from app.services.dashboard_service import DASHBOARD_QUERY_COUNT, dashboard_service
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+@pytest.fixture
+def db(make_session_factory):
+    factory = make_session_factory(
+        [StudentProfile, Assessment, LatestAssessment, Subscription, Progress, Badge, StudentBadge],
+        users="id INTEGER PRIMARY KEY, email VARCHAR, username VARCHAR, hashed_password VARCHAR, full_name VARCHAR, "
+              "role VARCHAR, personality TEXT, has_completed_assessment BOOLEAN, is_active BOOLEAN, "
+              "created_at DATETIME, updated_at DATETIME",
+    )
+    yield factory()
+
+
+def add_family(db, parent_id: int, children: int):
+    with db.get_bind().begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, hashed_password, full_name, role, personality, is_active) "
+            "VALUES (:id, :email, 'x', 'Parent', 'PARENT', '{}', 1)"
+        ), {"id": parent_id, "email": f"parent{parent_id}@example.com"})
+        for n in range(children):
+            conn.execute(text(
+                "INSERT INTO users (id, username, hashed_password, full_name, role, personality, is_active) "
+                "VALUES (:id, :username, 'x', :name, 'STUDENT', '{}', 1)"
+            ), {"id": parent_id * 100 + n, "username": f"kid{parent_id}_{n}", "name": f"Kid {n}"})
+
+    for n in range(children):
+        user_id = parent_id * 100 + n
+        profile = StudentProfile(id=user_id, user_id=user_id, parent_id=parent_id, age=8 + n, grade_level="3")
+        db.add(profile)
+        for subject in ("Math", "Science"):
+            for days_ago, score in ((30, 40.0), (2, 75.0)):
+                assessment = Assessment(
+                    student_id=user_id, subject=subject, grade_level=3, assessment_type="diagnostic",
+                    status="completed", overall_score=score, created_at=NOW - timedelta(days=days_ago),
+                )
+                db.add(assessment)
+                db.flush()
+                record_latest_assessment(db, assessment)
+        for week in range(3):
+            db.add(Progress(student_id=user_id, week_start=NOW - timedelta(weeks=week),
+                            points_earned=10, lessons_completed=2, streak_days=5 - week))
+        db.add(StudentBadge(student_id=user_id, badge_id=1))
+        status = "active" if n % 2 == 0 else "trial"
+        db.add(Subscription(parent_id=parent_id, student_id=user_id, status="expired",
+                            trial_end_date=NOW - timedelta(days=60), price=0))
+        db.add(Subscription(parent_id=parent_id, student_id=user_id, status=status, price=25,
+                            end_date=NOW + timedelta(days=20), trial_end_date=NOW + timedelta(days=5)))
+    db.commit()
+
+
+def test_dashboard_query_count_does_not_grow_with_children(db):
+    db.add(Badge(id=1, name="Starter"))
+    add_family(db, parent_id=1, children=1)
+    add_family(db, parent_id=2, children=6)
+
+    for parent_id, children in ((1, 1), (2, 6)):
+        db.expunge_all()
+        with assert_max_queries(DASHBOARD_QUERY_COUNT):
+            dashboard = ParentDashboardResponse.model_validate(
+                dashboard_service.get_parent_dashboard(db, parent_id), from_attributes=True
+            )
+        assert len(dashboard.children) == children
+
+    child = dashboard.children[1]
+    assert child.user.username == "kid2_1"
+    assert sorted(child.latest_assessments) == ["Math", "Science"]
+    assert child.latest_assessments["Math"].overall_score == 75.0
+    assert child.access.has_active_trial and not child.access.show_subscribe_cta
+    assert child.progress.model_dump() == {
+        "total_points": 30, "current_streak": 5, "total_lessons": 6, "badges_earned": 1,
+    }
+
+
+def test_students_by_parent_uses_two_queries(db):
+    add_family(db, parent_id=3, children=4)
+    db.expunge_all()
+
+    with assert_max_queries(2):
+        students = get_students_by_parent(db, 3)
+        flags = [(s.user.username, s.has_active_subscription) for s in students]
+
+    assert flags == [("kid3_0", True), ("kid3_1", True), ("kid3_2", True), ("kid3_3", True)]
+    assert len(get_latest_assessments(db, [300, 301])) == 4
+
+
+def test_latest_assessment_table_keeps_the_newest(db):
+    add_family(db, parent_id=4, children=1)
+    newer = Assessment(student_id=400, subject="English", grade_level=3, assessment_type="diagnostic",
+                       status="in_progress", created_at=NOW)
+    older = Assessment(student_id=400, subject="English", grade_level=3, assessment_type="diagnostic",
+                       status="completed", overall_score=50.0, created_at=NOW - timedelta(days=9))
+    db.add_all([newer, older])
+    db.flush()
+    record_latest_assessment(db, newer)
+    record_latest_assessment(db, older)  # created earlier, must not replace the newer one
+    newer.status, newer.overall_score, newer.completed_at = "completed", 90.0, NOW + timedelta(hours=1)
+    record_latest_assessment(db, newer)
+    db.commit()
+
+    rows = {row.subject: row for row in get_latest_assessment_rows(db, [400])}
+    assert rows["English"].assessment_id == newer.id
+    assert (rows["English"].status, rows["English"].overall_score) == ("completed", 90.0)
+    direct = {a.subject: a.id for a in get_latest_assessments(db, [400])}
+    assert direct == {subject: row.assessment_id for subject, row in rows.items()}
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event
+
+from app.api.v1.billing import _not_modified
+from app.core.pricing_catalog import PricingCatalogCache, pricing_catalog
+from app.crud.billing import calculate_subscription_price, create_plan_feature, update_subscription_plan
+from app.models.billing import EntitlementGrant, PlanFeature, PlanSubject, Subscription, SubscriptionPlan
+from app.models.subject import Subject
+from app.schemas.billing import PlanFeatureCreate, SubscriptionPlanUpdate
+
+
+@pytest.fixture
+def db(make_session_factory):
+    db = make_session_factory([SubscriptionPlan, PlanFeature, PlanSubject, Subject, Subscription, EntitlementGrant])()
+    db.add_all([
+        SubscriptionPlan(id=1, name="Basic", plan_type="basic", base_price=25, sort_order=1),
+        SubscriptionPlan(id=2, name="Premium", plan_type="premium", base_price=85, sort_order=2),
+        SubscriptionPlan(id=3, name="Legacy", plan_type="basic", base_price=20, is_active=False),
+        Subject(id=1, name="Math"),
+        Subject(id=2, name="Science"),
+    ])
+    db.commit()
+    db.add(PlanFeature(plan_id=1, feature_name="AI tutor"))
+    db.commit()
+    pricing_catalog.invalidate()
+    yield db
+    db.close()
+    pricing_catalog.invalidate()
+
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_catalog_is_built_once_and_versioned(db):
+    cache = PricingCatalogCache(ttl_seconds=60)
+    statements = count_queries(db)
+    catalog = cache.get(db)
+    built_with = len(statements)
+    assert built_with == 4
+    assert cache.get(db) is catalog
+    assert len(statements) == built_with
+
+    assert [plan.name for plan in catalog.plans] == ["Basic", "Premium"]
+    options = catalog.pricing_options()
+    assert options["total_subjects_available"] == 2
+    assert options["pricing_options"][0]["features"] == [{"name": "AI tutor", "description": None}]
+    assert options["pricing_options"][1]["subjects"] == ["all"]
+
+    # Same content, same version: every worker hands out the same ETag
+    assert PricingCatalogCache().get(db).etag == catalog.etag
+
+
+def test_prices_match_the_pricing_rules(db):
+    assert calculate_subscription_price(db, 1, 2, "monthly") == 50.0
+    assert calculate_subscription_price(db, 2, 3, "monthly") == 85.0
+    assert calculate_subscription_price(db, 2, 1, "annual") == Decimal("816.00")
+    # Inactive plans aren't in the catalog but can still be priced
+    assert calculate_subscription_price(db, 3, 1, "annual") == Decimal("192.00")
+
+
+def test_plan_writes_invalidate_the_catalog(db):
+    before = pricing_catalog.get(db)
+    update_subscription_plan(db, 1, SubscriptionPlanUpdate(description="One subject"))
+    after = pricing_catalog.get(db)
+    assert after.version != before.version
+    assert after.plan(1).description == "One subject"
+
+    create_plan_feature(db, PlanFeatureCreate(plan_id=2, feature_name="All subjects"))
+    assert pricing_catalog.get(db).plan(2).features == (("All subjects", None),)
+
+
+def test_not_modified_carries_only_the_validators():
+    response = Response(content=b"[]")
+    response.headers["ETag"] = '"v1"'
+    response.headers["Cache-Control"] = "private, no-cache"
+    not_modified = _not_modified(response)
+    assert not_modified.status_code == 304
+    assert dict(not_modified.headers) == {"etag": '"v1"', "cache-control": "private, no-cache"}
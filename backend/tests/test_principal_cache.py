@@ -0,0 +1,46 @@
+import time
+
+from app.core.principal_cache import Principal, PrincipalCache
+from app.models.user import UserRole
+
+
+def make_principal(user_id=1, student_profile_id=None):
+    return Principal(
+        id=user_id, role=UserRole.PARENT, is_active=True, username=f"user{user_id}",
+        full_name="Test User", email=f"user{user_id}@example.com", student_profile_id=student_profile_id,
+    )
+
+
+def test_hit_and_role_comparisons():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("token-a", make_principal(student_profile_id=7))
+    principal = cache.get("token-a")
+    assert principal.role == "parent"
+    assert principal.student_profile.id == 7
+    assert cache.get("token-b") is None
+
+
+def test_entry_never_outlives_token():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("token-a", make_principal(), token_exp=time.time() - 1)
+    assert cache.get("token-a") is None
+
+
+def test_invalidate_user_drops_all_tokens():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("token-a", make_principal(1))
+    cache.put("token-b", make_principal(1))
+    cache.put("token-c", make_principal(2))
+    cache.invalidate_user(1)
+    assert cache.get("token-a") is None and cache.get("token-b") is None
+    assert cache.get("token-c") is not None
+
+
+def test_bounded_lru():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+    cache.put("token-a", make_principal(1))
+    cache.put("token-b", make_principal(2))
+    cache.get("token-a")
+    cache.put("token-c", make_principal(3))
+    assert cache.get("token-b") is None
+    assert cache.get("token-a") is not None and cache.get("token-c") is not None
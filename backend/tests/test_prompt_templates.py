@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.llm_service import LLMService
+from app.services.prompt_templates import (
+    PromptBudgetExceeded, PromptRegistry, estimate_tokens, parse_prompt_templates, prompt_templates,
+)
+
+SAMPLE = """
+# greet
+## SYSTEM:
+You are polite. Output JSON like {"greeting": ""}.
+
+## USER:
+Greet {name}.
+"""
+
+
+def test_parse_keeps_system_static_and_finds_fields():
+    template = parse_prompt_templates(SAMPLE)["greet"]
+    assert template.system == 'You are polite. Output JSON like {"greeting": ""}.'
+    assert template.fields == {"name"}
+    rendered = template.render(name="Ada")
+    assert rendered.user == "Greet Ada."
+    assert rendered.estimated_tokens == estimate_tokens(template.system) + estimate_tokens("Greet Ada.")
+
+
+def test_render_requires_all_fields():
+    with pytest.raises(KeyError):
+        parse_prompt_templates(SAMPLE)["greet"].render()
+
+
+def test_budget_is_enforced(tmp_path):
+    path = tmp_path / "prompts.md"
+    path.write_text(SAMPLE)
+    registry = PromptRegistry(str(path), budgets={"greet": 20})
+    registry.render("greet", name="Ada")
+    with pytest.raises(PromptBudgetExceeded):
+        registry.render("greet", name="A" * 200)
+
+
+def test_shipped_templates_fit_their_budgets():
+    prompt = prompt_templates.render(
+        "generate_question", subject="Math", grade_level="6", difficulty_level="easy", topic="Fractions"
+    )
+    assert "Fractions" in prompt.user
+    assert "Fractions" not in prompt.system
+
+
+@pytest.mark.asyncio
+async def test_over_budget_prompts_fall_back_without_calling_the_provider(monkeypatch):
+    service = LLMService()
+    service.provider = "openai"
+
+    async def provider_call(*args, **kwargs):
+        raise AssertionError("over-budget prompts must not reach the provider")
+
+    monkeypatch.setattr(service, "_openai_chat", provider_call)
+    question = {"question_text": "2 + 2?", "question_type": "open", "correct_answer": "4"}
+    graded = await service.score_answer(question, "I think it is 4. " * 1000)
+    assert graded["is_correct"] and graded["score"] == 1.0
+
+    mastery_map = {f"topic {n}": n / 1000 for n in range(1000)}
+    plan = await service.generate_study_plan(mastery_map, "Math", "6", top_n=2)
+    assert [lesson["topic"] for lesson in plan["lessons"]] == ["topic 0", "topic 1"]
@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.query_counter import (
+    QueryCounterMiddleware, assert_max_queries, count_queries, statement_shape,
+)
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine)
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+Base.metadata.create_all(bind=engine)
+with TestingSessionLocal() as setup_db:
+    setup_db.add_all([Item(id=i, name=f"item {i}") for i in range(1, 11)])
+    setup_db.commit()
+
+
+def get_test_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app = FastAPI()
+app.add_middleware(QueryCounterMiddleware, n_plus_one_threshold=5)
+
+
+@app.get("/batched")
+def batched(db: Session = Depends(get_test_db)):
+    return [i.name for i in db.query(Item).all()]
+
+
+@app.get("/n-plus-one")
+def n_plus_one(db: Session = Depends(get_test_db)):
+    return [db.query(Item).filter(Item.id == i).first().name for i in range(1, 11)]
+
+
+
+def make_client():
+    # httpx 0.28 (pinned) no longer works with starlette 0.27's TestClient
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_statement_shape_ignores_parameters():
+    assert statement_shape("SELECT * FROM items WHERE id = 1") == statement_shape("SELECT *  FROM items\nWHERE id = 22")
+    assert statement_shape("SELECT * FROM items WHERE id IN (?, ?, ?)") == "SELECT * FROM items WHERE id IN (?)"
+
+
+@pytest.mark.asyncio
+async def test_headers_report_query_count():
+    async with make_client() as client:
+        resp = await client.get("/batched")
+    assert resp.headers["x-db-query-count"] == "1"
+    assert resp.headers["server-timing"].startswith("db;dur=")
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_is_logged(caplog):
+    with caplog.at_level("WARNING", logger="app.core.query_counter"):
+        async with make_client() as client:
+            resp = await client.get("/n-plus-one")
+    assert resp.headers["x-db-query-count"] == "10"
+    assert "Possible N+1 on GET /n-plus-one" in caplog.text
+
+
+def test_assert_max_queries():
+    with TestingSessionLocal() as db:
+        with assert_max_queries(1):
+            db.execute(text("SELECT 1"))
+        with pytest.raises(AssertionError, match="at most 1 queries, got 2"):
+            with assert_max_queries(1):
+                db.execute(text("SELECT 1"))
+                db.execute(text("SELECT 2"))
+        with count_queries() as stats:
+            db.query(Item).all()
+        assert stats.count == 1
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.advisory_lock import AdvisoryLockLeader
+from app.models.billing import EntitlementGrant, Subscription, SubscriptionPlan
+from app.models.community import Notification, UserCommunityCounters
+from app.services.subscription_scheduler import SubscriptionScheduler
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def at(**delta):
+    return (NOW + timedelta(**delta)).replace(tzinfo=None)
+
+
+@pytest.fixture
+def factory(make_session_factory):
+    factory = make_session_factory([SubscriptionPlan, Subscription, EntitlementGrant, Notification,
+                                    UserCommunityCounters])
+    db = factory()
+    db.add_all([
+        Subscription(id=1, parent_id=1, student_id=10, status="trial", trial_end_date=at(hours=-1)),
+        Subscription(id=2, parent_id=1, student_id=11, status="trial", trial_end_date=at(days=-2)),
+        Subscription(id=3, parent_id=2, student_id=20, status="trial", trial_end_date=at(days=3)),
+        Subscription(id=4, parent_id=2, student_id=21, status="active", end_date=at(minutes=-5)),
+        Subscription(id=5, parent_id=3, student_id=30, status="active", end_date=at(days=30)),
+        Subscription(id=6, parent_id=3, student_id=31, status="past_due", end_date=at(days=-8)),
+        Subscription(id=7, parent_id=3, student_id=32, status="past_due", end_date=at(days=-1)),
+        Subscription(id=8, parent_id=4, student_id=40, status="active"),
+        EntitlementGrant(student_id=10, subscription_id=1, kind="trial", all_subjects=True, valid_until=at(hours=-1)),
+        EntitlementGrant(student_id=20, subscription_id=3, kind="trial", all_subjects=True, valid_until=at(days=3)),
+        EntitlementGrant(student_id=21, subscription_id=4, kind="subscription", subject_id=1, valid_until=at(minutes=-5)),
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def statuses(factory):
+    db = factory()
+    try:
+        return {sub.id: sub.status for sub in db.query(Subscription).order_by(Subscription.id)}
+    finally:
+        db.close()
+
+
+def test_due_subscriptions_transition_in_batches(factory):
+    scheduler = SubscriptionScheduler(factory, AdvisoryLockLeader(factory.kw["bind"], 1), batch_size=1)
+    moved = scheduler.run_once(NOW)
+    assert moved == {"trial_expired": 2, "subscription_past_due": 1, "subscription_expired": 1}
+    assert statuses(factory) == {
+        1: "expired", 2: "expired", 3: "trial", 4: "past_due", 5: "active", 6: "expired", 7: "past_due", 8: "active",
+    }
+
+    db = factory()
+    assert sorted(g.subscription_id for g in db.query(EntitlementGrant)) == [3]
+    # One notification per parent per transition and batch
+    notifications = sorted((n.user_id, n.title) for n in db.query(Notification))
+    assert notifications == [
+        (1, "Free trial ended"), (1, "Free trial ended"), (2, "Payment due"), (3, "Subscription expired"),
+    ]
+    assert {c.user_id: c.unread_notifications for c in db.query(UserCommunityCounters)} == {1: 2, 2: 1, 3: 1}
+    db.close()
+
+    # Nothing left to do until the next expiry: subscription 7's grace period ends in 6 days
+    assert scheduler.run_once(NOW) == {"trial_expired": 0, "subscription_past_due": 0, "subscription_expired": 0}
+    assert scheduler.next_due(NOW) == NOW + timedelta(days=3)
+
+
+class Follower:
+    def acquire(self):
+        return False
+
+
+def test_only_the_leader_runs(factory):
+    scheduler = SubscriptionScheduler(factory, Follower(), max_sleep_seconds=60)
+    assert scheduler.tick() == 60
+    assert statuses(factory)[1] == "trial"
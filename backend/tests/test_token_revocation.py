@@ -0,0 +1,74 @@
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.token_revocation import BloomFilter, RevocationList
+from app.core.security import create_access_token, decode_token
+from app.crud.auth_token import create_refresh_token, revoke_refresh_token_family, rotate_refresh_token
+from app.models.auth_token import RefreshToken
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    keys = [str(uuid.uuid4()) for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(1 for _ in range(10000) if str(uuid.uuid4()) in bloom)
+    assert false_positives < 100
+
+
+def test_revoked_until_token_expiry():
+    revoked = RevocationList(capacity=100)
+    revoked.add("live", time.time() + 60)
+    revoked.add("expired", time.time() - 1)
+    assert revoked.is_revoked("live")
+    assert not revoked.is_revoked("expired")
+    assert not revoked.is_revoked("other")
+    assert not revoked.is_revoked(None)
+
+
+def test_replace_keeps_revocations_made_during_sync():
+    revoked = RevocationList(capacity=100)
+    revoked.add("old-local", time.time() + 60)
+    snapshot_started = time.time()
+    revoked.add("new-local", time.time() + 60)
+    revoked.replace([("from-db", time.time() + 60), ("gone", time.time() - 1)], snapshot_started)
+    assert revoked.is_revoked("from-db")
+    assert revoked.is_revoked("new-local")
+    assert not revoked.is_revoked("old-local")
+    assert not revoked.is_revoked("gone")
+
+
+def test_decode_token_rejects_revoked_jti(monkeypatch):
+    from app.core import security
+
+    revoked = RevocationList(capacity=100)
+    monkeypatch.setattr(security, "revocation_list", revoked)
+    token = create_access_token(subject=1)
+    payload = decode_token(token)
+    assert payload["jti"]
+    revoked.add(payload["jti"], payload["exp"])
+    assert decode_token(token) is None
+
+
+def test_concurrent_refresh_is_not_treated_as_theft(make_session_factory, monkeypatch):
+    db = make_session_factory([RefreshToken])()
+    _, first = create_refresh_token(db, user_id=1)
+    successor, _ = rotate_refresh_token(db, first)
+    sibling, _ = rotate_refresh_token(db, first)  # the other tab, moments later
+    assert sibling.family_id == successor.family_id
+    db.refresh(successor)
+    assert successor.revoked_at is None
+
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    assert rotate_refresh_token(db, first) is None  # replayed after the grace window
+    assert db.query(RefreshToken).filter(RefreshToken.revoked_at.is_(None)).count() == 0
+
+
+def test_grace_window_does_not_outlive_logout(make_session_factory):
+    db = make_session_factory([RefreshToken])()
+    db_token, first = create_refresh_token(db, user_id=1)
+    rotate_refresh_token(db, first)
+    revoke_refresh_token_family(db, db_token.family_id)
+    assert rotate_refresh_token(db, first) is None
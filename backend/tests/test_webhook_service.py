@@ -0,0 +1,138 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from app.models.billing import EntitlementGrant, Payment, Subscription, SubscriptionPlan
+from app.models.webhook_event import WebhookEvent
+from app.services.webhook_service import (
+    EVENT_DEAD, EVENT_FAILED, EVENT_PROCESSED, WebhookProcessor, WebhookSignatureError,
+    new_webhook_event, sign_stripe_payload, verify_stripe_signature,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "stripe"
+SECRET = "whsec_test_fixture_secret"
+
+
+def load_fixture(name: str) -> bytes:
+    return (FIXTURES / f"{name}.json").read_bytes()
+
+
+def receive(factory, name: str) -> dict:
+    """What the webhook endpoint does: verify the signed fixture and enqueue it once."""
+    payload = load_fixture(name)
+    event = verify_stripe_signature(payload, sign_stripe_payload(payload, SECRET), SECRET)
+    db = factory()
+    try:
+        if db.get(WebhookEvent, event["id"]) is None:
+            db.add(new_webhook_event(event))
+            db.commit()
+    finally:
+        db.close()
+    return event
+
+
+@pytest.fixture
+def factory(make_session_factory):
+    factory = make_session_factory([SubscriptionPlan, Subscription, Payment, EntitlementGrant, WebhookEvent])
+    db = factory()
+    db.add_all([
+        Subscription(id=1, parent_id=1, student_id=10, status="trial", price=25),
+        Subscription(id=2, parent_id=1, student_id=11, status="active", price=25),
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_signature_verification():
+    payload = load_fixture("payment_intent_succeeded")
+    assert verify_stripe_signature(payload, sign_stripe_payload(payload, SECRET), SECRET)["type"] == "payment_intent.succeeded"
+    with pytest.raises(WebhookSignatureError):
+        verify_stripe_signature(payload + b" ", sign_stripe_payload(payload, SECRET), SECRET)
+    with pytest.raises(WebhookSignatureError):
+        verify_stripe_signature(payload, sign_stripe_payload(payload, "whsec_other"), SECRET)
+    with pytest.raises(WebhookSignatureError):
+        old = sign_stripe_payload(payload, SECRET, timestamp=int(time.time()) - 3600)
+        verify_stripe_signature(payload, old, SECRET)
+
+
+def test_redelivered_event_creates_one_payment(factory):
+    for _ in range(3):
+        receive(factory, "payment_intent_succeeded")
+    processor = WebhookProcessor(factory, workers=2)
+    assert processor.drain() == 1
+
+    db = factory()
+    assert db.query(WebhookEvent).count() == 1
+    assert db.query(Payment).count() == 1
+    subscription = db.get(Subscription, 1)
+    assert subscription.status == "active"
+    assert db.query(EntitlementGrant).filter_by(student_id=10).count() == 1
+    db.close()
+
+    # Replaying a processed event is harmless
+    db = factory()
+    assert processor.requeue(db, event_ids=["evt_3PfixtureSucceeded01"]) == 1
+    db.close()
+    processor.drain()
+    db = factory()
+    assert db.query(Payment).count() == 1
+    db.close()
+
+
+def test_events_are_ordered_per_subscription(factory):
+    applied = []
+
+    def record(db, obj):
+        applied.append(obj["id"])
+
+    # Enqueued out of order; processed in event order for subscription 1
+    receive(factory, "payment_intent_payment_failed")
+    receive(factory, "payment_intent_succeeded")
+    receive(factory, "customer_subscription_deleted")
+    processor = WebhookProcessor(factory, workers=2, handlers={
+        "payment_intent.succeeded": record,
+        "payment_intent.payment_failed": record,
+        "customer.subscription.deleted": record,
+    })
+    assert processor.process_due() == 2  # heads of two subscriptions
+    assert processor.drain() == 1
+    assert sorted(applied) == ["pi_3PfixturePaymentIntent01", "pi_3PfixturePaymentIntent01", "sub_1PfixtureSubscription01"]
+
+    db = factory()
+    order = [e.id for e in db.query(WebhookEvent).order_by(WebhookEvent.processed_at, WebhookEvent.id)]
+    db.close()
+    assert order.index("evt_3PfixtureSucceeded01") < order.index("evt_3PfixtureFailed01")
+
+
+def test_failures_retry_then_dead_letter(factory):
+    def broken(db, obj):
+        raise RuntimeError("gateway exploded")
+
+    receive(factory, "payment_intent_succeeded")
+    receive(factory, "payment_intent_payment_failed")
+    processor = WebhookProcessor(factory, max_attempts=2, retry_base_seconds=0,
+                                 handlers={"payment_intent.succeeded": broken})
+
+    assert processor.process_due() == 1
+    db = factory()
+    event = db.get(WebhookEvent, "evt_3PfixtureSucceeded01")
+    assert (event.status, event.attempts) == (EVENT_FAILED, 1)
+    assert "gateway exploded" in event.last_error
+    db.close()
+
+    # The failed head blocks the later event for the same subscription until it's dead-lettered
+    assert processor.process_due() == 1
+    db = factory()
+    assert db.get(WebhookEvent, "evt_3PfixtureSucceeded01").status == EVENT_DEAD
+    assert db.get(WebhookEvent, "evt_3PfixtureFailed01").status == "pending"
+    db.close()
+
+    assert processor.drain() == 1
+    db = factory()
+    assert db.get(WebhookEvent, "evt_3PfixtureFailed01").status == EVENT_PROCESSED
+    assert processor.requeue(db, statuses=[EVENT_DEAD]) == 1
+    assert db.get(WebhookEvent, "evt_3PfixtureSucceeded01").attempts == 0
+    db.close()